@@ -1,69 +1,127 @@
 import os
+import sys
+import time
 import pickle
 import pandas as pd
-from flask import Flask, render_template, request
+from flask import Flask, jsonify, render_template, request
 
 app = Flask(__name__)
 
 # Load regression models for score prediction
 import joblib
-import boto3
+import numpy as np
 import yaml
-from io import BytesIO
+
+# Shared serving helpers live in the inference package at the project root
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from inference.artifact_cache import ArtifactCache
+from inference.feature_store import FeatureStore, feature_store_path
+from inference.fixture_table import AWAY_WIN, DRAW, HOME_WIN, FixtureTable
+from inference.team_stats import FEATURES, TeamStatsIndex
+goals_model_path = os.path.join(os.path.dirname(__file__), '..', 'models', 'goals_model.pkl')
 home_goals_model_path = os.path.join(os.path.dirname(__file__), '..', 'models', 'home_goals_model.pkl')
 away_goals_model_path = os.path.join(os.path.dirname(__file__), '..', 'models', 'away_goals_model.pkl')
 
+with open(os.path.join(os.path.dirname(__file__), '..', 'configs', 'config.yaml'), 'r') as f:
+    config = yaml.safe_load(f)
+
 def load_model_from_s3(model_key):
-    with open(os.path.join(os.path.dirname(__file__), '..', 'configs', 'config.yaml'), 'r') as f:
-        config = yaml.safe_load(f)
+    """Returns (model, ETag), or (None, None) if the model could not be fetched."""
     bucket_name = config['s3']['bucket']
-    s3_client = boto3.client('s3')
     try:
-        obj = s3_client.get_object(Bucket=bucket_name, Key=model_key)
-        model_bytes = obj['Body'].read()
-        return joblib.load(BytesIO(model_bytes))
+        # Served from the on-disk artifact cache when the S3 object has not changed
+        started = time.perf_counter()
+        model, etag = ArtifactCache.from_config(config).load(bucket_name, model_key)
+        print(f"Loaded {model_key} (ETag {etag}) in {time.perf_counter() - started:.2f}s")
+        return model, etag
     except Exception as e:
         print(f"[WARNING] Could not load {model_key} from S3: {e}")
-        return None
+        return None, None
+
+def load_model(model_key, local_path):
+    """Loads a model from S3, falling back to the local copy. Returns (model, version)."""
+    model, version = load_model_from_s3(model_key)
+    if model is None and os.path.exists(local_path):
+        model, version = joblib.load(local_path), f"mtime:{os.stat(local_path).st_mtime_ns}"
+    return model, version
+
+# A multi-output model (scripts/train_regression.py --multi-output) predicts both scores
+# in one forest traversal; otherwise fall back to the separate home and away models
+goals_model, models_version = load_model('models/goals_model.pkl', goals_model_path)
+home_goals_model = away_goals_model = None
+if goals_model is None:
+    home_goals_model, home_goals_version = load_model('models/home_goals_model.pkl', home_goals_model_path)
+    away_goals_model, away_goals_version = load_model('models/away_goals_model.pkl', away_goals_model_path)
+    models_version = f"{home_goals_version}|{away_goals_version}"
+models_loaded = goals_model is not None or (home_goals_model is not None and away_goals_model is not None)
+
+def predict_goals(input_data):
+    """Returns an (n, 2) array of predicted home and away goals."""
+    if goals_model is not None:
+        return goals_model.predict(input_data)
+    return np.column_stack([home_goals_model.predict(input_data), away_goals_model.predict(input_data)])
+
+web_app_config = config.get('web_app', {})
+fixture_table_path = web_app_config.get('fixture_table_path') or os.path.join(
+    config.get('artifact_cache', {}).get('dir', '/tmp/epl-artifact-cache'), 'fixture_table.npz')
+fixture_table = None
+max_bulk_fixtures = web_app_config.get('max_bulk_fixtures', 1000)
+# Rejects oversized bodies before they are parsed; a fixture takes well under 256 bytes of JSON
+app.config['MAX_CONTENT_LENGTH'] = max_bulk_fixtures * 256 + 4096
+OUTCOME_LABELS = {HOME_WIN: "H", DRAW: "D", AWAY_WIN: "A"}
 
-home_goals_model = load_model_from_s3('models/home_goals_model.pkl')
-if home_goals_model is None:
-    home_goals_model = joblib.load(home_goals_model_path) if os.path.exists(home_goals_model_path) else None
-
-away_goals_model = load_model_from_s3('models/away_goals_model.pkl')
-if away_goals_model is None:
-    away_goals_model = joblib.load(away_goals_model_path) if os.path.exists(away_goals_model_path) else None
-
-# Extract unique teams from data
-csv_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'processed_epl_data.csv')
-if os.path.exists(csv_path):
-    df = pd.read_csv(csv_path)
-    home_teams = {t for t in df['HomeTeam'].unique() if isinstance(t, str)}
-    away_teams = {t for t in df['AwayTeam'].unique() if isinstance(t, str)}
-    teams = sorted(home_teams | away_teams)
+def rebuild_fixture_table(stats):
+    """Re-scores the fixtures whose team features changed and persists the table for the next start."""
+    global fixture_table
+    if not models_loaded:
+        return
+    try:
+        previous = fixture_table
+        if previous is None and os.path.exists(fixture_table_path):
+            previous = FixtureTable.load(fixture_table_path)
+        table = FixtureTable.build(stats.snapshot(), predict_goals, models_version, previous=previous)
+        fixture_table = table
+        table.save(fixture_table_path)
+    except Exception as e:
+        # Requests fall back to scoring the fixture directly
+        print(f"[WARNING] Could not build the fixture table: {e}")
+
+def processed_data_stats():
+    """The latest processed row per team (team_stats_path, data/processed_epl_data.csv by default)."""
+    csv_path = web_app_config.get('team_stats_path') or os.path.join(os.path.dirname(__file__), '..', 'data', 'processed_epl_data.csv')
+    return TeamStatsIndex(csv_path, refresh_interval_s=web_app_config.get('team_stats_refresh_s', 30),
+                          on_change=rebuild_fixture_table, since=web_app_config.get('team_stats_since')).start()
+
+def feature_store_stats():
+    """
+    The features preprocess.py computed for each team's next match, shared with the
+    inference API. Until a pipeline run has published the store, the processed data
+    is used instead; a restart switches to the store once it exists.
+    """
+    store = FeatureStore(feature_store_path(config), refresh_interval_s=config.get('feature_store', {}).get('refresh_s', 30),
+                         on_change=rebuild_fixture_table)
+    try:
+        loaded = store.refresh()
+    except Exception as e:
+        print(f"[WARNING] Could not read the feature store at {store.path}: {e}")
+        loaded = False
+    if not loaded:
+        print("[WARNING] Feature store unavailable, using the processed match data for team stats.")
+        return processed_data_stats()
+    return store.start()
+
+# Latest features per team, built once and rebuilt in the background when the data changes;
+# every rebuild refreshes the fixture table
+if web_app_config.get('team_stats_source', 'feature_store') == 'feature_store':
+    team_stats = feature_store_stats()
 else:
-    teams = []
-
-def get_team_rows(df, team_a, team_b):
-    home_row = df[df['HomeTeam'] == team_a].sort_values('Date', ascending=False).head(1)
-    away_row = df[df['AwayTeam'] == team_b].sort_values('Date', ascending=False).head(1)
-    return home_row, away_row
-
-def prepare_input_data(home_row, away_row):
-    return pd.DataFrame({
-        'avg_GoalsScored_home': home_row['avg_GoalsScored_home'].values,
-        'avg_GoalsConceded_home': home_row['avg_GoalsConceded_home'].values,
-        'avg_Shots_home': home_row['avg_Shots_home'].values,
-        'avg_ShotsOnTarget_home': home_row['avg_ShotsOnTarget_home'].values,
-        'avg_GoalsScored_away': away_row['avg_GoalsScored_away'].values,
-        'avg_GoalsConceded_away': away_row['avg_GoalsConceded_away'].values,
-        'avg_Shots_away': away_row['avg_Shots_away'].values,
-        'avg_ShotsOnTarget_away': away_row['avg_ShotsOnTarget_away'].values,
-    })
-
-def predict_score(home_goals_model, away_goals_model, input_data):
-    pred_home_goals = home_goals_model.predict(input_data)[0]
-    pred_away_goals = away_goals_model.predict(input_data)[0]
+    team_stats = processed_data_stats()
+
+def prepare_input_data(features):
+    return pd.DataFrame([features], columns=FEATURES)
+
+def predict_score(input_data):
+    pred_home_goals, pred_away_goals = predict_goals(input_data)[0]
     return int(round(pred_home_goals)), int(round(pred_away_goals))
 
 def determine_outcome(team_a, team_b, pred_home_goals_rounded, pred_away_goals_rounded):
@@ -74,6 +132,30 @@ def determine_outcome(team_a, team_b, pred_home_goals_rounded, pred_away_goals_r
     else:
         return "Draw"
 
+def describe_outcome(team_a, team_b, outcome_code):
+    if outcome_code == HOME_WIN:
+        return f"Winner: {team_a}"
+    if outcome_code == DRAW:
+        return "Draw"
+    return f"Winner: {team_b}"
+
+def lookup_fixture(team_a, team_b):
+    """Returns (home goals, away goals, outcome), or None if a team has no stats."""
+    table = fixture_table
+    if table is not None:
+        fixture = table.lookup(team_a, team_b)
+        if fixture is None:
+            return None
+        home_goals, away_goals, outcome_code = fixture
+        return home_goals, away_goals, describe_outcome(team_a, team_b, outcome_code)
+    features = team_stats.lookup(team_a, team_b)
+    if features is None:
+        return None
+    input_data = prepare_input_data(features)
+    print(f"[DEBUG] Input data for prediction:\n{input_data}")
+    pred_home_goals_rounded, pred_away_goals_rounded = predict_score(input_data)
+    return pred_home_goals_rounded, pred_away_goals_rounded, determine_outcome(team_a, team_b, pred_home_goals_rounded, pred_away_goals_rounded)
+
 @app.route('/', methods=['GET', 'POST'])
 def home():
     prediction = None
@@ -85,27 +167,68 @@ def home():
     if request.method == 'POST':
         team_a = request.form.get('team_a')
         team_b = request.form.get('team_b')
-        if home_goals_model is not None and away_goals_model is not None:
+        if models_loaded:
             try:
                 print(f"[DEBUG] Selected teams: {team_a} (home), {team_b} (away)")
-                df = pd.read_csv(csv_path)
-                home_row, away_row = get_team_rows(df, team_a, team_b)
-                print(f"[DEBUG] home_row empty: {home_row.empty}, away_row empty: {away_row.empty}")
-                if home_row.empty or away_row.empty:
+                fixture = lookup_fixture(team_a, team_b)
+                if fixture is None:
                     error = "Stats not found for one or both teams in the data."
                 else:
-                    input_data = prepare_input_data(home_row, away_row)
-                    print(f"[DEBUG] Input data for prediction:\n{input_data}")
-                    pred_home_goals_rounded, pred_away_goals_rounded = predict_score(home_goals_model, away_goals_model, input_data)
+                    pred_home_goals_rounded, pred_away_goals_rounded, outcome = fixture
                     scoreline = f"{pred_home_goals_rounded} - {pred_away_goals_rounded}"
-                    outcome = determine_outcome(team_a, team_b, pred_home_goals_rounded, pred_away_goals_rounded)
                     prediction = f"{team_a} vs {team_b}: {scoreline} ({outcome})"
             except Exception as e:
                 error = f"Error: {e}"
         else:
             error = "Score prediction models not loaded."
-        return render_template('index.html', team_a=team_a, team_b=team_b, prediction=prediction, error=error, teams=teams)
-    return render_template('index.html', prediction=None, error=None, teams=teams)
+        return render_template('index.html', team_a=team_a, team_b=team_b, prediction=prediction, error=error, teams=team_stats.teams)
+    return render_template('index.html', prediction=None, error=None, teams=team_stats.teams)
+
+def predict_fixtures(home_teams, away_teams):
+    """Scores many fixtures at once. Returns (home goals, away goals, outcome codes, found) arrays."""
+    table = fixture_table
+    if table is not None:
+        return table.lookup_many(home_teams, away_teams)
+    features, found = team_stats.lookup_many(home_teams, away_teams)
+    home_goals = np.zeros(len(found), dtype=np.int16)
+    away_goals = np.zeros(len(found), dtype=np.int16)
+    if found.any():
+        # One vectorized prediction for every fixture with known teams
+        goals = np.rint(predict_goals(pd.DataFrame(features[found], columns=FEATURES)))
+        home_goals[found], away_goals[found] = goals[:, 0], goals[:, 1]
+    return home_goals, away_goals, np.sign(home_goals - away_goals), found
+
+@app.route('/api/predict_fixtures', methods=['POST'])
+def predict_fixtures_api():
+    """
+    Predicts scorelines for a list of fixtures, e.g. a matchweek or the rest of a season.
+    Body: {"fixtures": [{"home_team": "Arsenal", "away_team": "Chelsea"}, ...]}
+    """
+    payload = request.get_json(silent=True)
+    fixtures = payload.get('fixtures') if isinstance(payload, dict) else None
+    if not isinstance(fixtures, list):
+        return jsonify(error='Body must be {"fixtures": [{"home_team": ..., "away_team": ...}, ...]}'), 400
+    if len(fixtures) > max_bulk_fixtures:
+        return jsonify(error=f"At most {max_bulk_fixtures} fixtures per request, got {len(fixtures)}."), 413
+    if not all(isinstance(f, dict) and isinstance(f.get('home_team'), str) and isinstance(f.get('away_team'), str)
+               for f in fixtures):
+        return jsonify(error="Every fixture needs string home_team and away_team fields."), 400
+    if not models_loaded:
+        return jsonify(error="Score prediction models not loaded."), 503
+
+    home_teams = [f['home_team'] for f in fixtures]
+    away_teams = [f['away_team'] for f in fixtures]
+    home_goals, away_goals, outcomes, found = predict_fixtures(home_teams, away_teams)
+    predictions = []
+    for home_team, away_team, home, away, outcome, ok in zip(
+            home_teams, away_teams, home_goals.tolist(), away_goals.tolist(), outcomes.tolist(), found.tolist()):
+        if ok:
+            predictions.append({"home_team": home_team, "away_team": away_team, "home_goals": home,
+                                "away_goals": away, "scoreline": f"{home} - {away}", "outcome": OUTCOME_LABELS[outcome]})
+        else:
+            predictions.append({"home_team": home_team, "away_team": away_team,
+                                "error": "Stats not found for one or both teams in the data."})
+    return jsonify(predictions=predictions)
 
 if __name__ == '__main__':
     app.run(debug=True) 
\ No newline at end of file
@@ -0,0 +1,109 @@
+"""
+Measures how quickly a fresh inference API process becomes useful: the import
+time of inference.inference_api, and the time from spawning uvicorn to the first
+successful /predict. Servers run against a synthetic forest stored as local files,
+in three settings:
+
+- fast_start off: the model is unpickled and compiled on every start
+- cold cache: fast_start on, nothing cached yet (first start of a new version)
+- warm cache: fast_start on, the compiled forest saved by the previous start is served
+
+    python -m benchmarks.bench_cold_start --repeats 5
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.bench_forest_engine import synthetic_features
+from benchmarks.local_server import REPO_ROOT, write_config, write_synthetic_model
+
+HEAVY_MODULES = ("pandas", "sklearn", "scipy", "joblib", "boto3", "pyarrow", "yaml")
+
+IMPORT_PROBE = f"""
+import sys, time
+start = time.perf_counter()
+import inference.inference_api
+elapsed = time.perf_counter() - start
+print(elapsed, ",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))
+"""
+
+
+def measure_import(repeats):
+    timings, loaded = [], ""
+    env = {**os.environ, "PYTHONPATH": str(REPO_ROOT)}
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, "-c", IMPORT_PROBE], env=env, cwd=REPO_ROOT,
+                             capture_output=True, text=True, check=True).stdout.split()
+        timings.append(float(out[0]))
+        loaded = out[1] if len(out) > 1 else ""
+    return float(np.median(timings)) * 1000, loaded
+
+
+def time_to_first_prediction(workdir, port, body, timeout_s=120):
+    """Spawns uvicorn and returns seconds until /predict first answers 200."""
+    env = {**os.environ, "PYTHONPATH": str(REPO_ROOT)}
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "inference.inference_api:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout_s:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+                conn.request("POST", "/predict", body=body, headers={"Content-Type": "application/json"})
+                if conn.getresponse().status == 200:
+                    return time.perf_counter() - start
+            except OSError:
+                pass
+            time.sleep(0.005)
+        raise RuntimeError(f"No successful prediction within {timeout_s}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--trees", type=int, default=300)
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    import_ms, loaded = measure_import(args.repeats)
+    print(f"import inference.inference_api: {import_ms:.0f} ms (median of {args.repeats}); "
+          f"heavy modules loaded: {loaded or 'none'}")
+
+    body = json.dumps(synthetic_features(np.random.default_rng(0), 1).to_dict("records")[0]).encode()
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        model_path, encoder_path = write_synthetic_model(workdir, args.trees)
+        cache_dir = workdir / "artifact-cache"
+
+        results = {"fast_start off": [], "cold cache": [], "warm cache": []}
+        for _ in range(args.repeats):
+            write_config(workdir, model_path, encoder_path, fast_start=False)
+            results["fast_start off"].append(time_to_first_prediction(workdir, args.port, body))
+            write_config(workdir, model_path, encoder_path, fast_start=True)
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            results["cold cache"].append(time_to_first_prediction(workdir, args.port, body))
+            results["warm cache"].append(time_to_first_prediction(workdir, args.port, body))
+
+    print(f"{'start':<16} {'p50 to first prediction':>24} {'max':>9}")
+    for name, timings in results.items():
+        print(f"{name:<16} {np.median(timings) * 1000:>22.0f}ms {max(timings) * 1000:>7.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Compares the wide raw CSV with the typed Parquet dataset written by
+scripts/match_data.py: size on disk, and the time and peak memory of the read
+preprocess_data makes (10 of ~120 columns, all matches, and only the latest
+season). Synthetic matches from 1x to 100x the size of data/enhanced_data.csv
+are padded with betting-odds columns to the width of the real raw files.
+Each read runs in a fresh interpreter (Linux only, peak RSS comes from
+/proc/self/status); its peak RSS includes the interpreter,
+pandas and pyarrow (about 100MB on their own).
+
+    python -m benchmarks.bench_datasets --scales 1 10 100
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.local_server import REPO_ROOT
+from benchmarks.synthetic import BASELINE_MATCHES, synthetic_raw_matches
+
+sys.path.append(str(REPO_ROOT / "scripts"))
+from match_data import RAW_FEATURE_SOURCE_COLS, to_raw_table, write_dataset  # noqa: E402
+
+# Betting odds and other numeric columns in data/enhanced_data.csv besides the ones synthetic.py generates
+ODDS_COLUMNS = 100
+
+READ_SCRIPT = """
+import json, sys, time
+sys.path.append({scripts!r})
+from match_data import read_dataset
+path, columns, since = sys.argv[1], json.loads(sys.argv[2]), sys.argv[3] or None
+start = time.perf_counter()
+df = read_dataset(path, columns=columns, since=since)
+elapsed = time.perf_counter() - start
+# VmHWM starts over at exec; ru_maxrss would carry over this benchmark's own peak
+with open("/proc/self/status") as status:
+    peak_kb = int(next(line for line in status if line.startswith("VmHWM")).split()[1])
+print(json.dumps({{"seconds": elapsed, "rows": len(df), "peak_mb": peak_kb / 1024}}))
+"""
+
+
+def wide_raw_matches(n_matches, seed=42):
+    """Synthetic raw matches with football-data.co.uk date strings and ODDS_COLUMNS odds columns."""
+    raw = synthetic_raw_matches(n_matches, seed=seed)
+    rng = np.random.default_rng(seed)
+    odds = np.round(rng.uniform(1.05, 15.0, (len(raw), ODDS_COLUMNS)), 2)
+    raw = pd.concat([raw, pd.DataFrame(odds, columns=[f"Odds{i:03d}" for i in range(ODDS_COLUMNS)])], axis=1)
+    raw["Date"] = raw["Date"].dt.strftime("%d/%m/%Y")
+    return raw
+
+
+def size_mb(path):
+    path = Path(path)
+    files = path.iterdir() if path.is_dir() else [path]
+    return sum(f.stat().st_size for f in files) / 1e6
+
+
+def timed_read(path, columns, since):
+    """Best of three reads, each in its own interpreter."""
+    runs = []
+    for _ in range(3):
+        out = subprocess.run(
+            [sys.executable, "-c", READ_SCRIPT.format(scripts=str(REPO_ROOT / "scripts")),
+             str(path), json.dumps(columns), since or ""],
+            check=True, capture_output=True, text=True,
+        )
+        runs.append(json.loads(out.stdout))
+    return min(runs, key=lambda run: run["seconds"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10, 100])
+    args = parser.parse_args()
+
+    print(f"{'scale':>6} {'matches':>9} {'format':>8} {'size':>9} {'read':>9} {'peak RSS':>9} "
+          f"{'latest season':>14}")
+    for scale in args.scales:
+        raw = wide_raw_matches(int(BASELINE_MATCHES * scale))
+        latest_season = f"{raw['Date'].str[-4:].astype(int).max() - 1}-07-01"
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = os.path.join(tmp, "raw.csv")
+            parquet_path = os.path.join(tmp, "raw.parquet")
+            raw.to_csv(csv_path, index=False)
+            write_dataset(to_raw_table(raw), parquet_path)
+            for label, path in (("csv", csv_path), ("parquet", parquet_path)):
+                full = timed_read(path, RAW_FEATURE_SOURCE_COLS, None)
+                recent = timed_read(path, RAW_FEATURE_SOURCE_COLS, latest_season)
+                print(f"{scale:>5g}x {len(raw):>9} {label:>8} {size_mb(path):>7.1f}MB "
+                      f"{full['seconds'] * 1000:>7.0f}ms {full['peak_mb']:>7.0f}MB "
+                      f"{recent['seconds'] * 1000:>12.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Compares the compiled forest engine with the sklearn path /predict used before
+(DataFrame construction + predict + predict_proba) on a forest shaped like the
+tuned EPL model.
+
+    python -m benchmarks.bench_forest_engine --trees 300 --repeats 50
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+from inference.forest_engine import CompiledForest
+
+FEATURES = [
+    'avg_GoalsScored_home', 'avg_GoalsConceded_home', 'avg_Shots_home', 'avg_ShotsOnTarget_home',
+    'avg_GoalsScored_away', 'avg_GoalsConceded_away', 'avg_Shots_away', 'avg_ShotsOnTarget_away'
+]
+
+
+def synthetic_features(rng, n_rows):
+    """Feature rows with roughly the scale of EPL rolling averages."""
+    goals = rng.gamma(2.0, 0.7, size=(n_rows, 4))
+    shots = rng.normal(12.0, 3.0, size=(n_rows, 2)).clip(2, 30)
+    on_target = shots * rng.uniform(0.25, 0.45, size=(n_rows, 2))
+    x = np.column_stack([goals[:, 0], goals[:, 1], shots[:, 0], on_target[:, 0],
+                         goals[:, 2], goals[:, 3], shots[:, 1], on_target[:, 1]])
+    return pd.DataFrame(x, columns=FEATURES)
+
+
+def time_call(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return np.percentile(timings, 50) * 1000, np.percentile(timings, 99) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trees", type=int, default=300)
+    parser.add_argument("--train-rows", type=int, default=2000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--repeats", type=int, default=30)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    x_train = synthetic_features(rng, args.train_rows)
+    y_train = rng.choice(["A", "D", "H"], size=args.train_rows, p=[0.3, 0.25, 0.45])
+    model = RandomForestClassifier(n_estimators=args.trees, max_depth=None, random_state=42).fit(x_train, y_train)
+
+    start = time.perf_counter()
+    engine = CompiledForest.from_sklearn(model, feature_names=FEATURES)
+    print(f"Compiled {engine.n_trees} trees ({len(engine.feature)} nodes, depth {engine.max_depth}) "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    print(f"{'rows':>7} {'sklearn p50':>12} {'sklearn p99':>12} {'engine p50':>11} {'engine p99':>11} {'speedup':>8} identical")
+    for n_rows in args.batch_sizes:
+        x = synthetic_features(rng, n_rows)
+        records = x.to_dict("records")
+        matrix = x.to_numpy()
+
+        def sklearn_path():
+            input_df = pd.DataFrame(records)
+            model.predict(input_df)
+            model.predict_proba(input_df)
+
+        def engine_path():
+            engine.predict_with_proba(np.array([[r[name] for name in FEATURES] for r in records]))
+
+        repeats = max(3, args.repeats if n_rows <= 1000 else args.repeats // 10)
+        sk_p50, sk_p99 = time_call(sklearn_path, repeats)
+        en_p50, en_p99 = time_call(engine_path, repeats)
+
+        labels, proba = engine.predict_with_proba(matrix)
+        identical = (np.array_equal(proba, model.predict_proba(x))
+                     and np.array_equal(labels, model.predict(x)))
+        print(f"{n_rows:>7} {sk_p50:>10.2f}ms {sk_p99:>10.2f}ms {en_p50:>9.2f}ms {en_p99:>9.2f}ms "
+              f"{sk_p50 / en_p50:>7.1f}x {identical}")
+
+
+if __name__ == "__main__":
+    main()
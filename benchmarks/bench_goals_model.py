@@ -0,0 +1,92 @@
+"""
+Compares one multi-output goals forest with the separate home and away
+forests trained by scripts/train_regression.py: training time, artifact size,
+prediction latency and MAE. Uses data/processed_epl_data.csv when present,
+otherwise synthetic features and goals.
+
+    python -m benchmarks.bench_goals_model --trees 100 --repeats 50
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import train_test_split
+
+from benchmarks.bench_forest_engine import FEATURES, synthetic_features, time_call
+from benchmarks.local_server import REPO_ROOT
+
+
+def load_data(rows):
+    csv_path = REPO_ROOT / "data" / "processed_epl_data.csv"
+    if csv_path.exists():
+        df = pd.read_csv(csv_path).dropna(subset=FEATURES + ["FTHG", "FTAG"])
+        print(f"Using {len(df)} matches from {csv_path}")
+        return df[FEATURES], df[["FTHG", "FTAG"]]
+    rng = np.random.default_rng(42)
+    x = synthetic_features(rng, rows)
+    goals = rng.poisson(np.column_stack([x.iloc[:, 0] * 0.6 + 0.6, x.iloc[:, 4] * 0.5 + 0.4]))
+    print(f"Using {rows} synthetic matches")
+    return x, pd.DataFrame(goals, columns=["FTHG", "FTAG"])
+
+
+def artifact_mb(*models):
+    total = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, model in enumerate(models):
+            path = os.path.join(tmp, f"{i}.pkl")
+            joblib.dump(model, path)
+            total += os.path.getsize(path)
+    return total / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--rows", type=int, default=5000, help="synthetic rows when the processed CSV is missing")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 100, 1936])
+    parser.add_argument("--repeats", type=int, default=30)
+    args = parser.parse_args()
+
+    x, y = load_data(args.rows)
+    x_train, x_test, y_train, y_test = train_test_split(x, y, test_size=0.2, random_state=42)
+
+    def forest():
+        return RandomForestRegressor(n_estimators=args.trees, random_state=42, max_features=1.0)
+
+    start = time.perf_counter()
+    home_model = forest().fit(x_train, y_train["FTHG"])
+    away_model = forest().fit(x_train, y_train["FTAG"])
+    two_train_s = time.perf_counter() - start
+    start = time.perf_counter()
+    goals_model = forest().fit(x_train, y_train)
+    multi_train_s = time.perf_counter() - start
+
+    two_pred = np.column_stack([home_model.predict(x_test), away_model.predict(x_test)])
+    multi_pred = goals_model.predict(x_test)
+    print(f"{'':<14} {'train':>8} {'artifact':>10} {'home MAE':>9} {'away MAE':>9}")
+    for name, train_s, size, pred in [
+        ("two models", two_train_s, artifact_mb(home_model, away_model), two_pred),
+        ("multi-output", multi_train_s, artifact_mb(goals_model), multi_pred),
+    ]:
+        print(f"{name:<14} {train_s:>7.2f}s {size:>8.1f}MB "
+              f"{mean_absolute_error(y_test['FTHG'], pred[:, 0]):>9.3f} "
+              f"{mean_absolute_error(y_test['FTAG'], pred[:, 1]):>9.3f}")
+
+    print(f"\n{'rows':>7} {'two p50':>9} {'two p99':>9} {'multi p50':>10} {'multi p99':>10} {'speedup':>8}")
+    rng = np.random.default_rng(7)
+    for n_rows in args.batch_sizes:
+        batch = synthetic_features(rng, n_rows)
+        two_p50, two_p99 = time_call(lambda: (home_model.predict(batch), away_model.predict(batch)), args.repeats)
+        multi_p50, multi_p99 = time_call(lambda: goals_model.predict(batch), args.repeats)
+        print(f"{n_rows:>7} {two_p50:>7.2f}ms {two_p99:>7.2f}ms {multi_p50:>8.2f}ms {multi_p99:>8.2f}ms "
+              f"{two_p50 / multi_p50:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
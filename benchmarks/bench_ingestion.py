@@ -0,0 +1,84 @@
+"""
+Wall-clock time of raw data ingestion, serial vs. parallel. Synthetic
+football-data.co.uk CSVs, one per league and season, are parsed and combined
+into a partitioned Parquet dataset by scripts/combine_local_data.py with 1
+worker process and with each --workers count. With --bucket the combined
+dataset is also uploaded to s3://<bucket>/<--prefix> one file and one part at a
+time, then with the configured concurrency (AWS credentials required).
+
+    python -m benchmarks.bench_ingestion --leagues 20 --seasons 10 --workers 2 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_datasets import wide_raw_matches
+from benchmarks.local_server import REPO_ROOT
+from benchmarks.synthetic import round_robin
+
+sys.path.append(str(REPO_ROOT / "scripts"))
+from combine_local_data import combine_local_data  # noqa: E402
+from match_data import parse_match_dates, season_of  # noqa: E402
+
+
+def write_sources(directory, n_leagues, n_seasons):
+    """Writes one CSV per league and season and returns them as ingestion sources."""
+    season_matches = sum(len(pairs) for pairs in round_robin(20))
+    raw = wide_raw_matches(season_matches * n_leagues * n_seasons)
+    seasons = season_of(parse_match_dates(raw["Date"]))
+    sources = []
+    for (league, season), df in raw.groupby([raw["Div"], seasons]):
+        path = os.path.join(directory, f"{league}_{season}.csv")
+        df.to_csv(path, index=False)
+        sources.append({"league": league, "season": int(season), "path": path})
+    return sources, len(raw)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--leagues", type=int, default=20)
+    parser.add_argument("--seasons", type=int, default=10)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--bucket", help="also benchmark the S3 upload into this bucket")
+    parser.add_argument("--prefix", default="benchmarks/ingestion/raw.parquet")
+    parser.add_argument("--upload-concurrency", type=int, default=8)
+    parser.add_argument("--multipart-concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sources, n_matches = write_sources(tmp, args.leagues, args.seasons)
+        output_path = os.path.join(tmp, "raw.parquet")
+        print(f"{len(sources)} files, {n_matches} matches, {os.cpu_count()} CPU cores")
+
+        def ingest(workers):
+            config = {"ingestion": {"sources": sources, "workers": workers}}
+            return timed(lambda: combine_local_data(output_path, config))
+
+        serial_s = ingest(1)
+        results = [(workers, ingest(workers)) for workers in args.workers]
+        print(f"\n{'workers':>8} {'parse + write':>14} {'speedup':>8}")
+        print(f"{1:>8} {serial_s:>13.2f}s {1:>7.1f}x")
+        for workers, seconds in results:
+            print(f"{workers:>8} {seconds:>13.2f}s {serial_s / seconds:>7.1f}x")
+
+        if args.bucket:
+            from data_collection import upload_path
+            serial_config = {"upload_concurrency": 1, "multipart_concurrency": 1}
+            concurrent_config = {"upload_concurrency": args.upload_concurrency,
+                                 "multipart_concurrency": args.multipart_concurrency}
+            serial_upload_s = timed(lambda: upload_path(output_path, args.bucket, args.prefix, serial_config))
+            concurrent_upload_s = timed(lambda: upload_path(output_path, args.bucket, args.prefix, concurrent_config))
+            print(f"\nupload: serial {serial_upload_s:.2f}s, concurrent {concurrent_upload_s:.2f}s "
+                  f"({serial_upload_s / concurrent_upload_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Peak memory and run time of preprocessing as match history grows: the
+in-memory pass (read every match, engineer features, write one dataset) vs.
+preprocess_partitioned, which works through one season at a time. Synthetic
+seasons of a fixed number of leagues are written as a raw Parquet dataset
+first. Each run is a fresh interpreter and its peak RSS (VmHWM, Linux only)
+includes pandas and pyarrow themselves.
+
+    python -m benchmarks.bench_partitioned_preprocess --leagues 20 --seasons 5 15 30 60
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.local_server import REPO_ROOT
+from benchmarks.synthetic import round_robin, synthetic_raw_matches
+
+sys.path.append(str(REPO_ROOT / "scripts"))
+from match_data import dataset_partitions, to_raw_table, write_dataset  # noqa: E402
+
+RUN_SCRIPT = """
+import json, sys, time
+sys.path.append({scripts!r})
+import pyarrow as pa
+from match_data import PROCESSED_SCHEMA, RAW_FEATURE_SOURCE_COLS, read_dataset, write_dataset
+from preprocess import engineer_features, preprocess_partitioned, team_windows
+mode, raw_path, processed_path = sys.argv[1:4]
+start = time.perf_counter()
+if mode == "partitioned":
+    preprocess_partitioned(raw_path, processed_path)
+else:
+    df = read_dataset(raw_path, columns=RAW_FEATURE_SOURCE_COLS)
+    processed = engineer_features(df)
+    write_dataset(pa.Table.from_pandas(processed, schema=PROCESSED_SCHEMA, preserve_index=False), processed_path)
+    team_windows(df)
+elapsed = time.perf_counter() - start
+with open("/proc/self/status") as status:
+    peak_kb = int(next(line for line in status if line.startswith("VmHWM")).split()[1])
+print(json.dumps({{"seconds": elapsed, "peak_mb": peak_kb / 1024}}))
+"""
+
+
+def run(mode, raw_path, processed_path):
+    out = subprocess.run(
+        [sys.executable, "-c", RUN_SCRIPT.format(scripts=str(REPO_ROOT / "scripts")), mode, raw_path, processed_path],
+        check=True, capture_output=True, text=True,
+    )
+    # preprocess_partitioned prints a line per season before the result
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--leagues", type=int, default=20)
+    parser.add_argument("--seasons", type=int, nargs="+", default=[5, 15, 30, 60])
+    args = parser.parse_args()
+    season_matches = sum(len(pairs) for pairs in round_robin(20))
+
+    print(f"{'seasons':>7} {'matches':>9} {'partitions':>11} {'in-memory':>10} {'peak RSS':>9} "
+          f"{'partitioned':>12} {'peak RSS':>9}")
+    for seasons in args.seasons:
+        raw = synthetic_raw_matches(season_matches * seasons * args.leagues, n_leagues=args.leagues)
+        raw["Date"] = raw["Date"].dt.strftime("%d/%m/%Y")
+        with tempfile.TemporaryDirectory() as tmp:
+            raw_path = os.path.join(tmp, "raw")
+            write_dataset(to_raw_table(raw), raw_path)
+            in_memory = run("in-memory", raw_path, os.path.join(tmp, "processed"))
+            partitioned = run("partitioned", raw_path, os.path.join(tmp, "partitioned"))
+            print(f"{seasons:>7} {len(raw):>9} {len(dataset_partitions(raw_path)):>11} "
+                  f"{in_memory['seconds']:>9.2f}s {in_memory['peak_mb']:>7.0f}MB "
+                  f"{partitioned['seconds']:>11.2f}s {partitioned['peak_mb']:>7.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Compares the vectorized rolling-feature engine in scripts/preprocess.py with the
+groupby().apply() + merge implementation it replaced, on synthetic raw matches
+from 1x to 100x the size of data/enhanced_data.csv. The last column is an
+incremental run that adds the latest matchday to the saved rolling state.
+
+    python -m benchmarks.bench_preprocess --scales 1 10 100
+"""
+import argparse
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.local_server import REPO_ROOT
+from benchmarks.synthetic import BASELINE_MATCHES, synthetic_raw_matches
+
+sys.path.append(str(REPO_ROOT / "scripts"))
+from preprocess import FINAL_COLS, engineer_features, team_windows  # noqa: E402
+
+
+def legacy_engineer_features(df):
+    """The previous implementation: per-team rolling in a groupby callback, merged back on (Date, Team)."""
+    df = df.dropna(subset=['HomeTeam', 'AwayTeam', 'FTHG', 'FTAG', 'FTR'])
+    df_home = df[['Date', 'HomeTeam', 'FTHG', 'FTAG', 'HS', 'HST']].rename(
+        columns={'HomeTeam': 'Team', 'FTHG': 'GoalsScored', 'FTAG': 'GoalsConceded', 'HS': 'Shots', 'HST': 'ShotsOnTarget'}
+    )
+    df_away = df[['Date', 'AwayTeam', 'FTAG', 'FTHG', 'AS', 'AST']].rename(
+        columns={'AwayTeam': 'Team', 'FTAG': 'GoalsScored', 'FTHG': 'GoalsConceded', 'AS': 'Shots', 'AST': 'ShotsOnTarget'}
+    )
+    df_team_stats = pd.concat([df_home, df_away]).sort_values('Date')
+    cols = ['GoalsScored', 'GoalsConceded', 'Shots', 'ShotsOnTarget']
+    new_cols = [f"avg_{c}" for c in cols]
+
+    def get_rolling_averages(group):
+        group = group.sort_values("Date")
+        group[new_cols] = group[cols].rolling(5, closed='left', min_periods=1).mean()
+        return group.dropna(subset=new_cols)
+
+    # Team is taken from the group key, so this runs on pandas 2 and 3 alike
+    df_rolling = df_team_stats.groupby("Team")[['Date'] + cols].apply(get_rolling_averages)
+    df_rolling = df_rolling.reset_index(level=0).reset_index(drop=True)
+
+    for side in ("home", "away"):
+        stats = df_rolling.rename(columns={c: f"{c}_{side}" for c in new_cols})
+        stats = stats[['Date', 'Team'] + [f"{c}_{side}" for c in new_cols]]
+        team_col = 'HomeTeam' if side == "home" else 'AwayTeam'
+        df = df.merge(stats, left_on=['Date', team_col], right_on=['Date', 'Team'], how='left').drop('Team', axis=1)
+    return df[FINAL_COLS].dropna()
+
+
+def best_of(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'scale':>6} {'matches':>9} {'legacy':>9} {'vectorized':>11} {'speedup':>8} {'identical':>9} {'incremental':>12}")
+    for scale in args.scales:
+        raw = synthetic_raw_matches(int(BASELINE_MATCHES * scale))
+        legacy_s, expected = best_of(lambda: legacy_engineer_features(raw), args.repeats)
+        vectorized_s, actual = best_of(lambda: engineer_features(raw), args.repeats)
+        identical = actual.reset_index(drop=True).equals(expected.reset_index(drop=True))
+
+        latest = raw["Date"] == raw["Date"].max()
+        state = team_windows(raw[~latest])
+        incremental_s, _ = best_of(lambda: (engineer_features(raw[latest], state), team_windows(raw[latest], state)),
+                                   args.repeats)
+        print(f"{scale:>5g}x {len(raw):>9} {legacy_s * 1000:>7.0f}ms {vectorized_s * 1000:>9.0f}ms "
+              f"{legacy_s / vectorized_s:>7.1f}x {str(identical):>9} {incremental_s * 1000:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Compares the outcome model's hyperparameter searches in scripts/train.py:
+RandomizedSearchCV with full-size forests vs. successive halving over tree
+count and rows (scripts/halving_search.py). Reports wall and CPU time, trees
+fitted, best cross-validation accuracy and hold-out accuracy. Uses
+data/processed_epl_data.csv when present, otherwise synthetic matches;
+--scale multiplies the synthetic data.
+
+    python -m benchmarks.bench_search --candidates 20 --scale 1 4
+"""
+import argparse
+import sys
+import time
+
+import pandas as pd
+from scipy.stats import randint
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import RandomizedSearchCV, train_test_split
+from sklearn.preprocessing import LabelEncoder
+
+from benchmarks.local_server import REPO_ROOT
+from benchmarks.synthetic import synthetic_raw_matches
+
+sys.path.append(str(REPO_ROOT / "scripts"))
+from halving_search import HalvingForestSearch  # noqa: E402
+from match_data import FEATURE_COLS  # noqa: E402
+from preprocess import engineer_features  # noqa: E402
+
+# The distribution train.py searches
+PARAM_DIST = {
+    'n_estimators': randint(100, 301),
+    'max_depth': [None, 10, 20, 30, 40, 50],
+    'min_samples_split': randint(2, 11),
+    'min_samples_leaf': randint(1, 5),
+    'max_features': ['sqrt', 'log2', None],
+    'class_weight': [None, 'balanced']
+}
+
+
+def datasets(scales):
+    csv_path = REPO_ROOT / "data" / "processed_epl_data.csv"
+    if csv_path.exists():
+        yield f"{csv_path.name}", pd.read_csv(csv_path).dropna(subset=FEATURE_COLS + ["FTR"])
+    for scale in scales:
+        yield f"synthetic x{scale}", engineer_features(synthetic_raw_matches(760 * scale, seed=scale))
+
+
+def run(search, x_train, y_train, x_test, y_test):
+    wall, cpu = time.perf_counter(), time.process_time()
+    search.fit(x_train, y_train)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    accuracy = accuracy_score(y_test, search.best_estimator_.predict(x_test))
+    return wall, cpu, search.best_score_, accuracy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--max-trees", type=int, default=300)
+    parser.add_argument("--factor", type=int, default=3)
+    parser.add_argument("--scale", type=int, nargs="*", default=[1, 4], help="synthetic data sizes, in multiples of 760 matches")
+    args = parser.parse_args()
+
+    for name, df in datasets(args.scale):
+        x = df[FEATURE_COLS]
+        y = LabelEncoder().fit_transform(df["FTR"])
+        x_train, x_test, y_train, y_test = train_test_split(x, y, test_size=0.2, random_state=42, stratify=y)
+        randomized = RandomizedSearchCV(RandomForestClassifier(random_state=42), PARAM_DIST, n_iter=args.candidates,
+                                        scoring='accuracy', n_jobs=-1, cv=3, random_state=42)
+        halving = HalvingForestSearch(RandomForestClassifier(random_state=42, n_jobs=-1), PARAM_DIST,
+                                      n_candidates=args.candidates, factor=args.factor, max_trees=args.max_trees)
+        randomized_result = run(randomized, x_train, y_train, x_test, y_test)
+        halving_result = run(halving, x_train, y_train, x_test, y_test)
+        # Trees RandomizedSearchCV grows: every candidate on every fold, plus the refit
+        randomized_trees = sum(randomized.cv_results_["param_n_estimators"]) * 3 + randomized.best_params_["n_estimators"]
+
+        print(f"\n{name}: {len(x_train)} training matches, {args.candidates} candidates")
+        print(f"{'search':<12} {'wall':>8} {'cpu':>8} {'trees':>7} {'cv acc':>7} {'test acc':>9}")
+        for label, trees, (wall, cpu, cv_score, accuracy) in [
+            ("randomized", randomized_trees, randomized_result),
+            ("halving", halving.trees_fitted_, halving_result),
+        ]:
+            print(f"{label:<12} {wall:>7.2f}s {cpu:>7.2f}s {trees:>7} {cv_score:>7.3f} {accuracy:>9.3f}")
+        rungs = ", ".join(f"{rung['candidates']}x{rung['trees']} trees on {rung['sample_fraction']:.0%}" for rung in halving.history_)
+        print(f"halving: {randomized_result[1] / halving_result[1]:.1f}x less CPU; rungs: {rungs}")
+
+
+if __name__ == "__main__":
+    main()
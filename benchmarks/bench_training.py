@@ -0,0 +1,173 @@
+"""
+Run time and resource use of the training pipeline on synthetic EPL-shaped
+matches at several multiples of the current data size. For each scale,
+preprocess_data turns a raw Parquet dataset into processed features, then
+fit_outcome_model (train_model without MLflow tracking) runs the configured
+search once per --n-jobs setting, without compaction or the cascade. Local
+paths stand in for S3.
+
+Each step runs in a fresh interpreter. It reports wall time, CPU time (the
+process and its joblib workers), CPU utilization (CPU time / wall time, in
+cores) and peak RSS (VmHWM, Linux only, the largest of the process and its
+workers). Results are written as JSON with --output. With --baseline the run
+fails (exit code 1) when a step's wall time or peak RSS is more than
+--tolerance (and at least 0.5s / 20MB) worse than in the baseline;
+--save-baseline stores the run as the new baseline. Baselines are only
+comparable on the same machine.
+
+    python -m benchmarks.bench_training --scales 1 10 100 --n-jobs 1 -1 \\
+        --baseline benchmarks/training_baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import sklearn
+import yaml
+
+from benchmarks.local_server import REPO_ROOT
+from benchmarks.synthetic import BASELINE_MATCHES, synthetic_raw_matches
+
+sys.path.append(str(REPO_ROOT / "scripts"))
+from match_data import to_raw_table, write_dataset  # noqa: E402
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "training_baseline.json"
+# Sub-second steps vary by more than any tolerance between runs
+MIN_REGRESSION = {"wall_s": 0.5, "peak_mb": 20}
+
+RUN_SCRIPT = """
+import json, resource, sys, time
+sys.path.append({scripts!r})
+step, args = sys.argv[1], json.loads(sys.argv[2])
+
+def cpu_seconds():
+    return sum(usage.ru_utime + usage.ru_stime for usage in
+               (resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)))
+
+if step == "preprocess":
+    from preprocess import preprocess_data
+    start_wall, start_cpu = time.perf_counter(), cpu_seconds()
+    preprocess_data(args["raw_path"], incremental=False, partitioned=False,
+                    processed_path=args["processed_path"], config=args["config"])
+else:
+    from match_data import FEATURE_COLS, read_dataset
+    from train import fit_outcome_model
+    start_wall, start_cpu = time.perf_counter(), cpu_seconds()
+    df = read_dataset(args["processed_path"], columns=FEATURE_COLS + ["FTR"])
+    fit_outcome_model(df, args["config"]["training"], n_jobs=args["n_jobs"])
+    # Stop the joblib workers so their CPU time and peak RSS are counted
+    from joblib.externals.loky import get_reusable_executor
+    get_reusable_executor().shutdown(wait=True)
+wall = time.perf_counter() - start_wall
+cpu = cpu_seconds() - start_cpu
+with open("/proc/self/status") as status:
+    peak_kb = int(next(line for line in status if line.startswith("VmHWM")).split()[1])
+peak_kb = max(peak_kb, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+print(json.dumps({{"wall_s": wall, "cpu_s": cpu, "cpu_util": cpu / wall, "peak_mb": peak_kb / 1024}}))
+"""
+
+
+def run_step(step, args):
+    out = subprocess.run(
+        [sys.executable, "-c", RUN_SCRIPT.format(scripts=str(REPO_ROOT / "scripts")), step, json.dumps(args)],
+        check=True, capture_output=True, text=True, cwd=REPO_ROOT,
+    )
+    # The pipeline prints progress before the result
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def benchmark_config(directory):
+    """
+    configs/config.yaml with a local feature store and no memoized search fits,
+    so every run trains. Compaction and the cascade are switched off: the
+    baseline times preprocessing and the search alone.
+    """
+    with open(REPO_ROOT / "configs" / "config.yaml") as f:
+        config = yaml.safe_load(f)
+    config.setdefault("feature_store", {})["path"] = os.path.join(directory, "team_features.sqlite")
+    training = config.setdefault("training", {})
+    training.update(cache_dir="", time_budget_s=None)
+    for stage in ("compaction", "cascade"):
+        training[stage] = dict(training.get(stage) or {}, enabled=False)
+    return config
+
+
+def key(result):
+    return result["step"], result["scale"], result["n_jobs"]
+
+
+def compare(results, baseline, tolerance):
+    """Steps whose wall time or peak RSS is more than tolerance worse than in the baseline."""
+    previous = {key(result): result for result in baseline["results"]}
+    failures = []
+    for result in results:
+        before = previous.get(key(result))
+        if before is None:
+            continue
+        for metric in ("wall_s", "peak_mb"):
+            limit = before[metric] + max(before[metric] * tolerance, MIN_REGRESSION[metric])
+            if result[metric] > limit:
+                failures.append(f"{result['step']} x{result['scale']} n_jobs={result['n_jobs']}: {metric} "
+                                f"{result[metric]:.2f} > {limit:.2f} (baseline {before[metric]:.2f})")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100],
+                        help=f"data sizes in multiples of {BASELINE_MATCHES} matches")
+    parser.add_argument("--n-jobs", type=int, nargs="+", default=[1, -1])
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help=f"baseline results to compare against (e.g. {DEFAULT_BASELINE.name}, "
+                                           "or to write with --save-baseline)")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    args = parser.parse_args()
+    if args.save_baseline and not args.baseline:
+        parser.error("--save-baseline needs --baseline")
+
+    results = []
+    print(f"{'step':<11} {'scale':>5} {'matches':>8} {'n_jobs':>6} {'wall':>8} {'cpu':>8} {'cpu util':>8} {'peak RSS':>9}")
+    for scale in args.scales:
+        raw = synthetic_raw_matches(BASELINE_MATCHES * scale)
+        raw["Date"] = raw["Date"].dt.strftime("%d/%m/%Y")
+        with tempfile.TemporaryDirectory() as tmp:
+            step_args = {"raw_path": os.path.join(tmp, "raw.parquet"),
+                         "processed_path": os.path.join(tmp, "processed.parquet"),
+                         "config": benchmark_config(tmp)}
+            write_dataset(to_raw_table(raw), step_args["raw_path"])
+            steps = [("preprocess", None)] + [("train", n_jobs) for n_jobs in args.n_jobs]
+            for step, n_jobs in steps:
+                result = {"step": step, "scale": scale, "matches": len(raw), "n_jobs": n_jobs,
+                          **run_step(step, dict(step_args, n_jobs=n_jobs))}
+                results.append(result)
+                print(f"{step:<11} {scale:>4}x {len(raw):>8} {str(n_jobs or '-'):>6} {result['wall_s']:>7.2f}s "
+                      f"{result['cpu_s']:>7.2f}s {result['cpu_util']:>8.2f} {result['peak_mb']:>7.0f}MB")
+
+    report = {
+        "machine": {"cpu_count": os.cpu_count(), "python": platform.python_version(), "sklearn": sklearn.__version__},
+        "search": benchmark_config("")["training"].get("search"),
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    if args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(report, indent=2))
+        print(f"Saved baseline to {args.baseline}")
+    elif args.baseline:
+        failures = compare(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        if failures:
+            print("REGRESSION against baseline:")
+            for failure in failures:
+                print(f"  {failure}")
+            sys.exit(1)
+        print(f"Within {args.tolerance:.0%} of baseline {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Measures /predict throughput of the inference API under gunicorn as the number of
+worker processes grows. Each run serves a synthetic forest shaped like the tuned
+EPL model from local files (inference.reload.source: local) with the result cache
+off, so every request runs the model.
+
+    python -m benchmarks.bench_workers --workers 1 2 4 --clients 16 --duration 10
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.bench_forest_engine import synthetic_features
+from benchmarks.local_server import start_server, stop_server, write_config, write_synthetic_model
+
+
+def client(port, duration, seed, results):
+    """Sends /predict requests over one keep-alive connection until duration elapses."""
+    rng = np.random.default_rng(seed)
+    bodies = [json.dumps(row).encode() for row in synthetic_features(rng, 1000).to_dict("records")]
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    latencies, errors = [], 0
+    stop_at = time.perf_counter() + duration
+    i = 0
+    while time.perf_counter() < stop_at:
+        start = time.perf_counter()
+        conn.request("POST", "/predict", body=bodies[i % len(bodies)], headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        errors += response.status != 200
+        i += 1
+    results.put((latencies, errors))
+
+
+def run_load(port, clients, duration):
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=client, args=(port, duration, seed, results)) for seed in range(clients)]
+    for proc in procs:
+        proc.start()
+    collected = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+    latencies = np.concatenate([np.array(lat) for lat, _ in collected]) * 1000
+    errors = sum(err for _, err in collected)
+    return len(latencies) / duration, np.percentile(latencies, 50), np.percentile(latencies, 99), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--clients", type=int, default=16, help="concurrent client processes")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per worker count")
+    parser.add_argument("--trees", type=int, default=300)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"{multiprocessing.cpu_count()} CPU cores, {args.clients} clients, {args.duration:g}s per run")
+    print(f"{'workers':>7} {'req/s':>9} {'p50':>9} {'p99':>9} {'errors':>6} {'vs first':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        model_path, encoder_path = write_synthetic_model(workdir, args.trees)
+        write_config(workdir, model_path, encoder_path, result_cache=False)
+        baseline = None
+        for workers in args.workers:
+            server = start_server(workdir, workers, args.port)
+            try:
+                throughput, p50, p99, errors = run_load(args.port, args.clients, args.duration)
+            finally:
+                stop_server(server)
+            baseline = baseline or throughput
+            print(f"{workers:>7} {throughput:>9.0f} {p50:>7.2f}ms {p99:>7.2f}ms {errors:>6} "
+                  f"{throughput / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Record-and-replay load test for the inference API.
+
+Traffic is recorded by the API itself when inference.recording.enabled is set
+in configs/config.yaml (appended to benchmarks/requests.jsonl), or synthesized:
+
+    python -m benchmarks.loadtest synthesize --count 2000
+
+Replay it against a running API (--url), or one started locally with gunicorn
+(--start-server, optionally serving a synthetic forest with --synthetic-model).
+The report includes p50/p95/p99 latency, throughput and error rate.
+
+    python -m benchmarks.loadtest replay --start-server --synthetic-model \\
+        --concurrency 16 --duration 30 --baseline benchmarks/loadtest_baseline.json --tolerance 0.25
+
+benchmarks/loadtest_baseline.json is that run on traffic from `synthesize
+--count 2000` (the default seed), recorded on a single-core machine; replaying
+it elsewhere needs a baseline saved there with --save-baseline.
+
+--rate R sends R requests/s whatever the server's speed (open loop) and measures
+latency from when each request was due, so queueing behind a slow server is
+counted. Without it every client sends its next request as soon as the previous
+one returns. With --baseline the run fails (exit code 1) when p95/p99 latency or
+throughput is more than --tolerance worse, or the error rate rises by more than
+--max-error-increase. --save-baseline stores the run as the new baseline.
+"""
+import argparse
+import base64
+import http.client
+import itertools
+import json
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from benchmarks.bench_forest_engine import synthetic_features
+from benchmarks.local_server import start_server, stop_server, write_config, write_synthetic_model
+
+DEFAULT_REQUESTS = Path(__file__).resolve().parent / "requests.jsonl"
+
+
+def load_requests(path):
+    """Reads recorded requests, decoding each body to bytes."""
+    entries = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "body_b64" in entry:
+                entry["body"] = base64.b64decode(entry.pop("body_b64"))
+            else:
+                entry["body"] = entry.get("body", "").encode("utf-8")
+            entries.append(entry)
+    return entries
+
+
+def synthesize(path, count, batch_fraction, batch_size, seed):
+    """Writes synthetic /predict and /batch_predict requests in the recorder's format."""
+    rng = np.random.default_rng(seed)
+    with open(path, "w") as f:
+        for _ in range(count):
+            if rng.random() < batch_fraction:
+                rows = synthetic_features(rng, batch_size).to_dict("records")
+                endpoint, body = "/batch_predict", {"matches": rows}
+            else:
+                endpoint, body = "/predict", synthetic_features(rng, 1).to_dict("records")[0]
+            f.write(json.dumps({
+                "method": "POST", "path": endpoint,
+                "headers": {"content-type": "application/json"},
+                "body": json.dumps(body), "status": 200,
+            }) + "\n")
+
+
+def replay(base_url, entries, concurrency, rate, duration, max_requests, timeout):
+    """Replays entries in order (cycling) from concurrency threads. Returns (results, elapsed_s)."""
+    url = urlsplit(base_url)
+    indices = itertools.count()
+    index_lock = threading.Lock()
+    results = []
+    start = time.perf_counter()
+    stop_at = start + duration
+
+    def next_index():
+        with index_lock:
+            return next(indices)
+
+    def worker():
+        conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=timeout)
+        local = []
+        while True:
+            i = next_index()
+            if max_requests and i >= max_requests:
+                break
+            due = start + i / rate if rate > 0 else time.perf_counter()
+            if due >= stop_at:
+                break
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            entry = entries[i % len(entries)]
+            try:
+                conn.request(entry.get("method", "POST"), url.path.rstrip("/") + entry["path"],
+                             body=entry["body"], headers=entry.get("headers", {}))
+                response = conn.getresponse()
+                response.read()
+                expected = entry.get("status")
+                ok = response.status == expected if expected else response.status < 400
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=timeout)
+                ok = False
+            local.append((entry["path"], time.perf_counter() - due, ok))
+        results.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - start
+
+
+def summarize(results, elapsed):
+    def stats(rows):
+        latencies = np.array([latency for _, latency, _ in rows]) * 1000
+        errors = sum(not ok for _, _, ok in rows)
+        return {
+            "requests": len(rows),
+            "throughput_rps": round(len(rows) / elapsed, 2),
+            "error_rate": round(errors / len(rows), 5),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+            "max_ms": round(float(latencies.max()), 3),
+        }
+
+    if not results:
+        raise RuntimeError("No requests completed.")
+    summary = stats(results)
+    summary["duration_s"] = round(elapsed, 3)
+    summary["endpoints"] = {
+        path: stats([row for row in results if row[0] == path])
+        for path in sorted({row[0] for row in results})
+    }
+    return summary
+
+
+def compare(current, baseline, tolerance, max_error_increase):
+    """Returns a description of every metric that regressed past the allowed margin."""
+    failures = []
+    for metric in ("p95_ms", "p99_ms"):
+        limit = baseline[metric] * (1 + tolerance)
+        if current[metric] > limit:
+            failures.append(f"{metric} {current[metric]:.2f} > {limit:.2f} (baseline {baseline[metric]:.2f})")
+    floor = baseline["throughput_rps"] * (1 - tolerance)
+    if current["throughput_rps"] < floor:
+        failures.append(f"throughput {current['throughput_rps']:.1f} req/s < {floor:.1f} "
+                        f"(baseline {baseline['throughput_rps']:.1f})")
+    if current["error_rate"] > baseline["error_rate"] + max_error_increase:
+        failures.append(f"error rate {current['error_rate']:.2%} > baseline {baseline['error_rate']:.2%} "
+                        f"+ {max_error_increase:.2%}")
+    return failures
+
+
+def print_summary(summary):
+    print(f"{'endpoint':<16} {'requests':>8} {'req/s':>8} {'errors':>7} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, row in [("all", summary), *summary["endpoints"].items()]:
+        print(f"{name:<16} {row['requests']:>8} {row['throughput_rps']:>8.1f} {row['error_rate']:>7.2%} "
+              f"{row['p50_ms']:>7.2f}ms {row['p95_ms']:>7.2f}ms {row['p99_ms']:>7.2f}ms")
+
+
+def run_replay(args):
+    entries = load_requests(args.requests)
+    if not entries:
+        sys.exit(f"No requests in {args.requests}; record some traffic or run 'synthesize' first.")
+    print(f"Replaying {len(entries)} recorded requests with {args.concurrency} clients"
+          f"{f' at {args.rate:g} req/s' if args.rate else ''} for up to {args.duration:g}s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = None
+        base_url = args.url
+        if args.start_server:
+            if args.synthetic_model:
+                write_config(tmp, *write_synthetic_model(tmp, args.trees))
+            else:
+                write_config(tmp)
+            server = start_server(tmp, args.workers, args.port)
+            base_url = f"http://127.0.0.1:{args.port}"
+        try:
+            if args.warmup:
+                replay(base_url, entries, args.concurrency, 0, args.warmup, 0, args.timeout)
+            results, elapsed = replay(base_url, entries, args.concurrency, args.rate,
+                                      args.duration, args.max_requests, args.timeout)
+        finally:
+            if server is not None:
+                stop_server(server)
+
+    summary = summarize(results, elapsed)
+    print_summary(summary)
+    if args.output:
+        Path(args.output).write_text(json.dumps(summary, indent=2))
+    if args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(summary, indent=2))
+        print(f"Saved baseline to {args.baseline}")
+    elif args.baseline:
+        failures = compare(summary, json.loads(Path(args.baseline).read_text()),
+                           args.tolerance, args.max_error_increase)
+        if failures:
+            print("REGRESSION against baseline:")
+            for failure in failures:
+                print(f"  {failure}")
+            sys.exit(1)
+        print(f"Within {args.tolerance:.0%} of baseline {args.baseline}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    synth = commands.add_parser("synthesize", help="write synthetic traffic to the requests file")
+    synth.add_argument("--requests", default=str(DEFAULT_REQUESTS))
+    synth.add_argument("--count", type=int, default=2000)
+    synth.add_argument("--batch-fraction", type=float, default=0.1, help="share of /batch_predict requests")
+    synth.add_argument("--batch-size", type=int, default=50)
+    synth.add_argument("--seed", type=int, default=42)
+
+    run = commands.add_parser("replay", help="replay recorded traffic and report latency and throughput")
+    run.add_argument("--requests", default=str(DEFAULT_REQUESTS))
+    run.add_argument("--url", default="http://127.0.0.1:8000")
+    run.add_argument("--concurrency", type=int, default=16)
+    run.add_argument("--rate", type=float, default=0, help="requests/s (open loop); 0 = as fast as possible")
+    run.add_argument("--duration", type=float, default=30.0)
+    run.add_argument("--max-requests", type=int, default=0, help="stop after this many requests; 0 = no limit")
+    run.add_argument("--warmup", type=float, default=2.0, help="seconds of unmeasured load before the run")
+    run.add_argument("--timeout", type=float, default=30.0)
+    run.add_argument("--start-server", action="store_true", help="start the API locally under gunicorn")
+    run.add_argument("--synthetic-model", action="store_true", help="serve a synthetic forest instead of the configured model")
+    run.add_argument("--trees", type=int, default=300)
+    run.add_argument("--workers", type=int, default=1)
+    run.add_argument("--port", type=int, default=8766)
+    run.add_argument("--output", help="write the results as JSON")
+    run.add_argument("--baseline", help="baseline results to compare against (or to write with --save-baseline)")
+    run.add_argument("--save-baseline", action="store_true")
+    run.add_argument("--tolerance", type=float, default=0.10, help="allowed relative regression")
+    run.add_argument("--max-error-increase", type=float, default=0.01)
+    args = parser.parse_args()
+
+    if args.command == "synthesize":
+        synthesize(args.requests, args.count, args.batch_fraction, args.batch_size, args.seed)
+        print(f"Wrote {args.count} requests to {args.requests}")
+    else:
+        if args.save_baseline and not args.baseline:
+            parser.error("--save-baseline needs --baseline")
+        run_replay(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Helpers for benchmarks that start the inference API locally under gunicorn."""
+import http.client
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import yaml
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import LabelEncoder
+
+from benchmarks.bench_forest_engine import synthetic_features
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def write_synthetic_model(workdir, trees):
+    """Trains a forest shaped like the tuned EPL model on synthetic data. Returns (model_path, encoder_path)."""
+    rng = np.random.default_rng(42)
+    x_train = synthetic_features(rng, 2000)
+    label_encoder = LabelEncoder().fit(["A", "D", "H"])
+    y_train = label_encoder.transform(rng.choice(["A", "D", "H"], size=2000, p=[0.3, 0.25, 0.45]))
+    model = RandomForestClassifier(n_estimators=trees, random_state=42).fit(x_train, y_train)
+    model_path, encoder_path = Path(workdir) / "model.pkl", Path(workdir) / "label_encoder.pkl"
+    joblib.dump(model, model_path)
+    joblib.dump(label_encoder, encoder_path)
+    return model_path, encoder_path
+
+
+def write_config(workdir, model_path=None, encoder_path=None, result_cache=True, fast_start=True):
+    """
+    Copies configs/config.yaml into workdir/configs, where the server started by
+    start_server reads it. With model paths it serves those local files instead
+    of the configured model source. The artifact cache lives in workdir too.
+    """
+    with open(REPO_ROOT / "configs" / "config.yaml") as f:
+        config = yaml.safe_load(f)
+    inference_config = config.setdefault("inference", {})
+    if model_path is not None:
+        inference_config["reload"] = {
+            "enabled": False, "source": "local",
+            "model_path": str(model_path), "encoder_path": str(encoder_path),
+        }
+    if not result_cache:
+        inference_config["result_cache"] = {"enabled": False}
+    inference_config["recording"] = {"enabled": False}
+    inference_config["fast_start"] = fast_start
+    config.setdefault("artifact_cache", {})["dir"] = str(Path(workdir) / "artifact-cache")
+    (Path(workdir) / "configs").mkdir(exist_ok=True)
+    with open(Path(workdir) / "configs" / "config.yaml", "w") as f:
+        yaml.safe_dump(config, f)
+
+
+def start_server(workdir, workers, port, timeout_s=120):
+    """Starts gunicorn in workdir and waits until /health answers 200. Returns the process."""
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(REPO_ROOT),
+        "PROMETHEUS_MULTIPROC_DIR": str(Path(workdir) / f"prometheus-{port}-{workers}"),
+    }
+    command = [
+        sys.executable, "-m", "gunicorn", "-c", str(REPO_ROOT / "inference" / "gunicorn_conf.py"),
+        "--workers", str(workers), "--bind", f"127.0.0.1:{port}", "inference.inference_api:app",
+    ]
+    server = subprocess.Popen(command, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {server.returncode}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return server
+        except OSError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"Server did not become healthy within {timeout_s}s")
+
+
+def stop_server(server):
+    server.terminate()
+    server.wait()
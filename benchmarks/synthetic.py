@@ -0,0 +1,66 @@
+"""Synthetic raw match data shaped like data/enhanced_data.csv, for pipeline benchmarks."""
+import numpy as np
+import pandas as pd
+
+# Matches in data/enhanced_data.csv (one EPL and one Championship season)
+BASELINE_MATCHES = 1312
+
+
+def round_robin(n_teams):
+    """Double round robin by the circle method: a list of rounds of (home, away) index pairs."""
+    teams = list(range(n_teams))
+    rounds = []
+    for _ in range(n_teams - 1):
+        pairs = [(teams[i], teams[n_teams - 1 - i]) for i in range(n_teams // 2)]
+        rounds.append(pairs)
+        teams = [teams[0], teams[-1]] + teams[1:-1]
+    return rounds + [[(away, home) for home, away in pairs] for pairs in rounds]
+
+
+def synthetic_raw_matches(n_matches=BASELINE_MATCHES, teams_per_league=20, seed=42, n_leagues=None):
+    """
+    Raw match rows (Div, Date, HomeTeam, AwayTeam, FTHG, FTAG, FTR, HS, AS, HST, AST)
+    for consecutive seasons of as many leagues as needed to reach n_matches (or of
+    n_leagues leagues). Every team plays once per weekly matchday and keeps its
+    name across seasons.
+    """
+    rng = np.random.default_rng(seed)
+    schedule = round_robin(teams_per_league)
+    season_matches = sum(len(pairs) for pairs in schedule)
+    n_seasons = max(1, int(np.ceil(n_matches / season_matches)))
+    if n_leagues is None:
+        n_leagues = max(1, int(np.ceil(np.sqrt(n_seasons / 10))))
+    seasons_per_league = int(np.ceil(n_seasons / n_leagues))
+
+    frames = []
+    for league in range(n_leagues):
+        names = np.array([f"L{league}-Team{t:02d}" for t in range(teams_per_league)])
+        for season in range(seasons_per_league):
+            start = np.datetime64(f"{1990 + season}-08-10")
+            home = np.array([h for pairs in schedule for h, _ in pairs])
+            away = np.array([a for pairs in schedule for _, a in pairs])
+            matchday = np.repeat(np.arange(len(schedule)), [len(pairs) for pairs in schedule])
+            # Shuffle teams per season so fixtures differ from year to year
+            perm = rng.permutation(teams_per_league)
+            n = len(home)
+            home_shots = rng.poisson(13, n)
+            away_shots = rng.poisson(11, n)
+            home_on_target = rng.binomial(home_shots, 0.35)
+            away_on_target = rng.binomial(away_shots, 0.33)
+            home_goals = rng.binomial(home_on_target, 0.3)
+            away_goals = rng.binomial(away_on_target, 0.3)
+            frames.append(pd.DataFrame({
+                "Div": f"L{league}",
+                "Date": start + matchday * np.timedelta64(7, "D"),
+                "HomeTeam": names[perm[home]],
+                "AwayTeam": names[perm[away]],
+                "FTHG": home_goals,
+                "FTAG": away_goals,
+                "FTR": np.where(home_goals > away_goals, "H", np.where(home_goals < away_goals, "A", "D")),
+                "HS": home_shots.astype(float),
+                "AS": away_shots.astype(float),
+                "HST": home_on_target.astype(float),
+                "AST": away_on_target.astype(float),
+            }))
+    df = pd.concat(frames, ignore_index=True).sort_values("Date", kind="stable").head(n_matches)
+    return df.reset_index(drop=True)
@@ -0,0 +1,215 @@
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from prometheus_client import Gauge, Histogram
+
+ARTIFACT_LOAD_SECONDS = Histogram(
+    "artifact_load_seconds",
+    "Time to fetch and deserialize a model artifact; cache_result=miss is a cold start, hit a warm one",
+    ["artifact", "cache_result"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+ARTIFACT_CACHE_BYTES = Gauge(
+    "artifact_cache_bytes",
+    "Bytes held in the local artifact cache",
+    multiprocess_mode="mostrecent",
+)
+
+DOWNLOAD_CHUNK_BYTES = 8 * 1024 * 1024
+# Compiled forests kept per cache; older ones are removed when a new one is saved
+MAX_COMPILED = 5
+
+
+def _is_not_modified(error):
+    response = getattr(error, "response", None) or {}
+    code = str(response.get("Error", {}).get("Code", ""))
+    status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    return code in ("304", "NotModified") or status == 304
+
+
+def _atomic_write(path, chunks):
+    """Writes chunks to a temp file next to path and renames it into place."""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+class ArtifactCache:
+    """
+    On-disk cache of S3 artifacts shared by every process on the host.
+
+    Blobs are stored under the object's ETag (or VersionId when one is pinned), so
+    identical content is downloaded once however many replicas or workers ask for
+    it. Each lookup revalidates with a conditional GET (If-None-Match) and only
+    downloads on a change. Writes go to a temp file that is renamed into place, so
+    readers never see a partial artifact. The least recently used blobs are evicted
+    once the cache grows past max_bytes.
+
+    The cache also keeps the compiled forest derived from each model version, so
+    a restarting server can start scoring from it with NumPy alone.
+    """
+
+    def __init__(self, cache_dir, max_bytes=2 * 1024 ** 3, s3_client=None):
+        self.cache_dir = Path(cache_dir)
+        self.blob_dir = self.cache_dir / "blobs"
+        self.ref_dir = self.cache_dir / "refs"
+        self.compiled_dir = self.cache_dir / "compiled"
+        self.max_bytes = int(max_bytes)
+        self._s3_client = s3_client
+        self._client_pid = os.getpid()
+        self._lock = threading.Lock()
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.ref_dir.mkdir(parents=True, exist_ok=True)
+        self.compiled_dir.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config):
+        cache_config = config.get("artifact_cache", {})
+        return cls(
+            cache_config.get("dir", os.path.join(tempfile.gettempdir(), "epl-artifact-cache")),
+            max_bytes=cache_config.get("max_bytes", 2 * 1024 ** 3),
+        )
+
+    @property
+    def s3_client(self):
+        if self._s3_client is None or self._client_pid != os.getpid():
+            # Connection pools must not be shared with the process this one was forked from
+            import boto3
+            self._s3_client = boto3.client("s3")
+            self._client_pid = os.getpid()
+        return self._s3_client
+
+    def _blob_path(self, content_id):
+        return self.blob_dir / re.sub(r"[^A-Za-z0-9._-]", "_", content_id)
+
+    def _ref_path(self, bucket, key):
+        return self.ref_dir / (hashlib.sha256(f"{bucket}/{key}".encode()).hexdigest() + ".json")
+
+    def _read_ref(self, bucket, key):
+        try:
+            return json.loads(self._ref_path(bucket, key).read_text())
+        except (OSError, ValueError):
+            return None
+
+    def fetch(self, bucket, key, version_id=None):
+        """
+        Makes sure the current object is on disk and returns (path, content_id, cache_result),
+        where cache_result is "hit", "miss" or "stale" (S3 unreachable, cached copy used).
+        """
+        with self._lock:
+            if version_id is not None:
+                # Object versions never change, so a cached copy needs no revalidation
+                path = self._blob_path(f"version-{version_id}")
+                if path.exists():
+                    os.utime(path)
+                    return path, version_id, "hit"
+                response = self.s3_client.get_object(Bucket=bucket, Key=key, VersionId=version_id)
+                self._store(path, response["Body"])
+                return path, version_id, "miss"
+
+            ref = self._read_ref(bucket, key)
+            cached = self._blob_path(ref["content_id"]) if ref else None
+            if cached is not None and not cached.exists():
+                ref, cached = None, None
+
+            try:
+                request = {"Bucket": bucket, "Key": key}
+                if ref:
+                    request["IfNoneMatch"] = f'"{ref["content_id"]}"'
+                response = self.s3_client.get_object(**request)
+            except Exception as e:
+                if cached is not None and _is_not_modified(e):
+                    os.utime(cached)
+                    return cached, ref["content_id"], "hit"
+                if cached is not None:
+                    print(f"WARNING: Could not revalidate s3://{bucket}/{key}, using cached copy: {e}")
+                    os.utime(cached)
+                    return cached, ref["content_id"], "stale"
+                raise
+
+            content_id = response["ETag"].strip('"')
+            path = self._blob_path(content_id)
+            if path.exists():
+                # Same content already cached under another key
+                response["Body"].close()
+                os.utime(path)
+            else:
+                self._store(path, response["Body"])
+            ref = {"content_id": content_id, "bucket": bucket, "key": key}
+            _atomic_write(self._ref_path(bucket, key), [json.dumps(ref).encode()])
+            return path, content_id, "miss"
+
+    def _store(self, path, body):
+        _atomic_write(path, iter(lambda: body.read(DOWNLOAD_CHUNK_BYTES), b""))
+        self._evict(keep=path)
+
+    def _evict(self, keep):
+        """Removes least recently used blobs until the cache fits in max_bytes."""
+        blobs = []
+        for path in self.blob_dir.iterdir():
+            if path.name.startswith(".tmp-"):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            blobs.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in blobs)
+        for _, size, path in sorted(blobs):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+            print(f"Evicted {path.name} from the artifact cache.")
+        ARTIFACT_CACHE_BYTES.set(total)
+
+    def load(self, bucket, key, version_id=None, mmap_mode="r"):
+        """Fetches an artifact through the cache and joblib-loads it. Returns (object, content_id)."""
+        import joblib
+
+        started = time.perf_counter()
+        path, content_id, cache_result = self.fetch(bucket, key, version_id)
+        obj = joblib.load(path, mmap_mode=mmap_mode)
+        ARTIFACT_LOAD_SECONDS.labels(artifact=key, cache_result=cache_result).observe(time.perf_counter() - started)
+        return obj, content_id
+
+    def _compiled_ref_path(self, source_key):
+        return self.compiled_dir / (hashlib.sha256(source_key.encode()).hexdigest() + ".json")
+
+    def save_compiled(self, source_key, version, engine):
+        """Stores engine (a CompiledForest) as the latest compiled version of the model at source_key."""
+        path = self.compiled_dir / (hashlib.sha256(f"{source_key}\n{version}".encode()).hexdigest() + ".npz")
+        buffer = io.BytesIO()
+        engine.save(buffer)
+        with self._lock:
+            _atomic_write(path, [buffer.getvalue()])
+            ref = {"version": version, "file": path.name, "source_key": source_key}
+            _atomic_write(self._compiled_ref_path(source_key), [json.dumps(ref).encode()])
+            for stale in sorted(self.compiled_dir.glob("*.npz"), key=lambda p: p.stat().st_mtime)[:-MAX_COMPILED]:
+                stale.unlink(missing_ok=True)
+
+    def latest_compiled(self, source_key):
+        """Returns (path, version) of the last forest saved for source_key, or None."""
+        try:
+            ref = json.loads(self._compiled_ref_path(source_key).read_text())
+        except (OSError, ValueError):
+            return None
+        path = self.compiled_dir / ref["file"]
+        return (path, ref["version"]) if path.exists() else None
@@ -0,0 +1,188 @@
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+from prometheus_client import Counter, Gauge
+
+from inference.forest_engine import CompiledForest
+from inference.stage_timer import NULL_TIMER
+from inference.team_stats import s3_parts
+
+DEFAULT_KEY = "models/epl_first_stage.npz"
+# The artifact a training run logs the first stage as, next to its model
+ARTIFACT_PATH = "cascade/first_stage.npz"
+# Weight of the latest call in the per-row cost averages behind the latency reduction gauge
+COST_SMOOTHING = 0.05
+
+CASCADE_ROWS = Counter(
+    "cascade_rows_total",
+    "Rows answered by each stage of the model cascade",
+    ["stage"],
+)
+CASCADE_FIRST_STAGE_FRACTION = Gauge(
+    "cascade_first_stage_fraction",
+    "Share of rows this process answered with the first-stage model",
+    multiprocess_mode="liveall",
+)
+CASCADE_LATENCY_REDUCTION = Gauge(
+    "cascade_latency_reduction_ratio",
+    "1 - average scoring time per row with the cascade / average forest scoring time per row",
+    multiprocess_mode="liveall",
+)
+
+
+def first_stage_path(config):
+    """Where training publishes the first stage for the S3 model source: s3.first_stage_key in the project bucket."""
+    return f"s3://{config['s3']['bucket']}/{config['s3'].get('first_stage_key', DEFAULT_KEY)}"
+
+
+def forest_digest(model):
+    """
+    A hash of a fitted forest's node tables, the same for the sklearn forest and
+    its CompiledForest (also once saved and loaded). It ties a first stage to the
+    forest it was distilled from.
+    """
+    if not isinstance(model, CompiledForest):
+        model = CompiledForest.from_sklearn(model)
+    digest = hashlib.sha256()
+    for array, dtype in ((model.feature, np.int64), (model.threshold, np.float32), (model.left, np.int64),
+                         (model.right, np.int64), (model.values, np.float64)):
+        digest.update(np.ascontiguousarray(array, dtype=dtype).tobytes())
+    return digest.hexdigest()
+
+
+class FirstStage:
+    """
+    A multinomial linear model distilled from the forest (scripts/distill.py),
+    answering on its own when its top-class probability reaches threshold.
+
+    Input scaling is folded into weights and bias, so scoring is one matrix
+    product and a softmax; it is saved to and loaded from .npz with NumPy alone.
+    classes are the forest's encoded labels and label_names their outcome names;
+    forest_digest is the forest_digest of the forest it was distilled from.
+    """
+
+    def __init__(self, weights, bias, threshold, classes, label_names, feature_names, forest_digest):
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = np.asarray(bias, dtype=np.float64)
+        self.threshold = float(threshold)
+        self.classes = np.asarray(classes)
+        self.label_names = np.asarray(label_names)
+        self.feature_names = list(feature_names)
+        self.forest_digest = str(forest_digest)
+
+    def predict_proba(self, x):
+        scores = np.asarray(x, dtype=np.float64) @ self.weights.T + self.bias
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+
+    def save(self, file):
+        np.savez(
+            file, weights=self.weights, bias=self.bias, threshold=np.asarray(self.threshold),
+            classes=self.classes, label_names=self.label_names.astype(str),
+            feature_names=np.asarray(self.feature_names, dtype=str), forest_digest=np.asarray(self.forest_digest),
+        )
+
+    @classmethod
+    def load(cls, file):
+        with np.load(file, allow_pickle=False) as data:
+            return cls(
+                weights=data["weights"], bias=data["bias"], threshold=data["threshold"], classes=data["classes"],
+                label_names=data["label_names"], feature_names=data["feature_names"].tolist(),
+                forest_digest=data["forest_digest"].item(),
+            )
+
+
+def save_first_stage(first_stage, path):
+    """Writes a first stage to path (local or s3://); a local file is moved into place once complete."""
+    path = str(path)
+    buffer = io.BytesIO()
+    first_stage.save(buffer)
+    if path.startswith("s3://"):
+        import boto3
+        bucket, key = s3_parts(path)
+        boto3.client("s3").put_object(Bucket=bucket, Key=key, Body=buffer.getvalue())
+        return
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".npz.tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(buffer.getvalue())
+    os.replace(tmp_path, path)
+
+
+def load_first_stage(path, version_id=None):
+    """Reads a first stage from path (local or s3://, pinned to an S3 VersionId when given)."""
+    path = str(path)
+    if path.startswith("s3://"):
+        import boto3
+        bucket, key = s3_parts(path)
+        extra = {"VersionId": version_id} if version_id else {}
+        body = boto3.client("s3").get_object(Bucket=bucket, Key=key, **extra)["Body"].read()
+        return FirstStage.load(io.BytesIO(body))
+    return FirstStage.load(path)
+
+
+class Cascade:
+    """
+    Scores rows with the first stage and sends only those it is not confident
+    about to the forest. Keeps per-process running shares and per-row costs for
+    the cascade_* metrics.
+    """
+
+    def __init__(self, first_stage):
+        self.first_stage = first_stage
+        self.first_rows = 0
+        self.total_rows = 0
+        self.forest_row_s = None
+        self.cascade_row_s = None
+        self._lock = threading.Lock()
+
+    def score(self, x, score_forest, timer=NULL_TIMER):
+        """
+        Returns encoded labels and class probabilities for x, from the first stage
+        where it is confident and from score_forest(rows) for the rest.
+        """
+        started = time.perf_counter()
+        with timer.stage("first_stage"):
+            proba = self.first_stage.predict_proba(x)
+            confident = proba.max(axis=1) >= self.first_stage.threshold
+            labels = self.first_stage.classes.take(proba.argmax(axis=1))
+        rest = np.flatnonzero(~confident)
+        forest_row_s = None
+        if rest.size:
+            forest_started = time.perf_counter()
+            forest_labels, forest_proba = score_forest(x[rest])
+            forest_row_s = (time.perf_counter() - forest_started) / rest.size
+            labels[rest] = forest_labels
+            proba[rest] = forest_proba
+        self._record(len(x), len(x) - rest.size, (time.perf_counter() - started) / max(1, len(x)), forest_row_s)
+        return labels, proba
+
+    def _record(self, n_rows, n_first, cascade_row_s, forest_row_s):
+        CASCADE_ROWS.labels(stage="first_stage").inc(n_first)
+        CASCADE_ROWS.labels(stage="forest").inc(n_rows - n_first)
+        with self._lock:
+            self.first_rows += n_first
+            self.total_rows += n_rows
+            self.cascade_row_s = _smoothed(self.cascade_row_s, cascade_row_s)
+            if forest_row_s is not None:
+                self.forest_row_s = _smoothed(self.forest_row_s, forest_row_s)
+            CASCADE_FIRST_STAGE_FRACTION.set(self.first_rows / self.total_rows)
+            if self.forest_row_s:
+                CASCADE_LATENCY_REDUCTION.set(1 - self.cascade_row_s / self.forest_row_s)
+
+    def describe(self):
+        return {
+            "threshold": self.first_stage.threshold,
+            "first_stage_fraction": self.first_rows / self.total_rows if self.total_rows else None,
+            "latency_reduction": 1 - self.cascade_row_s / self.forest_row_s if self.forest_row_s else None,
+        }
+
+
+def _smoothed(average, value):
+    return value if average is None else average + COST_SMOOTHING * (value - average)
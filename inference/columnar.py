@@ -0,0 +1,152 @@
+"""
+Columnar request and response encodings for bulk /batch_predict calls.
+
+Two request bodies are accepted besides the JSON BatchRequest:
+
+- FLOAT32_MATRIX: a raw little-endian float32 row-major matrix. Column order is
+  given by the X-Columns header (comma-separated feature names) and defaults to
+  the model's feature order.
+- ARROW_STREAM: an Arrow IPC stream whose table has one column per feature.
+
+Bodies are decoded straight into a NumPy matrix and validated as a whole, so the
+request never becomes per-row Python objects. Results are scored and streamed back
+chunk by chunk as NDJSON (one prediction per line) or as an Arrow IPC stream.
+"""
+import io
+import json
+
+import numpy as np
+
+pa = None  # imported on first Arrow request; see _arrow()
+
+FLOAT32_MATRIX = "application/x-epl-float32"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+NDJSON = "application/x-ndjson"
+REQUEST_TYPES = (FLOAT32_MATRIX, ARROW_STREAM)
+
+
+class PayloadError(ValueError):
+    """Raised when a columnar body cannot be decoded or fails validation."""
+    def __init__(self, detail, status_code=422):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+def media_type(header_value):
+    """Strips parameters such as charset from a Content-Type or Accept value."""
+    return (header_value or "").split(";")[0].strip().lower()
+
+
+def _arrow():
+    """Imports pyarrow on first use; it is optional and slow to import, so plain JSON servers never load it."""
+    global pa
+    if pa is None:
+        try:
+            import pyarrow
+            import pyarrow.ipc
+        except ImportError:
+            return None
+        pa = pyarrow
+    return pa
+
+
+def arrow_available():
+    return _arrow() is not None
+
+
+def decode_float32_matrix(body, feature_order, columns_header=None):
+    """Decodes a raw float32 matrix into an (n_rows, n_features) array in feature_order."""
+    columns = [c.strip() for c in columns_header.split(",")] if columns_header else list(feature_order)
+    missing = sorted(set(feature_order) - set(columns))
+    if missing or len(set(columns)) != len(columns):
+        raise PayloadError(f"X-Columns must list each feature exactly once; missing {missing}.")
+
+    row_bytes = 4 * len(columns)
+    if len(body) % row_bytes:
+        raise PayloadError(f"Body length {len(body)} is not a multiple of {row_bytes} bytes ({len(columns)} float32 columns).")
+    matrix = np.frombuffer(body, dtype="<f4").reshape(-1, len(columns))
+    order = [columns.index(name) for name in feature_order]
+    if order != list(range(len(columns))):
+        matrix = matrix[:, order]
+    return matrix
+
+
+def decode_arrow_stream(body, feature_order):
+    """Decodes an Arrow IPC stream into an (n_rows, n_features) array in feature_order."""
+    if _arrow() is None:
+        raise PayloadError("Arrow payloads need pyarrow, which is not installed on this server.", status_code=415)
+    try:
+        table = pa.ipc.open_stream(body).read_all()
+    except pa.ArrowInvalid as e:
+        raise PayloadError(f"Invalid Arrow IPC stream: {e}")
+
+    missing = [name for name in feature_order if name not in table.column_names]
+    if missing:
+        raise PayloadError(f"Arrow table is missing feature columns {missing}.")
+    # Nulls become NaN and are rejected by validate_features
+    return np.column_stack([
+        table.column(name).to_numpy(zero_copy_only=False).astype(np.float32, copy=False)
+        for name in feature_order
+    ]) if table.num_rows else np.empty((0, len(feature_order)), dtype=np.float32)
+
+
+def validate_features(matrix, feature_order, min_value, max_value):
+    """Rejects NaN, infinite and out-of-range values with one pass over the whole array."""
+    if matrix.shape[0] == 0:
+        raise PayloadError("Batch contains no rows.")
+    finite = np.isfinite(matrix)
+    if not finite.all():
+        row, col = np.argwhere(~finite)[0]
+        raise PayloadError(f"{np.count_nonzero(~finite)} non-finite values, first at row {row}, column '{feature_order[col]}'.")
+    out_of_range = (matrix < min_value) | (matrix > max_value)
+    if out_of_range.any():
+        row, col = np.argwhere(out_of_range)[0]
+        raise PayloadError(
+            f"{np.count_nonzero(out_of_range)} values outside [{min_value}, {max_value}], "
+            f"first at row {row}, column '{feature_order[col]}' ({matrix[row, col]})."
+        )
+
+
+def _scored_chunks(matrix, score_fn, chunk_rows):
+    for start in range(0, matrix.shape[0], chunk_rows):
+        encoded, proba = score_fn(matrix[start:start + chunk_rows])
+        yield np.asarray(encoded, dtype=np.intp), proba
+
+
+def ndjson_stream(matrix, score_fn, class_names, chunk_rows):
+    """Yields NDJSON lines shaped like the JSON /batch_predict predictions, one chunk at a time."""
+    label_json = np.array([json.dumps(str(c)) for c in class_names], dtype=object)
+    template = '{"predicted_outcome": %s, "probabilities": {' + ", ".join(
+        f"{label}: %r" for label in label_json
+    ) + "}}\n"
+    for encoded, proba in _scored_chunks(matrix, score_fn, chunk_rows):
+        labels = label_json[encoded]
+        yield "".join(template % (label, *row) for label, row in zip(labels, proba.tolist()))
+
+
+def arrow_response_stream(matrix, score_fn, class_names, chunk_rows):
+    """Yields an Arrow IPC stream with a dictionary-encoded outcome column and one probability column per class."""
+    _arrow()
+    dictionary = pa.array([str(c) for c in class_names])
+    schema = pa.schema(
+        [pa.field("predicted_outcome", pa.dictionary(pa.int32(), pa.string()))]
+        + [pa.field(f"proba_{c}", pa.float64()) for c in class_names]
+    )
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+    for encoded, proba in _scored_chunks(matrix, score_fn, chunk_rows):
+        outcome = pa.DictionaryArray.from_arrays(pa.array(encoded.astype(np.int32)), dictionary)
+        columns = [outcome] + [pa.array(proba[:, j]) for j in range(proba.shape[1])]
+        writer.write_batch(pa.record_batch(columns, schema=schema))
+        yield _drain(sink)
+    writer.close()
+    yield _drain(sink)
+
+
+def _drain(sink):
+    """Returns what the writer has produced so far and empties the buffer."""
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
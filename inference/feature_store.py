@@ -0,0 +1,99 @@
+import os
+import sqlite3
+import tempfile
+
+import numpy as np
+
+from inference.team_stats import TeamStatsIndex, s3_parts
+
+# Each team's average over its last five matches (home and away alike), in the
+# order of the home and of the away model features
+STATS = ['GoalsScored', 'GoalsConceded', 'Shots', 'ShotsOnTarget']
+DEFAULT_KEY = "features/team_features.sqlite"
+# Bumped when the table layout changes; readers refuse other versions
+SCHEMA_VERSION = 1
+
+
+def feature_store_path(config):
+    """The configured store: feature_store.path, or the default key in the project bucket."""
+    path = config.get("feature_store", {}).get("path")
+    return path or f"s3://{config['s3']['bucket']}/{DEFAULT_KEY}"
+
+
+def write_feature_store(path, rows):
+    """
+    Writes rows of (team, last match date 'YYYY-MM-DD', matches, *STATS) as a
+    SQLite file at path (local or s3://). The file is built next to its
+    destination and moved into place, so readers never see a partial store.
+    """
+    path = str(path)
+    local_dir = tempfile.gettempdir() if path.startswith("s3://") else os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=local_dir, suffix=".sqlite.tmp")
+    os.close(fd)
+    try:
+        with sqlite3.connect(tmp_path) as conn:
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.execute(
+                "CREATE TABLE team_features (team TEXT PRIMARY KEY, last_match TEXT NOT NULL, "
+                f"matches INTEGER NOT NULL, {', '.join(f'{stat} REAL NOT NULL' for stat in STATS)}) WITHOUT ROWID"
+            )
+            conn.executemany(f"INSERT INTO team_features VALUES ({', '.join('?' * (3 + len(STATS)))})", rows)
+        conn.close()
+        if path.startswith("s3://"):
+            import boto3
+            bucket, key = s3_parts(path)
+            boto3.client("s3").upload_file(tmp_path, bucket, key)
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class FeatureStore(TeamStatsIndex):
+    """
+    Each team's rolling features for its next match, written by scripts/preprocess.py
+    from the same last-five-matches windows it trains on, and served from memory.
+
+    The SQLite file is read once per version into a dict, so a fixture lookup is
+    two dict reads; the same four averages fill the home or the away half of the
+    features depending on where the team plays. Like TeamStatsIndex (whose
+    lookup, snapshot and watcher it shares) it is reloaded in the background when
+    the file's mtime, or ETag for s3:// paths, changes.
+    """
+
+    def _current_version(self):
+        if self.path.startswith("s3://"):
+            import boto3
+            bucket, key = s3_parts(self.path)
+            return boto3.client("s3").head_object(Bucket=bucket, Key=key)["ETag"]
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read_rows(self, path):
+        conn = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                raise ValueError(f"{self.path} has feature store schema {version}, expected {SCHEMA_VERSION}")
+            return conn.execute(f"SELECT team, {', '.join(STATS)} FROM team_features").fetchall()
+        finally:
+            conn.close()
+
+    def _build_index(self):
+        if self.path.startswith("s3://"):
+            import boto3
+            bucket, key = s3_parts(self.path)
+            fd, local_path = tempfile.mkstemp(suffix=".sqlite")
+            os.close(fd)
+            try:
+                boto3.client("s3").download_file(bucket, key, local_path)
+                rows = self._read_rows(local_path)
+            finally:
+                os.remove(local_path)
+        else:
+            rows = self._read_rows(self.path)
+        features = {row[0]: np.array(row[1:], dtype=np.float64) for row in rows}
+        return features, features
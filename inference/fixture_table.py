@@ -0,0 +1,128 @@
+import io
+import time
+from pathlib import Path
+
+import numpy as np
+
+from inference.artifact_cache import _atomic_write
+from inference.team_stats import FEATURES
+
+# Outcome codes stored in FixtureTable.outcomes
+HOME_WIN, DRAW, AWAY_WIN = 1, 0, -1
+
+
+def _changed_rows(names, features, previous_names, previous_features):
+    """Flags the teams whose features are new or differ from the previous table. Returns (mask, previous index)."""
+    previous_index = {name: i for i, name in enumerate(previous_names)}
+    rows = np.array([previous_index.get(name, -1) for name in names], dtype=np.int64)
+    known = rows >= 0
+    changed = ~known
+    if known.any():
+        changed[known] = np.any(features[known] != previous_features[rows[known]], axis=1)
+    return changed, rows
+
+
+class FixtureTable:
+    """
+    Predicted scoreline and outcome for every home/away team pair.
+
+    Rows are home teams and columns away teams, each with the features the pair
+    was scored with, so a prediction is two dict reads and a matrix read. All
+    missing pairs are scored in one vectorized predict_goals call. When rebuilt
+    from a previous table for the same model version, only the rows of home
+    teams and columns of away teams whose features changed are re-scored.
+    """
+
+    def __init__(self, home_teams, away_teams, home_features, away_features, home_goals, away_goals, model_version):
+        self.home_teams = list(home_teams)
+        self.away_teams = list(away_teams)
+        self.home_features = home_features
+        self.away_features = away_features
+        self.home_goals = home_goals
+        self.away_goals = away_goals
+        self.outcomes = np.sign(home_goals - away_goals).astype(np.int8)
+        self.model_version = str(model_version)
+        self._home_index = {name: i for i, name in enumerate(self.home_teams)}
+        self._away_index = {name: i for i, name in enumerate(self.away_teams)}
+
+    @classmethod
+    def build(cls, team_stats, predict_goals, model_version, previous=None):
+        """
+        Scores every pair in team_stats (a TeamStatsIndex.snapshot()) with
+        predict_goals, which maps a FEATURES DataFrame to an (n, 2) array of home
+        and away goals. Pairs whose features match those in previous are copied
+        from it when previous was built with the same model_version.
+        """
+        import pandas as pd
+
+        started = time.perf_counter()
+        home_stats, away_stats, _ = team_stats
+        home_teams, away_teams = sorted(home_stats), sorted(away_stats)
+        home_features = np.array([home_stats[t] for t in home_teams], dtype=np.float64).reshape(-1, 4)
+        away_features = np.array([away_stats[t] for t in away_teams], dtype=np.float64).reshape(-1, 4)
+        home_goals = np.zeros((len(home_teams), len(away_teams)), dtype=np.int16)
+        away_goals = np.zeros_like(home_goals)
+        stale = np.ones(home_goals.shape, dtype=bool)
+
+        if previous is not None and previous.model_version == str(model_version):
+            changed_home, home_rows = _changed_rows(home_teams, home_features, previous.home_teams, previous.home_features)
+            changed_away, away_cols = _changed_rows(away_teams, away_features, previous.away_teams, previous.away_features)
+            stale = changed_home[:, None] | changed_away[None, :]
+            keep = ~stale
+            rows, cols = np.nonzero(keep)
+            home_goals[keep] = previous.home_goals[home_rows[rows], away_cols[cols]]
+            away_goals[keep] = previous.away_goals[home_rows[rows], away_cols[cols]]
+
+        rows, cols = np.nonzero(stale)
+        if len(rows):
+            input_data = pd.DataFrame(np.hstack([home_features[rows], away_features[cols]]), columns=FEATURES)
+            goals = np.rint(predict_goals(input_data))
+            home_goals[rows, cols] = goals[:, 0]
+            away_goals[rows, cols] = goals[:, 1]
+        print(f"Scored {len(rows)} of {stale.size} fixtures in {time.perf_counter() - started:.2f}s.")
+        return cls(home_teams, away_teams, home_features, away_features, home_goals, away_goals, model_version)
+
+    def lookup(self, home_team, away_team):
+        """Returns (home goals, away goals, outcome code) for a fixture, or None if a team has no stats."""
+        i, j = self._home_index.get(home_team), self._away_index.get(away_team)
+        if i is None or j is None:
+            return None
+        return int(self.home_goals[i, j]), int(self.away_goals[i, j]), int(self.outcomes[i, j])
+
+    def lookup_many(self, home_teams, away_teams):
+        """
+        Vectorized lookup of many fixtures. Returns (home goals, away goals,
+        outcome codes, found); entries of fixtures with an unknown team are 0
+        and flagged False in found.
+        """
+        rows = np.array([self._home_index.get(t, -1) for t in home_teams], dtype=np.int64)
+        cols = np.array([self._away_index.get(t, -1) for t in away_teams], dtype=np.int64)
+        found = (rows >= 0) & (cols >= 0)
+        if not found.any():
+            zeros = np.zeros(len(found), dtype=np.int16)
+            return zeros, zeros, zeros.astype(np.int8), found
+        rows, cols = np.where(found, rows, 0), np.where(found, cols, 0)
+        return (np.where(found, self.home_goals[rows, cols], 0), np.where(found, self.away_goals[rows, cols], 0),
+                np.where(found, self.outcomes[rows, cols], 0), found)
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            home_teams=np.array(self.home_teams, dtype=str), away_teams=np.array(self.away_teams, dtype=str),
+            home_features=self.home_features, away_features=self.away_features,
+            home_goals=self.home_goals, away_goals=self.away_goals, outcomes=self.outcomes,
+            model_version=np.array(self.model_version),
+        )
+        _atomic_write(path, [buffer.getvalue()])
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data["home_teams"].tolist(), data["away_teams"].tolist(),
+                data["home_features"], data["away_features"],
+                data["home_goals"], data["away_goals"], data["model_version"].item(),
+            )
@@ -0,0 +1,229 @@
+import numpy as np
+
+# Number of (tree, row) pairs stepped together; bounds memory and keeps node tables cache-resident
+MAX_TRAVERSAL_CELLS = 1 << 14
+
+# Arrays written by save(); everything needed to score and decode labels without scikit-learn
+_SAVED_ARRAYS = ("feature", "threshold", "left", "right", "missing_left", "values", "roots", "classes")
+
+
+def _values_are_fractions():
+    # From scikit-learn 1.4 onwards `tree_.value` already holds class fractions and
+    # predict_proba returns it untouched; older releases store counts and normalise them.
+    import sklearn
+    return tuple(int(p) for p in sklearn.__version__.split(".")[:2]) >= (1, 4)
+
+
+def float32_floor(values):
+    """
+    The largest float32 values not above values. Trees compare float32 inputs,
+    so x <= t and x <= float32_floor(t) agree for every input: rounding split
+    thresholds this way loses nothing.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rounded = values.astype(np.float32)
+    too_high = rounded.astype(np.float64) > values
+    rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+    return rounded
+
+
+def _without_objects(array):
+    """String arrays are stored as fixed-width unicode so saved forests load without pickle."""
+    array = np.asarray(array)
+    return array.astype(str) if array.dtype == object else array
+
+
+class CompiledForest:
+    """
+    A fitted RandomForestClassifier flattened into contiguous NumPy node tables.
+
+    All trees share one set of arrays (feature, threshold, left/right children and
+    per-node class distributions) addressed by global node ids, so a batch is scored
+    by stepping every (tree, row) pair down one level at a time until all of them have
+    reached a leaf. Labels and probabilities come out of the same pass and match
+    scikit-learn exactly.
+
+    A compiled forest can be saved to a single .npz file and loaded back with NumPy
+    alone, which lets a server start without importing scikit-learn or unpickling
+    the model. label_names optionally carries the label encoder's classes so
+    encoded predictions can be decoded from the same file.
+    """
+
+    def __init__(self, feature, threshold, left, right, missing_left, values, roots,
+                 max_depth, classes, feature_names, label_names=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.values = values
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.classes = classes
+        self.feature_names = list(feature_names)
+        self.label_names = label_names
+        self.is_internal = left != np.arange(len(left))
+        # children[2 * node] is the left child and children[2 * node + 1] the right one
+        self.children = np.column_stack([left, right]).ravel()
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_features(self):
+        return len(self.feature_names)
+
+    @classmethod
+    def from_sklearn(cls, model, feature_names=None, label_names=None):
+        """Builds the node tables from a fitted RandomForestClassifier."""
+        from sklearn.ensemble import RandomForestClassifier
+
+        if not isinstance(model, RandomForestClassifier):
+            raise TypeError(f"Cannot compile {type(model).__name__}; only RandomForestClassifier is supported.")
+        if model.n_outputs_ != 1:
+            raise ValueError("Only single-output forests can be compiled.")
+
+        trained_names = getattr(model, "feature_names_in_", None)
+        if feature_names is not None and trained_names is not None and list(feature_names) != list(trained_names):
+            raise ValueError(f"Feature order {list(feature_names)} does not match the training order {list(trained_names)}.")
+        if feature_names is None:
+            feature_names = trained_names
+        if feature_names is None:
+            feature_names = [f"x{i}" for i in range(model.n_features_in_)]
+
+        n_classes = int(model.n_classes_)
+        values_are_fractions = _values_are_fractions()
+        features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count, dtype=np.intp)
+            is_leaf = tree.children_left == -1
+
+            # Leaves point back at themselves, which is how internal nodes are told apart
+            left = np.where(is_leaf, node_ids, tree.children_left) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right) + offset
+            feature = np.where(is_leaf, 0, tree.feature)
+
+            nodes = tree.__getstate__()["nodes"]
+            if "missing_go_to_left" in nodes.dtype.names:
+                missing_left = nodes["missing_go_to_left"].astype(bool)
+            else:
+                missing_left = np.zeros(tree.node_count, dtype=bool)
+
+            value = tree.value[:, 0, :n_classes]
+            if not values_are_fractions:
+                normalizer = value.sum(axis=1)[:, np.newaxis]
+                normalizer[normalizer == 0.0] = 1.0
+                value = value / normalizer
+
+            features.append(feature)
+            thresholds.append(float32_floor(tree.threshold))
+            lefts.append(left)
+            rights.append(right)
+            missing.append(missing_left & ~is_leaf)
+            values.append(value)
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float32),
+            left=np.ascontiguousarray(np.concatenate(lefts), dtype=np.intp),
+            right=np.ascontiguousarray(np.concatenate(rights), dtype=np.intp),
+            missing_left=np.ascontiguousarray(np.concatenate(missing)),
+            values=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            classes=np.asarray(model.classes_),
+            feature_names=feature_names,
+            label_names=None if label_names is None else np.asarray(label_names),
+        )
+
+    def save(self, file):
+        """Writes the node tables to an uncompressed .npz file (path or binary file object)."""
+        arrays = {name: _without_objects(getattr(self, name)) for name in _SAVED_ARRAYS}
+        arrays["max_depth"] = np.asarray(self.max_depth)
+        arrays["feature_names"] = np.asarray(self.feature_names, dtype=str)
+        if self.label_names is not None:
+            arrays["label_names"] = _without_objects(self.label_names)
+        np.savez(file, **arrays)
+
+    @classmethod
+    def load(cls, file):
+        """Reads a forest written by save(); needs only NumPy."""
+        with np.load(file, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in _SAVED_ARRAYS}
+            return cls(
+                **arrays,
+                max_depth=int(data["max_depth"]),
+                feature_names=data["feature_names"].tolist(),
+                label_names=data["label_names"] if "label_names" in data.files else None,
+            )
+
+    def _check_input(self, X):
+        # scikit-learn scores trees on float32 inputs; cast the same way so splits agree
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected a 2D array with {self.n_features} columns, got shape {X.shape}.")
+        return X
+
+    def _traverse(self, flat_x, n_rows, roots, check_missing):
+        """Returns the leaf reached by every (tree, row) pair as a (len(roots), n_rows) array."""
+        leaves = np.repeat(roots, n_rows)
+        cells = np.arange(leaves.size, dtype=np.intp)
+        nodes = leaves
+        x_offsets = (cells % n_rows) * self.n_features
+        active = cells.size
+
+        while active:
+            x = flat_x[x_offsets + self.feature[nodes]]
+            go_right = np.less_equal(x, self.threshold[nodes]).view(np.int8) ^ 1
+            if check_missing:
+                go_right &= ~(np.isnan(x) & self.missing_left[nodes])
+            nodes = self.children[2 * nodes + go_right]
+
+            # Leaves loop back onto themselves, so finished cells only need dropping
+            # once enough of them have piled up to make the copy worthwhile
+            internal = self.is_internal[nodes]
+            active = np.count_nonzero(internal)
+            if active < 0.75 * internal.size:
+                leaves[cells] = nodes
+                cells = cells[internal]
+                nodes = nodes[internal]
+                x_offsets = x_offsets[internal]
+        leaves[cells] = nodes
+        return leaves.reshape(len(roots), n_rows)
+
+    def predict_proba(self, X):
+        """Returns class probabilities identical to model.predict_proba."""
+        X = self._check_input(X)
+        n_rows = X.shape[0]
+        flat_x = X.ravel()
+        check_missing = bool(self.missing_left.any() and np.isnan(flat_x).any())
+        proba = np.zeros((n_rows, len(self.classes)), dtype=np.float64)
+        if n_rows == 0:
+            return proba
+
+        # Small batches walk all trees at once; large ones walk a few trees at a time
+        # so each group's node tables stay in cache.
+        trees_per_group = max(1, MAX_TRAVERSAL_CELLS // max(1, n_rows))
+        for start in range(0, self.n_trees, trees_per_group):
+            leaves = self._traverse(flat_x, n_rows, self.roots[start:start + trees_per_group], check_missing)
+            # Summed tree by tree, the same order scikit-learn accumulates predict_proba
+            for tree_leaves in leaves:
+                proba += self.values[tree_leaves]
+        proba /= self.n_trees
+        return proba
+
+    def predict_with_proba(self, X):
+        """Returns (labels, probabilities) from a single traversal of the forest."""
+        proba = self.predict_proba(X)
+        labels = self.classes.take(np.argmax(proba, axis=1), axis=0)
+        return labels, proba
+
+    def predict(self, X):
+        return self.predict_with_proba(X)[0]
@@ -0,0 +1,53 @@
+"""
+Gunicorn settings for serving the inference API with several worker processes.
+
+    gunicorn -c inference/gunicorn_conf.py inference.inference_api:app
+
+The app is imported and the model loaded once in the master before it forks, so
+every worker starts with the same bundle in copy-on-write memory instead of its
+own copy. Each worker then runs its own reloader, result cache and micro-batcher.
+Prometheus metrics from all workers are written to PROMETHEUS_MULTIPROC_DIR and
+merged by the /metrics endpoint.
+"""
+import gc
+import glob
+import multiprocessing
+import os
+import tempfile
+
+import yaml
+
+# Must be set before prometheus_client is first imported (by the preloaded app)
+multiproc_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "epl-prometheus-multiproc")
+)
+os.makedirs(multiproc_dir, exist_ok=True)
+for stale in glob.glob(os.path.join(multiproc_dir, "*.db")):
+    # Files left by a previous run would be summed into this one's metrics
+    os.remove(stale)
+
+try:
+    with open("configs/config.yaml", "r") as f:
+        api_config = yaml.safe_load(f).get("api", {})
+except FileNotFoundError:
+    api_config = {}
+
+bind = f"{api_config.get('host', '0.0.0.0')}:{api_config.get('port', 8000)}"
+workers = api_config.get("workers", 0) or multiprocessing.cpu_count()
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = api_config.get("worker_timeout_s", 60)
+preload_app = True
+
+
+def on_starting(server):
+    """Loads the model in the master so the forked workers share its memory pages."""
+    from inference import inference_api
+    inference_api.load_model_from_s3()
+    # Move everything allocated so far out of the collector's reach; otherwise a
+    # collection in a worker writes to the shared objects and copies their pages
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,59 +1,209 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import List
-import joblib
-import pandas as pd
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from typing import List, Optional
+import json
+import os
+import threading
+import time
+import numpy as np
 from pathlib import Path
-import boto3
-import yaml
-from io import BytesIO
 from prometheus_fastapi_instrumentator import Instrumentator
-from prometheus_client import start_http_server
+
+from inference import columnar
+from inference.artifact_cache import ARTIFACT_LOAD_SECONDS, ArtifactCache
+from inference.cascade import Cascade, forest_digest
+from inference.feature_store import FeatureStore, feature_store_path
+from inference.forest_engine import CompiledForest
+from inference.micro_batcher import MicroBatcher
+from inference.model_registry import LocalModelSource, ModelBundle, ModelReloader, MlflowModelSource, S3ModelSource
+from inference.request_recorder import RecordingMiddleware, TrafficRecorder
+from inference.result_cache import ResultCache
+from inference.stage_timer import SamplingProfiler, StageTimer
 
 # --- Constants ---
 MODEL_NOT_LOADED_DETAIL = "Model not loaded. Please ensure the training pipeline has run successfully."
+FEATURES_NOT_LOADED_DETAIL = "Team features not loaded. Please ensure the preprocessing pipeline has run successfully."
 
-# --- Global variables for model and encoder ---
-model = None
-label_encoder = None
+# --- Global state ---
+# The bundle serving traffic is replaced as a whole on reload; handlers read it once
+# so a request is scored and decoded by the same model even if a swap happens mid-flight.
+# pandas, scikit-learn, joblib, boto3 and pyarrow are imported only when a code path
+# needs them, so a server restoring a compiled forest starts with NumPy alone.
+active_bundle = None
+reloader = None
+artifact_cache = None
+batcher = None
+result_cache = None
+profiler = None
+recorder = None
+feature_store = None
 
-def load_model_from_s3():
-    """Loads the model and encoder from S3."""
-    global model, label_encoder
-    
-    print("Loading model from S3...")
+def load_config():
+    import yaml
     with open("configs/config.yaml", "r") as f:
-        config = yaml.safe_load(f)
+        return yaml.safe_load(f)
+
+def build_model_source(config, cache=None):
+    """Returns the artifact source named by inference.reload.source (S3 object keys by default)."""
+    reload_config = config.get("inference", {}).get("reload", {})
+    source = reload_config.get("source", "s3")
+    if source == "mlflow":
+        return MlflowModelSource(
+            config["mlflow"]["tracking_uri"],
+            reload_config.get("registered_model_name", "epl-prediction-model"),
+        )
+    if source == "local":
+        return LocalModelSource(reload_config["model_path"], reload_config["encoder_path"],
+                                reload_config.get("first_stage_path"))
+    return S3ModelSource(
+        config["s3"]["bucket"], config["s3"]["model_key"], config["s3"]["encoder_key"],
+        cache=cache, first_stage_key=config["s3"].get("first_stage_key"),
+    )
+
+def build_bundle(model, label_encoder, version, source):
+    """Compiles a freshly loaded model into a bundle ready to be swapped in."""
+    inference_config = load_config().get("inference", {})
+    engine = compile_model(model, inference_config.get("engine", "compiled"), label_encoder.classes_)
+    source_key = getattr(reloader.source, "cache_key", None) if reloader is not None else None
+    if engine is not None and source_key and artifact_cache is not None and inference_config.get("fast_start", True):
+        # Lets the next start restore this version without downloading and unpickling the model
+        artifact_cache.save_compiled(source_key, version, engine)
+    cascade = build_cascade(load_config(), version, engine if engine is not None else model, label_encoder.classes_)
+    return ModelBundle(model, label_encoder, engine, version, source, FEATURE_ORDER, cascade=cascade)
+
+def build_cascade(config, version, forest, label_names):
+    """
+    The first-stage cascade for forest when inference.cascade is enabled and the
+    model source's first stage for version was distilled from this very forest;
+    None (forest only) otherwise.
+    """
+    cascade_config = config.get("inference", {}).get("cascade", {})
+    if not cascade_config.get("enabled", False):
+        return None
+    try:
+        first_stage = reloader.source.load_first_stage(version)
+        digest = forest_digest(forest)
+    except Exception as e:
+        print(f"WARNING: Could not load the first-stage model for version {version}, serving with the forest only: {e}")
+        return None
+    if first_stage is None:
+        return None
+    if (first_stage.feature_names != FEATURE_ORDER or list(first_stage.label_names) != list(label_names)
+            or first_stage.forest_digest != digest):
+        print(f"WARNING: First-stage model for version {version} was distilled from another forest, "
+              "serving with the forest only.")
+        return None
+    print(f"Model cascade enabled (first stage answers at confidence >= {first_stage.threshold:.3f}).")
+    return Cascade(first_stage)
 
-    bucket_name = config["s3"]["bucket"]
-    model_key = config["s3"]["model_key"]
-    encoder_key = config["s3"]["encoder_key"]
+def activate_bundle(bundle):
+    global active_bundle
+    active_bundle = bundle
+    # Cache keys carry the model version already; clearing just frees the old entries
+    if result_cache is not None:
+        result_cache.clear()
 
+def load_model_from_s3():
+    """Loads the model and encoder from the configured source (S3 by default)."""
+    global reloader, artifact_cache
+
+    config = load_config()
+    inference_config = config.get("inference", {})
+    reload_config = inference_config.get("reload", {})
+    artifact_cache = ArtifactCache.from_config(config)
+    reloader = ModelReloader(
+        build_model_source(config, artifact_cache), build_bundle, activate_bundle,
+        poll_interval_s=reload_config.get("poll_interval_s", 60),
+    )
+    if (inference_config.get("fast_start", True) and inference_config.get("engine", "compiled") == "compiled"
+            and restore_compiled_bundle()):
+        return
+    print(f"Loading model from {reloader.source.name}...")
     try:
-        s3_client = boto3.client("s3")
-        
-        # Load model
-        model_obj = s3_client.get_object(Bucket=bucket_name, Key=model_key)
-        model_bytes = model_obj['Body'].read()
-        model = joblib.load(BytesIO(model_bytes))
-        
-        # Load encoder
-        encoder_obj = s3_client.get_object(Bucket=bucket_name, Key=encoder_key)
-        encoder_bytes = encoder_obj['Body'].read()
-        label_encoder = joblib.load(BytesIO(encoder_bytes))
-        
-        print("Model and label encoder loaded successfully from S3.")
+        reloader.reload(trigger="startup")
+        print("Model and label encoder loaded successfully.")
     except Exception as e:
-        print(f"ERROR: Failed to load model from S3: {e}")
-        # Keep them as None if loading fails
-        model = None
-        label_encoder = None
+        # The API stays unhealthy until a later reload succeeds
+        print(f"ERROR: Failed to load model: {e}")
+
+def restore_compiled_bundle():
+    """
+    Starts serving the compiled forest saved for the configured source by an earlier
+    run, skipping the model download, unpickling and scikit-learn. The startup hook
+    then checks the source for a newer version in the background. Returns True on success.
+    """
+    source_key = getattr(reloader.source, "cache_key", None)
+    cached = artifact_cache.latest_compiled(source_key) if source_key else None
+    if cached is None:
+        return False
+    path, version = cached
+    started = time.perf_counter()
+    try:
+        engine = CompiledForest.load(path)
+        if engine.feature_names != FEATURE_ORDER or engine.label_names is None:
+            raise ValueError("saved forest does not match the API's features or has no label names")
+    except Exception as e:
+        print(f"WARNING: Could not restore compiled model from {path}, loading from {reloader.source.name}: {e}")
+        return False
+    ARTIFACT_LOAD_SECONDS.labels(artifact="compiled", cache_result="hit").observe(time.perf_counter() - started)
+    cascade = build_cascade(load_config(), version, engine, engine.label_names)
+    reloader.restore(ModelBundle(None, None, engine, version, reloader.source.name, FEATURE_ORDER, cascade=cascade))
+    print(f"Restored compiled model version {version} from the artifact cache.")
+    return True
+
+def compile_model(model, engine_name, label_names=None):
+    """Flattens the forest into NumPy node tables, falling back to sklearn if that is not possible."""
+    if engine_name != "compiled":
+        return None
+    try:
+        compiled = CompiledForest.from_sklearn(model, feature_names=FEATURE_ORDER, label_names=label_names)
+        print(f"Compiled forest engine ready ({compiled.n_trees} trees, depth {compiled.max_depth}).")
+        return compiled
+    except (TypeError, ValueError) as e:
+        print(f"WARNING: Could not compile model, serving with sklearn: {e}")
+        return None
+
+def require_bundle():
+    bundle = active_bundle
+    if bundle is None:
+        raise HTTPException(status_code=503, detail=MODEL_NOT_LOADED_DETAIL)
+    return bundle
+
+def score_with_active_bundle(x):
+    """Scores x with the active bundle and returns the bundle too, so results are decoded with its encoder."""
+    bundle = active_bundle
+    labels, proba = bundle.score(x)
+    return labels, proba, bundle
+
+def timed(endpoint):
+    """Dependency handing the endpoint a StageTimer, exported (and any sampled profile written) when the request ends."""
+    async def dependency():
+        timer = StageTimer(endpoint)
+        session = profiler.maybe_start(endpoint) if profiler is not None else None
+        try:
+            yield timer
+        finally:
+            timer.observe()
+            if session is not None:
+                session.stop()
+    return dependency
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Guards admin endpoints with the EPL_ADMIN_TOKEN environment variable when it is set."""
+    expected = os.environ.get("EPL_ADMIN_TOKEN")
+    if expected and x_admin_token != expected:
+        raise HTTPException(status_code=401, detail="Missing or invalid X-Admin-Token header.")
 
 app = FastAPI(
     title="EPL Score Prediction API",
     description="API to predict English Premier League match outcomes.",
     version="1.0.0"
 )
+# Samples /predict and /batch_predict traffic for benchmarks/loadtest.py when inference.recording is enabled
+app.add_middleware(RecordingMiddleware, get_recorder=lambda: recorder)
 
 # --- Pydantic Models for Input Validation ---
 class MatchFeatures(BaseModel):
@@ -69,75 +219,318 @@ class MatchFeatures(BaseModel):
 class BatchRequest(BaseModel):
     matches: List[MatchFeatures]
 
+class TeamsRequest(BaseModel):
+    home_team: str
+    away_team: str
+
+class ReloadRequest(BaseModel):
+    version: Optional[str] = None  # None loads the latest version and resumes watching
+
+class ProfilingRequest(BaseModel):
+    sample_every: int  # profile 1 in N requests; 0 turns profiling off
+    interval_ms: Optional[float] = None
+
+# Column order the model was trained with (pydantic v2 exposes model_fields, v1 __fields__)
+FEATURE_ORDER = list(getattr(MatchFeatures, "model_fields", None) or MatchFeatures.__fields__)
+
+def model_schema(model_cls):
+    """JSON schema of a pydantic model (v2 model_json_schema, v1 schema)."""
+    return model_cls.model_json_schema() if hasattr(model_cls, "model_json_schema") else model_cls.schema()
+
+def json_body(model_cls):
+    """OpenAPI request body for endpoints that read and validate the JSON body themselves."""
+    return {"requestBody": {"required": True, "content": {"application/json": {"schema": model_schema(model_cls)}}}}
+
+def parse_body(model_cls, body):
+    """Validates a raw JSON body, reporting errors the way FastAPI's own body validation does."""
+    try:
+        return model_cls(**json.loads(body))
+    except ValidationError as e:
+        raise RequestValidationError([{**error, "loc": ("body", *error["loc"])} for error in e.errors()])
+    except (ValueError, TypeError):
+        raise RequestValidationError([{"loc": ("body",), "msg": f"Body must be a JSON object matching {model_cls.__name__}.", "type": "value_error"}])
+
+def team_features_row(home_team, away_team):
+    """The feature row for a fixture from the feature store (whose FEATURES order is FEATURE_ORDER)."""
+    store = feature_store
+    if store is None or store.version is None:
+        raise HTTPException(status_code=503, detail=FEATURES_NOT_LOADED_DETAIL)
+    features = store.lookup(home_team, away_team)
+    if features is None:
+        home_index, away_index, _ = store.snapshot()
+        unknown = [team for team, index in ((home_team, home_index), (away_team, away_index)) if team not in index]
+        raise HTTPException(status_code=404, detail=f"No features for team(s): {', '.join(unknown)}.")
+    return features.reshape(1, -1)
+
+def features_to_matrix(matches):
+    """Packs validated feature objects into a float64 matrix in FEATURE_ORDER."""
+    return np.array([[getattr(m, name) for name in FEATURE_ORDER] for m in matches], dtype=np.float64)
+
 # --- API Endpoints ---
 @app.on_event("startup")
-def startup_event():
-    """Load the model during API startup."""
-    load_model_from_s3()
+async def startup_event():
+    """Load the model during API startup and start the reloader, feature store, result cache, profiler and optional micro-batcher."""
+    global batcher, result_cache, profiler, recorder, feature_store
+    config = load_config()
+    inference_config = config.get("inference", {})
+    profiler = SamplingProfiler.from_config(config)
+    recorder = TrafficRecorder.from_config(config)
+    if recorder is not None:
+        print(f"Recording 1 in {recorder.sample_every} prediction requests to {recorder.path}.")
+    cache_config = inference_config.get("result_cache", {})
+    if cache_config.get("enabled", True):
+        result_cache = ResultCache(
+            max_entries=cache_config.get("max_entries", 10000),
+            ttl_s=cache_config.get("ttl_s", 3600),
+        )
+        print(f"Prediction cache enabled ({result_cache.max_entries} entries, TTL {result_cache.ttl_s}s).")
+
+    # Under gunicorn the model is loaded once in the master before forking (see
+    # gunicorn_conf.py), so workers start with a shared copy-on-write bundle
+    if active_bundle is None:
+        await run_in_threadpool(load_model_from_s3)
+
+    # A bundle restored from the compiled cache may be stale, so check the source right away
+    restored = active_bundle is not None and active_bundle.model is None
+    if reloader is not None and inference_config.get("reload", {}).get("enabled", True):
+        reloader.start(check_now=restored)
+        print(f"Watching {reloader.source.name} for new model versions every {reloader.poll_interval_s}s.")
+    elif reloader is not None and restored:
+        threading.Thread(target=reloader.check, kwargs={"trigger": "startup"}, name="model-version-check", daemon=True).start()
+
+    # Loaded in the background so a slow or missing store does not hold up /predict
+    feature_store = FeatureStore(feature_store_path(config), refresh_interval_s=config.get("feature_store", {}).get("refresh_s", 30))
+    threading.Thread(target=feature_store.start, name="feature-store-load", daemon=True).start()
+
+    batching_config = inference_config.get("micro_batching", {})
+    if batching_config.get("enabled", False):
+        batcher = MicroBatcher(
+            score_with_active_bundle,
+            max_wait_ms=batching_config.get("max_wait_ms", 2),
+            max_batch_size=batching_config.get("max_batch_size", 64),
+        )
+        batcher.start()
+        print(f"Micro-batching enabled (max wait {batcher.max_wait * 1000:g} ms, max batch {batcher.max_batch_size}).")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the reloader, the feature store watcher and the micro-batcher, failing any requests still queued."""
+    global batcher
+    if reloader is not None:
+        reloader.stop()
+    if feature_store is not None:
+        feature_store.stop()
+    if batcher is not None:
+        await batcher.stop()
+        batcher = None
 
 @app.get("/health", summary="Check API Health")
 def health():
     """Check if the API is running and the model is loaded."""
-    if model is None or label_encoder is None:
-        raise HTTPException(status_code=503, detail=MODEL_NOT_LOADED_DETAIL)
+    require_bundle()
     return {"status": "ok", "model_loaded": True}
 
-@app.post("/predict", summary="Predict a single match outcome")
-def predict(features: MatchFeatures):
+@app.post("/predict", summary="Predict a single match outcome", openapi_extra=json_body(MatchFeatures))
+async def predict(request: Request, timer: StageTimer = Depends(timed("predict"))):
     """
     Predicts the outcome of a single EPL match.
     - **Input**: Rolling average stats for home and away teams.
     - **Output**: Predicted outcome ('H' for Home Win, 'D' for Draw, 'A' for Away Win).
     """
-    if model is None:
-        raise HTTPException(status_code=503, detail=MODEL_NOT_LOADED_DETAIL)
+    # The body is validated and the response serialized here rather than by
+    # FastAPI so both show up as stages in inference_stage_seconds
+    body = await request.body()
+    with timer.stage("validate"):
+        features = parse_body(MatchFeatures, body)
 
-    # Convert Pydantic model to DataFrame
-    input_df = pd.DataFrame([features.dict()])
-    
-    # Predict
-    prediction_encoded = model.predict(input_df)[0]
-    prediction_proba = model.predict_proba(input_df)[0]
+    bundle = require_bundle()
+    timer.model_version = bundle.version
+    with timer.stage("features"):
+        row = features_to_matrix([features])
+
+    result = await predict_cached(row, bundle, timer)
+    with timer.stage("serialize"):
+        return JSONResponse(result)
+
+@app.post("/predict_by_teams", summary="Predict a match outcome from the team names", openapi_extra=json_body(TeamsRequest))
+async def predict_by_teams(request: Request, timer: StageTimer = Depends(timed("predict_by_teams"))):
+    """
+    Predicts the outcome of a match between two teams.
+    - **Input**: Home and away team names.
+    - **Output**: Predicted outcome and probabilities, using each team's latest rolling features
+      from the feature store (the same features training computes).
+    """
+    body = await request.body()
+    with timer.stage("validate"):
+        teams = parse_body(TeamsRequest, body)
+
+    bundle = require_bundle()
+    timer.model_version = bundle.version
+    with timer.stage("features"):
+        row = team_features_row(teams.home_team, teams.away_team)
+
+    result = await predict_cached(row, bundle, timer)
+    with timer.stage("serialize"):
+        return JSONResponse({"home_team": teams.home_team, "away_team": teams.away_team, **result})
+
+async def predict_cached(row, bundle, timer):
+    """predict_row through the result cache, when it is enabled."""
+    if result_cache is None:
+        return await predict_row(row, bundle, timer)
+    # Identical feature vectors for the same model share one cached answer, and
+    # concurrent duplicates wait for the first one instead of scoring again
+    key = ResultCache.make_key(bundle.version, row)
+    return await result_cache.get_or_compute(key, lambda: predict_row(row, bundle, timer))
+
+async def predict_row(row, bundle, timer):
+    """Scores a single feature row and formats the /predict response."""
+    # Label and probabilities from a single pass over the forest, shared with
+    # other concurrent requests when micro-batching is enabled
+    if batcher is not None:
+        with timer.stage("batched_score"):
+            prediction_encoded, prediction_proba, bundle = await batcher.submit(row[0])
+    else:
+        predictions_encoded, predictions_proba = await run_in_threadpool(bundle.score, row, timer)
+        prediction_encoded = predictions_encoded[0]
+        prediction_proba = predictions_proba[0]
 
     # Decode prediction and format probabilities
-    prediction_decoded = label_encoder.inverse_transform([prediction_encoded])[0]
-    probabilities = dict(zip(label_encoder.classes_, prediction_proba))
+    with timer.stage("decode"):
+        prediction_decoded = bundle.decode([prediction_encoded])[0]
+        probabilities = dict(zip(bundle.class_names, prediction_proba))
 
     return {
         "predicted_outcome": prediction_decoded,
         "probabilities": probabilities
     }
 
-@app.post("/batch_predict", summary="Predict multiple match outcomes")
-def batch_predict(batch: BatchRequest):
+@app.post(
+    "/batch_predict",
+    summary="Predict multiple match outcomes",
+    openapi_extra={"requestBody": {"required": True, "content": {
+        "application/json": {"schema": model_schema(BatchRequest)},
+        columnar.FLOAT32_MATRIX: {"schema": {"type": "string", "format": "binary"}},
+        columnar.ARROW_STREAM: {"schema": {"type": "string", "format": "binary"}},
+    }}},
+)
+async def batch_predict(request: Request, timer: StageTimer = Depends(timed("batch_predict"))):
     """
     Predicts outcomes for a batch of EPL matches.
-    - **Input**: A list of match features.
-    - **Output**: A list of predicted outcomes and their probabilities.
+    - **Input**: A JSON list of match features, or for bulk scoring a columnar body:
+      `application/x-epl-float32` (little-endian float32 rows, column order in the
+      `X-Columns` header) or `application/vnd.apache.arrow.stream`.
+    - **Output**: A list of predicted outcomes and their probabilities. Columnar
+      requests are answered with a streamed NDJSON body, or an Arrow stream when
+      `Accept: application/vnd.apache.arrow.stream` is sent.
     """
-    if model is None:
-        raise HTTPException(status_code=503, detail=MODEL_NOT_LOADED_DETAIL)
-        
-    # Convert list of Pydantic models to DataFrame
-    input_df = pd.DataFrame([m.dict() for m in batch.matches])
-    
-    # Predict
-    predictions_encoded = model.predict(input_df)
-    predictions_proba = model.predict_proba(input_df)
+    content_type = columnar.media_type(request.headers.get("content-type"))
+    if content_type in columnar.REQUEST_TYPES:
+        bundle = require_bundle()
+        timer.model_version = bundle.version
+        return await columnar_batch_predict(request, content_type, bundle, timer)
+
+    body = await request.body()
+    with timer.stage("validate"):
+        batch = parse_body(BatchRequest, body)
+
+    bundle = require_bundle()
+    timer.model_version = bundle.version
+    with timer.stage("features"):
+        matrix = features_to_matrix(batch.matches)
+
+    # Label and probabilities from a single pass over the forest
+    predictions_encoded, predictions_proba = await run_in_threadpool(bundle.score, matrix, timer)
 
     # Decode predictions
-    predictions_decoded = label_encoder.inverse_transform(predictions_encoded)
+    with timer.stage("decode"):
+        predictions_decoded = bundle.decode(predictions_encoded)
 
-    results = []
-    for i, outcome in enumerate(predictions_decoded):
-        probabilities = dict(zip(label_encoder.classes_, predictions_proba[i]))
-        results.append({
-            "predicted_outcome": outcome,
-            "probabilities": probabilities
-        })
+        results = []
+        for i, outcome in enumerate(predictions_decoded):
+            probabilities = dict(zip(bundle.class_names, predictions_proba[i]))
+            results.append({
+                "predicted_outcome": outcome,
+                "probabilities": probabilities
+            })
 
-    return {"predictions": results}
+    with timer.stage("serialize"):
+        return JSONResponse({"predictions": results})
 
-Instrumentator().instrument(app).expose(app)
+async def columnar_batch_predict(request, content_type, bundle, timer):
+    """Scores a float32 or Arrow body as one matrix and streams the predictions back."""
+    columnar_config = load_config().get("inference", {}).get("columnar", {})
+    body = await request.body()
+    # Scoring and serialization happen while the response streams, after the timer is exported
+    try:
+        with timer.stage("validate"):
+            if content_type == columnar.FLOAT32_MATRIX:
+                matrix = columnar.decode_float32_matrix(body, FEATURE_ORDER, request.headers.get("x-columns"))
+            else:
+                matrix = columnar.decode_arrow_stream(body, FEATURE_ORDER)
+            columnar.validate_features(
+                matrix, FEATURE_ORDER,
+                columnar_config.get("min_feature_value", 0.0),
+                columnar_config.get("max_feature_value", 100.0),
+            )
+    except columnar.PayloadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
 
-start_http_server(8002) 
\ No newline at end of file
+    chunk_rows = columnar_config.get("chunk_rows", 8192)
+    class_names = bundle.class_names
+    if columnar.media_type(request.headers.get("accept")) == columnar.ARROW_STREAM:
+        if not columnar.arrow_available():
+            raise HTTPException(status_code=406, detail="Arrow responses need pyarrow, which is not installed on this server.")
+        stream = columnar.arrow_response_stream(matrix, bundle.score, class_names, chunk_rows)
+        return StreamingResponse(stream, media_type=columnar.ARROW_STREAM)
+    stream = columnar.ndjson_stream(matrix, bundle.score, class_names, chunk_rows)
+    return StreamingResponse(stream, media_type=columnar.NDJSON)
+
+@app.get("/admin/model", summary="Show the active model version", dependencies=[Depends(require_admin)])
+def model_status():
+    """Reports the model serving traffic and the state of the background reloader."""
+    bundle = active_bundle
+    return {
+        "active": bundle.describe() if bundle is not None else None,
+        "reloader": reloader.status() if reloader is not None else None,
+    }
+
+@app.post("/admin/model/reload", summary="Reload or pin a model version", dependencies=[Depends(require_admin)])
+async def reload_model(reload_request: Optional[ReloadRequest] = None):
+    """
+    Loads a model version off the request path and swaps it in atomically.
+    - **version**: Version to pin (MLflow registry version, or S3
+      "<model VersionId>:<encoder VersionId>[:<first stage VersionId>]").
+      Omit it to load the latest version and resume watching for new ones.
+    """
+    if reloader is None:
+        raise HTTPException(status_code=503, detail="Model reloader is not running.")
+    version = reload_request.version if reload_request is not None else None
+    try:
+        bundle = await run_in_threadpool(reloader.pin, version)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Reload failed, still serving the previous model: {e}")
+    return {"active": bundle.describe(), "reloader": reloader.status()}
+
+@app.get("/admin/profiling", summary="Show sampling profiler settings", dependencies=[Depends(require_admin)])
+def profiling_status():
+    return profiler.status() if profiler is not None else None
+
+@app.post("/admin/profiling", summary="Change sampling profiler settings", dependencies=[Depends(require_admin)])
+def configure_profiling(profiling_request: ProfilingRequest):
+    """
+    Turns request profiling on or off without a restart. Settings apply to the
+    worker process that handles this call (see api.workers).
+    - **sample_every**: Profile 1 in N requests; 0 turns profiling off.
+    - **interval_ms**: Stack sampling interval.
+    """
+    if profiler is None:
+        raise HTTPException(status_code=503, detail="Profiler is not initialised.")
+    if profiling_request.sample_every < 0:
+        raise HTTPException(status_code=422, detail="sample_every must be 0 or more.")
+    profiler.sample_every = profiling_request.sample_every
+    if profiling_request.interval_ms is not None:
+        profiler.interval_ms = profiling_request.interval_ms
+    return profiler.status()
+
+# Aggregates across gunicorn workers when PROMETHEUS_MULTIPROC_DIR is set
+Instrumentator().instrument(app).expose(app)
@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+import numpy as np
+from prometheus_client import Histogram
+
+BATCH_SIZE = Histogram(
+    "predict_microbatch_size",
+    "Number of /predict requests coalesced into one model call",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+QUEUE_WAIT = Histogram(
+    "predict_microbatch_queue_wait_seconds",
+    "Time a /predict request waited to be picked up by a micro-batch",
+    buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25),
+)
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-row predictions into one model call.
+
+    Requests are queued until either max_batch_size rows are waiting or the oldest
+    row has waited max_wait_ms. While a batch is being scored new rows keep
+    queueing, so batches grow with load and a lone request never waits longer than
+    the window. score_fn takes a 2D array and returns (labels, probabilities,
+    *extra); it runs in the default executor so the event loop stays free. Each
+    caller gets (label, probabilities, *extra) for its own row.
+    """
+
+    def __init__(self, score_fn, max_wait_ms=2.0, max_batch_size=64):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1.")
+        self.score_fn = score_fn
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_size = int(max_batch_size)
+        self._pending = []
+        self._has_items = None
+        self._batch_full = None
+        self._worker = None
+
+    def start(self):
+        """Starts the batching loop on the running event loop."""
+        self._has_items = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stops the batching loop and fails any requests still waiting."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        for _, future, _ in self._pending:
+            if not future.done():
+                future.set_exception(RuntimeError("Micro-batcher stopped before the request was scored."))
+        self._pending = []
+
+    async def submit(self, row):
+        """Queues one feature row and waits for its (label, probabilities, *extra) result."""
+        if self._worker is None:
+            raise RuntimeError("MicroBatcher.start() must be called before submitting requests.")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((row, future, time.perf_counter()))
+        self._has_items.set()
+        if len(self._pending) >= self.max_batch_size:
+            self._batch_full.set()
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._has_items.wait()
+
+            # Hold the batch open until it fills up or the oldest request's window closes
+            remaining = self._pending[0][2] + self.max_wait - time.perf_counter()
+            if len(self._pending) < self.max_batch_size and remaining > 0:
+                self._batch_full.clear()
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            if not self._pending:
+                self._has_items.clear()
+            if len(self._pending) < self.max_batch_size:
+                self._batch_full.clear()
+
+            # Requests cancelled while queued (e.g. client disconnects) are not scored
+            batch = [item for item in batch if not item[1].done()]
+            if batch:
+                await self._score(loop, batch)
+
+    async def _score(self, loop, batch):
+        started = time.perf_counter()
+        for _, _, enqueued in batch:
+            QUEUE_WAIT.observe(started - enqueued)
+        BATCH_SIZE.observe(len(batch))
+
+        try:
+            x = np.vstack([row for row, _, _ in batch])
+            labels, proba, *extra = await loop.run_in_executor(None, self.score_fn, x)
+        except asyncio.CancelledError:
+            for _, future, _ in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for i, (_, future, _) in enumerate(batch):
+            if not future.done():
+                future.set_result((labels[i], proba[i], *extra))
@@ -0,0 +1,347 @@
+import os
+import threading
+import time
+from io import BytesIO
+
+import numpy as np
+from prometheus_client import Counter, Gauge
+
+from inference.cascade import ARTIFACT_PATH, FirstStage, load_first_stage
+from inference.stage_timer import NULL_TIMER
+
+MODEL_RELOADS = Counter(
+    "model_reloads_total",
+    "Model reload attempts by trigger and result",
+    ["trigger", "result"],
+)
+MODEL_RELOAD_SECONDS = Gauge(
+    "model_reload_duration_seconds",
+    "Time taken to fetch, load and compile the most recently activated model",
+    multiprocess_mode="mostrecent",
+)
+MODEL_LOADED_TIMESTAMP = Gauge(
+    "model_loaded_timestamp_seconds",
+    "Unix time at which the active model was swapped in",
+    multiprocess_mode="livemax",
+)
+ACTIVE_MODEL_VERSION = Gauge(
+    "model_active_version_info",
+    "1 for each model version served by at least one live process",
+    ["version", "source"],
+    multiprocess_mode="livemax",
+)
+
+
+class ModelBundle:
+    """
+    A model, its label encoder and compiled engine, activated and retired as one unit.
+
+    A bundle restored from a saved CompiledForest has no model or label encoder;
+    it scores with the engine and decodes labels with the names saved alongside it.
+    With a cascade, rows the distilled first stage is confident about skip the forest.
+    """
+
+    def __init__(self, model, label_encoder, engine, version, source, feature_order, cascade=None):
+        self.model = model
+        self.label_encoder = label_encoder
+        self.engine = engine
+        self.version = version
+        self.source = source
+        self.feature_order = feature_order
+        self.cascade = cascade
+        self.loaded_at = time.time()
+
+    @property
+    def class_names(self):
+        if self.label_encoder is None:
+            return self.engine.label_names
+        return self.label_encoder.classes_
+
+    def decode(self, encoded):
+        """Maps encoded labels back to outcome names (LabelEncoder.inverse_transform without its checks)."""
+        return np.asarray(self.class_names).take(np.asarray(encoded, dtype=np.intp))
+
+    def score(self, x, timer=NULL_TIMER):
+        """Returns encoded labels and class probabilities for a 2D array in feature_order."""
+        if self.cascade is not None:
+            return self.cascade.score(x, lambda rows: self.score_forest(rows, timer), timer)
+        return self.score_forest(x, timer)
+
+    def score_forest(self, x, timer=NULL_TIMER):
+        """score() with the full model only."""
+        if self.engine is not None:
+            # Labels come from the same pass as the probabilities
+            with timer.stage("predict_proba"):
+                return self.engine.predict_with_proba(x)
+        import pandas as pd
+        with timer.stage("dataframe"):
+            input_df = pd.DataFrame(x, columns=self.feature_order)
+        with timer.stage("predict"):
+            labels = self.model.predict(input_df)
+        with timer.stage("predict_proba"):
+            proba = self.model.predict_proba(input_df)
+        return labels, proba
+
+    def describe(self):
+        return {
+            "version": self.version,
+            "source": self.source,
+            "loaded_at": self.loaded_at,
+            "engine": "compiled" if self.engine is not None else "sklearn",
+            "restored_from_compiled": self.model is None,
+            "cascade": self.cascade.describe() if self.cascade is not None else None,
+        }
+
+
+def _etag(s3_response):
+    return s3_response["ETag"].strip('"')
+
+
+class S3ModelSource:
+    """
+    Model and encoder pickles at fixed S3 keys; the version is the pair of object
+    ETags. The cascade's first stage, when published, is read from first_stage_key.
+    """
+    name = "s3"
+
+    def __init__(self, bucket, model_key, encoder_key, cache=None, first_stage_key=None):
+        self.bucket = bucket
+        self.model_key = model_key
+        self.encoder_key = encoder_key
+        self.first_stage_key = first_stage_key
+        self.cache = cache
+        self.cache_key = f"s3://{bucket}/{model_key}"
+
+    def _client(self):
+        import boto3
+        return boto3.client("s3")
+
+    def latest_version(self):
+        s3_client = self._client()
+        model_head = s3_client.head_object(Bucket=self.bucket, Key=self.model_key)
+        encoder_head = s3_client.head_object(Bucket=self.bucket, Key=self.encoder_key)
+        return f"{_etag(model_head)}:{_etag(encoder_head)}"
+
+    def load(self, version=None):
+        """
+        Returns (model, label_encoder, version). Pinning needs bucket versioning:
+        pass "<model VersionId>:<encoder VersionId>" so both objects come from
+        the same training run (a bare model VersionId reads the latest encoder).
+        """
+        model_version_id, _, encoder_version_id = (version or "").partition(":")
+        model_version_id, encoder_version_id = model_version_id or None, encoder_version_id or None
+        if self.cache is not None:
+            model, model_etag = self.cache.load(self.bucket, self.model_key, version_id=model_version_id)
+            label_encoder, encoder_etag = self.cache.load(self.bucket, self.encoder_key, version_id=encoder_version_id)
+            return model, label_encoder, version or f"{model_etag}:{encoder_etag}"
+
+        import joblib
+        s3_client = self._client()
+        extra = {"VersionId": model_version_id} if model_version_id else {}
+        model_obj = s3_client.get_object(Bucket=self.bucket, Key=self.model_key, **extra)
+        model = joblib.load(BytesIO(model_obj["Body"].read()))
+        extra = {"VersionId": encoder_version_id} if encoder_version_id else {}
+        encoder_obj = s3_client.get_object(Bucket=self.bucket, Key=self.encoder_key, **extra)
+        label_encoder = joblib.load(BytesIO(encoder_obj["Body"].read()))
+        loaded_version = version or f"{_etag(model_obj)}:{_etag(encoder_obj)}"
+        return model, label_encoder, loaded_version
+
+    def load_first_stage(self, version=None):
+        """
+        The first stage for a version, or None without first_stage_key. A pinned
+        version may add the first stage's VersionId as a third part; otherwise the
+        latest object is read, and the caller checks it matches the forest.
+        """
+        if not self.first_stage_key:
+            return None
+        parts = (version or "").split(":")
+        version_id = parts[2] if len(parts) > 2 and parts[2] else None
+        return load_first_stage(f"s3://{self.bucket}/{self.first_stage_key}", version_id=version_id)
+
+
+class LocalModelSource:
+    """Model and encoder pickles on local disk (development and benchmarks); the version is their mtimes."""
+    name = "local"
+
+    def __init__(self, model_path, encoder_path, first_stage_path=None):
+        self.model_path = model_path
+        self.encoder_path = encoder_path
+        self.first_stage_path = first_stage_path
+        self.cache_key = f"file://{os.path.abspath(model_path)}"
+
+    def latest_version(self):
+        return f"{os.stat(self.model_path).st_mtime_ns}:{os.stat(self.encoder_path).st_mtime_ns}"
+
+    def load(self, version=None):
+        loaded_version = self.latest_version()
+        if version is not None and version != loaded_version:
+            raise ValueError(f"Local files only hold version {loaded_version}, not {version}.")
+        import joblib
+        return joblib.load(self.model_path, mmap_mode="r"), joblib.load(self.encoder_path), loaded_version
+
+    def load_first_stage(self, version=None):
+        """The first stage at first_stage_path, or None when there is none."""
+        return load_first_stage(self.first_stage_path) if self.first_stage_path else None
+
+
+class MlflowModelSource:
+    """Versions of a registered MLflow model; the encoder and first stage are read from the version's run artifacts."""
+    name = "mlflow"
+
+    def __init__(self, tracking_uri, model_name, encoder_artifact_path="encoder/label_encoder.pkl",
+                 first_stage_artifact_path=ARTIFACT_PATH):
+        import mlflow
+        self.mlflow = mlflow
+        self.mlflow.set_tracking_uri(tracking_uri)
+        self.client = mlflow.tracking.MlflowClient()
+        self.model_name = model_name
+        self.encoder_artifact_path = encoder_artifact_path
+        self.first_stage_artifact_path = first_stage_artifact_path
+        self.cache_key = f"mlflow:{tracking_uri}:{model_name}"
+
+    def latest_version(self):
+        versions = self.client.search_model_versions(f"name='{self.model_name}'")
+        if not versions:
+            raise ValueError(f"No versions registered for model '{self.model_name}'.")
+        return str(max(int(v.version) for v in versions))
+
+    def load(self, version=None):
+        version = str(version or self.latest_version())
+        model_version = self.client.get_model_version(self.model_name, version)
+        model = self.mlflow.sklearn.load_model(f"models:/{self.model_name}/{version}")
+        encoder_path = self.mlflow.artifacts.download_artifacts(
+            run_id=model_version.run_id, artifact_path=self.encoder_artifact_path
+        )
+        import joblib
+        return model, joblib.load(encoder_path), version
+
+    def load_first_stage(self, version=None):
+        """The first stage logged by the run that trained this model version."""
+        version = str(version or self.latest_version())
+        model_version = self.client.get_model_version(self.model_name, version)
+        path = self.mlflow.artifacts.download_artifacts(
+            run_id=model_version.run_id, artifact_path=self.first_stage_artifact_path
+        )
+        return FirstStage.load(path)
+
+
+class ModelReloader:
+    """
+    Polls a model source in a background thread and swaps in new versions.
+
+    build_bundle(model, label_encoder, version, source_name) turns loaded artifacts
+    into a ModelBundle (e.g. compiling the forest) and activate(bundle) publishes it.
+    Everything except the final activate call happens off the request path, so
+    in-flight requests keep the bundle they started with.
+    """
+
+    def __init__(self, source, build_bundle, activate, poll_interval_s=60):
+        self.source = source
+        self.build_bundle = build_bundle
+        self.activate = activate
+        self.poll_interval_s = poll_interval_s
+        self.active_version = None
+        self.pinned_version = None
+        self.last_checked_at = None
+        self.last_error = None
+        # Reentrant, so pin can hold it across reload and set pinned_version with it
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, check_now=False):
+        """Starts polling; check_now runs the first check immediately instead of after one interval."""
+        self._thread = threading.Thread(target=self._poll, args=(check_now,), name="model-reloader", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _poll(self, check_now):
+        delay = 0 if check_now else self.poll_interval_s
+        while not self._stop.wait(delay):
+            delay = self.poll_interval_s
+            if self.pinned_version is None:
+                self.check()
+
+    def check(self, trigger="watch"):
+        """
+        Reloads when the source has a version other than the active one and
+        none is pinned; failures are reported, not raised.
+        """
+        try:
+            self.last_checked_at = time.time()
+            latest = self.source.latest_version()
+        except Exception as e:
+            self.last_error = f"Version check failed: {e}"
+            print(f"WARNING: {self.last_error}")
+            return
+        with self._lock:
+            # A version pinned while the source was checked stays active
+            if self.pinned_version is not None or latest == self.active_version:
+                return
+            try:
+                self.reload(trigger=trigger)
+            except Exception:
+                # Keep serving the current model and try again on the next poll
+                print(f"WARNING: {self.last_error}")
+
+    def reload(self, version=None, trigger="startup"):
+        """Loads a version (latest when None) and activates it. Returns the new bundle."""
+        with self._lock:
+            started = time.perf_counter()
+            try:
+                model, label_encoder, loaded_version = self.source.load(version)
+                bundle = self.build_bundle(model, label_encoder, loaded_version, self.source.name)
+            except Exception as e:
+                MODEL_RELOADS.labels(trigger=trigger, result="failure").inc()
+                self.last_error = f"Loading version {version or 'latest'} failed: {e}"
+                raise
+            self._activate(bundle, trigger, started)
+            return bundle
+
+    def restore(self, bundle, trigger="restore"):
+        """Activates a bundle built elsewhere, e.g. from a cached compiled forest, as the current version."""
+        with self._lock:
+            self._activate(bundle, trigger, time.perf_counter())
+
+    def _activate(self, bundle, trigger, started):
+        """Publishes bundle and updates the version metrics; callers hold the lock."""
+        loaded_version = bundle.version
+        previous = self.active_version
+        self.activate(bundle)
+        self.active_version = loaded_version
+        self.last_error = None
+        MODEL_RELOADS.labels(trigger=trigger, result="success").inc()
+        MODEL_RELOAD_SECONDS.set(time.perf_counter() - started)
+        MODEL_LOADED_TIMESTAMP.set(bundle.loaded_at)
+        if previous is not None:
+            # Zero first: in multiprocess mode a removed child keeps its last value on disk
+            ACTIVE_MODEL_VERSION.labels(version=previous, source=self.source.name).set(0)
+            ACTIVE_MODEL_VERSION.remove(previous, self.source.name)
+        ACTIVE_MODEL_VERSION.labels(version=loaded_version, source=self.source.name).set(1)
+        print(f"Activated model version {loaded_version} from {self.source.name} "
+              f"({trigger}, {time.perf_counter() - started:.2f}s).")
+
+    def pin(self, version):
+        """Loads and holds a specific version; None returns to following the latest one."""
+        with self._lock:
+            if version is None:
+                self.pinned_version = None
+                return self.reload(trigger="admin")
+            bundle = self.reload(version=version, trigger="admin")
+            self.pinned_version = version
+            return bundle
+
+    def status(self):
+        return {
+            "source": self.source.name,
+            "active_version": self.active_version,
+            "pinned_version": self.pinned_version,
+            "poll_interval_s": self.poll_interval_s,
+            "last_checked_at": self.last_checked_at,
+            "last_error": self.last_error,
+        }
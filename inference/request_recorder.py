@@ -0,0 +1,105 @@
+import base64
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+RECORDED_HEADERS = ("content-type", "accept", "x-columns")
+
+
+class TrafficRecorder:
+    """
+    Appends sampled API requests to a JSON Lines file that benchmarks/loadtest.py
+    can replay. Each line holds the method, path, replay-relevant headers, body
+    (JSON as text, columnar payloads base64-encoded), response status and latency.
+    Recording stops once the file reaches max_bytes.
+    """
+
+    def __init__(self, path, sample_every=1, max_bytes=100 * 1024 ** 2):
+        self.path = Path(path)
+        self.sample_every = max(1, int(sample_every))
+        self.max_bytes = int(max_bytes)
+        self._seen = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config):
+        """Returns a recorder when inference.recording.enabled is set, else None."""
+        recording_config = config.get("inference", {}).get("recording", {})
+        if not recording_config.get("enabled", False):
+            return None
+        return cls(
+            recording_config.get("path", "benchmarks/requests.jsonl"),
+            sample_every=recording_config.get("sample_every", 1),
+            max_bytes=recording_config.get("max_mb", 100) * 1024 ** 2,
+        )
+
+    def should_record(self):
+        with self._lock:
+            self._seen += 1
+            return self._seen % self.sample_every == 0
+
+    def record(self, method, path, headers, body, status, latency_s):
+        entry = {"ts": time.time(), "method": method, "path": path, "headers": headers}
+        if headers.get("content-type", "application/json").startswith("application/json"):
+            entry["body"] = body.decode("utf-8", errors="replace")
+        else:
+            entry["body_b64"] = base64.b64encode(body).decode("ascii")
+        entry["status"] = status
+        entry["latency_ms"] = round(latency_s * 1000, 3)
+        line = (json.dumps(entry) + "\n").encode("utf-8")
+        with self._lock:
+            try:
+                if self.path.stat().st_size + len(line) > self.max_bytes:
+                    return
+            except FileNotFoundError:
+                pass
+            # One O_APPEND write per line keeps lines whole across gunicorn workers
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+
+
+class RecordingMiddleware:
+    """ASGI middleware passing requests for paths to get_recorder(), when it returns a recorder."""
+
+    def __init__(self, app, get_recorder, paths=("/predict", "/batch_predict")):
+        self.app = app
+        self.get_recorder = get_recorder
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        recorder = self.get_recorder()
+        if (recorder is None or scope["type"] != "http" or scope["path"] not in self.paths
+                or not recorder.should_record()):
+            await self.app(scope, receive, send)
+            return
+
+        chunks = []
+        status = []
+
+        async def recording_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                chunks.append(message.get("body", b""))
+            return message
+
+        async def recording_send(message):
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, recording_receive, recording_send)
+        finally:
+            headers = {
+                name.decode("latin-1"): value.decode("latin-1")
+                for name, value in scope["headers"] if name.decode("latin-1") in RECORDED_HEADERS
+            }
+            recorder.record(scope["method"], scope["path"], headers, b"".join(chunks),
+                            status[0] if status else 500, time.perf_counter() - started)
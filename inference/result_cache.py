@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+from prometheus_client import Counter, Gauge
+
+CACHE_REQUESTS = Counter(
+    "prediction_cache_requests_total",
+    "Prediction cache lookups; coalesced requests waited on an identical in-flight prediction",
+    ["result"],
+)
+CACHE_EVICTIONS = Counter(
+    "prediction_cache_evictions_total",
+    "Entries removed from the prediction cache",
+    ["reason"],
+)
+CACHE_ENTRIES = Gauge(
+    "prediction_cache_entries",
+    "Entries currently held in the prediction cache",
+    multiprocess_mode="livesum",
+)
+
+
+class ResultCache:
+    """
+    LRU + TTL cache of prediction responses with single-flight deduplication.
+
+    Keys combine the model version with the exact feature vector, so a new model
+    never serves old answers. While a key is being computed, identical requests
+    await the same future instead of running the model again. Lookups happen on
+    the event loop; clear() may be called from any thread (e.g. the model reloader).
+    """
+
+    def __init__(self, max_entries=10000, ttl_s=3600):
+        self.max_entries = int(max_entries)
+        self.ttl_s = ttl_s
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model_version, row):
+        """Key for one feature row (a NumPy array) scored by a given model version."""
+        return model_version, row.dtype.str, row.tobytes()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                CACHE_EVICTIONS.labels(reason="expired").inc()
+                CACHE_ENTRIES.set(len(self._entries))
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_s)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                CACHE_EVICTIONS.labels(reason="capacity").inc()
+            CACHE_ENTRIES.set(len(self._entries))
+
+    def clear(self):
+        """Drops every cached response, e.g. after a model swap."""
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+            CACHE_ENTRIES.set(0)
+        if dropped:
+            CACHE_EVICTIONS.labels(reason="invalidated").inc(dropped)
+
+    async def get_or_compute(self, key, compute):
+        """Returns the cached value for key, or awaits compute() once for all concurrent callers."""
+        value = self.get(key)
+        if value is not None:
+            CACHE_REQUESTS.labels(result="hit").inc()
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            CACHE_REQUESTS.labels(result="coalesced").inc()
+            return await asyncio.shield(inflight)
+
+        CACHE_REQUESTS.labels(result="miss").inc()
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        else:
+            self.put(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            del self._inflight[key]
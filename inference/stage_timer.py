@@ -0,0 +1,144 @@
+import collections
+import itertools
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+from prometheus_client import Counter, Histogram
+
+STAGE_SECONDS = Histogram(
+    "inference_stage_seconds",
+    "Time spent in each stage of a prediction request",
+    ["endpoint", "stage", "model_version"],
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
+PROFILES_WRITTEN = Counter(
+    "inference_profiles_written_total",
+    "Sampled request profiles written to disk",
+    ["endpoint"],
+)
+
+
+class StageTimer:
+    """
+    Collects the duration of named stages in one request and exports them together
+    once the request is done, labelled with the model version that served it.
+    """
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.model_version = "none"
+        self.durations = []
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations.append((name, time.perf_counter() - start))
+
+    def observe(self):
+        for name, seconds in self.durations:
+            STAGE_SECONDS.labels(self.endpoint, name, self.model_version).observe(seconds)
+
+
+class NullTimer:
+    """Stand-in for callers that do not time stages."""
+
+    def stage(self, name):
+        return nullcontext()
+
+
+NULL_TIMER = NullTimer()
+
+
+def _fold(frame):
+    """Formats a stack root-first as 'func (file:line);func (file:line);...'."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class ProfileSession:
+    """Samples every thread's stack in the background until stop() is called."""
+
+    def __init__(self, path, interval_s, endpoint):
+        self.path = path
+        self.interval_s = interval_s
+        self.endpoint = endpoint
+        self.counts = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval_s):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    self.counts[f"{names.get(thread_id, thread_id)};{_fold(frame)}"] += 1
+        # Written from this thread so stopping never blocks the request
+        with open(self.path, "w") as f:
+            for stack, count in self.counts.items():
+                f.write(f"{stack} {count}\n")
+        PROFILES_WRITTEN.labels(self.endpoint).inc()
+
+    def stop(self):
+        self._stop.set()
+
+
+class SamplingProfiler:
+    """
+    Profiles 1 in sample_every requests (0 disables it) by sampling all thread
+    stacks every interval_ms while the request runs. Each profile is written as
+    folded stacks (<output_dir>/<time>-<endpoint>-<pid>.folded), the input format
+    of flamegraph.pl and speedscope. Other requests in flight at the same time show
+    up in the samples too; with a small sample_every that is the point - it shows
+    what the process was busy with while the sampled request waited.
+    """
+
+    def __init__(self, output_dir, sample_every=0, interval_ms=5, max_profiles=200):
+        self.output_dir = Path(output_dir)
+        self.sample_every = int(sample_every)
+        self.interval_ms = interval_ms
+        self.max_profiles = max_profiles
+        self._counter = itertools.count(1)
+
+    @classmethod
+    def from_config(cls, config):
+        profiling_config = config.get("inference", {}).get("profiling", {})
+        return cls(
+            profiling_config.get("output_dir", "/tmp/epl-profiles"),
+            sample_every=profiling_config.get("sample_every", 0),
+            interval_ms=profiling_config.get("interval_ms", 5),
+            max_profiles=profiling_config.get("max_profiles", 200),
+        )
+
+    def maybe_start(self, endpoint):
+        """Returns a running ProfileSession for the requests that are sampled, else None."""
+        if self.sample_every <= 0 or next(self._counter) % self.sample_every:
+            return None
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._prune()
+        path = self.output_dir / f"{time.time():.6f}-{endpoint}-{os.getpid()}.folded"
+        return ProfileSession(path, self.interval_ms / 1000, endpoint)
+
+    def _prune(self):
+        profiles = sorted(self.output_dir.glob("*.folded"))
+        for path in profiles[:max(0, len(profiles) - self.max_profiles + 1)]:
+            path.unlink(missing_ok=True)
+
+    def status(self):
+        return {
+            "sample_every": self.sample_every,
+            "interval_ms": self.interval_ms,
+            "output_dir": str(self.output_dir),
+        }
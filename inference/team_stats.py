@@ -0,0 +1,178 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+HOME_FEATURES = ['avg_GoalsScored_home', 'avg_GoalsConceded_home', 'avg_Shots_home', 'avg_ShotsOnTarget_home']
+AWAY_FEATURES = ['avg_GoalsScored_away', 'avg_GoalsConceded_away', 'avg_Shots_away', 'avg_ShotsOnTarget_away']
+FEATURES = HOME_FEATURES + AWAY_FEATURES
+
+
+def parse_match_dates(dates):
+    """
+    Parses match dates: ISO yyyy-mm-dd (as pandas writes processed CSVs) and raw
+    football-data.co.uk dates, which are day-first (dd/mm/yyyy, dd/mm/yy or
+    '1 January 2025'). A single day-first mixed parse would swap day and month
+    of ISO dates, so those are parsed first.
+    """
+    import pandas as pd
+
+    parsed = pd.to_datetime(dates, format='ISO8601', errors='coerce')
+    day_first = parsed.isna() & dates.notna()
+    if day_first.any():
+        parsed[day_first] = pd.to_datetime(dates[day_first], format='mixed', dayfirst=True)
+    return parsed
+
+
+def s3_parts(path):
+    """Splits an s3://bucket/key URI into (bucket, key)."""
+    bucket, _, key = path[len("s3://"):].partition("/")
+    return bucket, key
+
+
+class TeamStatsIndex:
+    """
+    Latest rolling-average features per team, read from the processed match data:
+    a CSV file or a Parquet dataset (a directory of part files, or one file).
+
+    For every team it keeps the home features of its most recent home match and
+    the away features of its most recent away match, so a fixture lookup is two
+    dict reads. Matches are ordered by their parsed date (see parse_match_dates:
+    the CSV may hold ISO or dd/mm/yyyy strings, which do not sort as text). Only
+    the team, date and feature columns are read, and with `since` only matches
+    from that date on. A background thread
+    polls the files' mtimes (or ETags for s3:// paths) and swaps in a rebuilt index
+    when they change; requests never touch the files. on_change(index) is called
+    after each rebuild.
+    """
+
+    def __init__(self, path, refresh_interval_s=30, on_change=None, since=None):
+        self.path = str(path)
+        self.refresh_interval_s = refresh_interval_s
+        self.on_change = on_change
+        self.since = since or None
+        self.version = None
+        self.loaded_at = None
+        # (latest home features by team, latest away features by team, sorted team names)
+        self._index = ({}, {}, [])
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def is_csv(self):
+        return self.path.endswith(".csv")
+
+    def _current_version(self):
+        if self.path.startswith("s3://"):
+            import boto3
+            bucket, key = s3_parts(self.path)
+            s3 = boto3.client("s3")
+            if not self.is_csv:
+                # Every part file of a dataset directory
+                pages = s3.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=key.rstrip("/") + "/")
+                parts = tuple(sorted((obj["Key"], obj["ETag"]) for page in pages for obj in page.get("Contents", [])))
+                if parts:
+                    return parts
+            return s3.head_object(Bucket=bucket, Key=key)["ETag"]
+        if os.path.isdir(self.path):
+            # Part files may sit in Div=/Season= partition directories
+            files = [os.path.join(root, name) for root, _, names in os.walk(self.path) for name in names]
+            return tuple(sorted((name, os.stat(name).st_mtime_ns, os.stat(name).st_size) for name in files))
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read(self):
+        import pandas as pd
+
+        columns = ['Date', 'HomeTeam', 'AwayTeam'] + FEATURES
+        if not self.is_csv:
+            import pyarrow.dataset as ds
+            date_filter = ds.field('Date') >= pd.Timestamp(self.since) if self.since else None
+            return ds.dataset(self.path, format='parquet', partitioning='hive').to_table(columns=columns, filter=date_filter).to_pandas()
+        df = pd.read_csv(self.path, usecols=columns)
+        df['Date'] = parse_match_dates(df['Date'])
+        return df[df['Date'] >= pd.Timestamp(self.since)] if self.since else df
+
+    def _build_index(self):
+        """Returns (home features by team, away features by team) from the current data."""
+        df = self._read()
+        # Stable sort keeps file order for matches on the same day, so the last row wins
+        df = df.sort_values('Date', kind='stable')
+        latest_home = df.dropna(subset=['HomeTeam']).drop_duplicates('HomeTeam', keep='last')
+        latest_away = df.dropna(subset=['AwayTeam']).drop_duplicates('AwayTeam', keep='last')
+        home = dict(zip(latest_home['HomeTeam'], latest_home[HOME_FEATURES].to_numpy(dtype=np.float64)))
+        away = dict(zip(latest_away['AwayTeam'], latest_away[AWAY_FEATURES].to_numpy(dtype=np.float64)))
+        return home, away
+
+    def refresh(self):
+        """Rebuilds the index if the data changed. Returns True when a new version was loaded."""
+        try:
+            version = self._current_version()
+        except Exception as e:
+            print(f"[WARNING] Could not check {self.path} for changes: {e}")
+            return False
+        if version == self.version:
+            return False
+
+        started = time.perf_counter()
+        home, away = self._build_index()
+        teams = sorted({t for t in home if isinstance(t, str)} | {t for t in away if isinstance(t, str)})
+        # Swap in a complete index in one step; readers see either the old or the new one
+        self._index = (home, away, teams)
+        self.version = version
+        self.loaded_at = time.time()
+        print(f"Indexed {len(teams)} teams from {self.path} in {time.perf_counter() - started:.2f}s.")
+        if self.on_change is not None:
+            self.on_change(self)
+        return True
+
+    @property
+    def teams(self):
+        return self._index[2]
+
+    def snapshot(self):
+        """Returns the current (home features by team, away features by team, teams); treat it as read-only."""
+        return self._index
+
+    def lookup(self, home_team, away_team):
+        """Returns the 8 model features for a fixture in FEATURES order, or None if a team has no stats."""
+        home_index, away_index, _ = self._index
+        home, away = home_index.get(home_team), away_index.get(away_team)
+        if home is None or away is None:
+            return None
+        return np.concatenate([home, away])
+
+    def lookup_many(self, home_teams, away_teams):
+        """Returns (features, found): an (n, 8) FEATURES matrix, NaN for fixtures with an unknown team, and a mask."""
+        home_index, away_index, _ = self._index
+        features = np.full((len(home_teams), len(FEATURES)), np.nan)
+        found = np.zeros(len(home_teams), dtype=bool)
+        for i, (home_team, away_team) in enumerate(zip(home_teams, away_teams)):
+            home, away = home_index.get(home_team), away_index.get(away_team)
+            if home is not None and away is not None:
+                features[i, :4], features[i, 4:] = home, away
+                found[i] = True
+        return features, found
+
+    def start(self):
+        """Loads the index and keeps it current from a background thread."""
+        try:
+            self.refresh()
+        except Exception as e:
+            # The watcher retries; until then lookups find no teams
+            print(f"[WARNING] Could not load team stats from {self.path}: {e}")
+        self._thread = threading.Thread(target=self._watch, name="team-stats-index", daemon=True)
+        self._thread.start()
+        return self
+
+    def _watch(self):
+        while not self._stop.wait(self.refresh_interval_s):
+            try:
+                self.refresh()
+            except Exception as e:
+                # Keep serving the previous index
+                print(f"[WARNING] Could not reload team stats from {self.path}: {e}")
+
+    def stop(self):
+        self._stop.set()
@@ -42,8 +42,8 @@ def train_model_task(processed_data_path: str):
     logger = get_run_logger()
     logger.info("--- Running Training Task ---")
     try:
-        train_model(processed_data_path)
-        logger.info("Model training and logging completed.")
+        run_id = train_model(processed_data_path)
+        logger.info(f"Model training and logging completed (MLflow run {run_id}).")
     except Exception as e:
         logger.error(f"Model training failed: {e}")
         raise
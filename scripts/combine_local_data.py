@@ -1,50 +1,90 @@
-import pandas as pd
+import os
+import time
+import pyarrow as pa
+import yaml
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from match_data import PARTITIONING, conform_to_schema, delete_dataset, is_parquet, read_raw_csv, to_raw_table, write_dataset
 
-def combine_local_data():
+# Used when configs/config.yaml lists no ingestion sources
+DEFAULT_SOURCES = [
+    {"league": "E0", "season": 2023, "path": "data/E0.csv"},
+    {"league": "E1", "season": 2023, "path": "data/E1.csv"},
+]
+DOWNLOAD_URL = "https://www.football-data.co.uk/mmz4281/{season_code}/{league}.csv"
+
+def ingestion_sources(config):
+    """The configured league/season files, as dicts with league, season and path."""
+    return config.get("ingestion", {}).get("sources") or DEFAULT_SOURCES
+
+def parse_source(source):
+    """Parses one league/season file into a typed Arrow table (runs in a worker process)."""
+    df = read_raw_csv(source["path"], league=source["league"])
+    table = to_raw_table(df.drop(columns=["Season"], errors="ignore"))
+    # Partition keys: plain strings for Div, the configured season for every row
+    table = table.set_column(table.schema.get_field_index("Div"), "Div", table.column("Div").cast(pa.string()))
+    return table.append_column("Season", pa.array([source["season"]] * len(table), pa.int16()))
+
+def parse_sources(sources, workers=0):
+    """Parses the files in a process pool (workers=0: one process per core), in source order."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(sources) == 1:
+        return [parse_source(source) for source in sources]
+    workers = min(workers, len(sources))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # A few files per task keeps the round trips down while the load stays balanced
+        return list(pool.map(parse_source, sources, chunksize=max(1, len(sources) // (workers * 4))))
+
+def combine_local_data(output_path="data/raw_epl_data.csv", config=None):
     """
-    Combines local EPL and Championship data for the 2023-2024 season
-    and saves the result to the raw_epl_data.csv file.
+    Combines the local league/season files listed under ingestion.sources in
+    configs/config.yaml (by default the 2023-2024 EPL and Championship files),
+    parsing them in parallel. Columns are normalized across seasons and unified:
+    a column missing from some seasons is null there. Writes a Div=/Season=
+    partitioned Parquet dataset, or one CSV when output_path ends in .csv.
+    Returns output_path.
     """
-    # Paths to the local data files
-    epl_path = Path("data/E0.csv")
-    champ_path = Path("data/E1.csv")
-    output_path = Path("data/raw_epl_data.csv")
+    if config is None:
+        with open("configs/config.yaml", "r") as f:
+            config = yaml.safe_load(f)
+    ingestion_config = config.get("ingestion", {})
+    sources = ingestion_sources(config)
 
     # Check if the source files exist
-    if not epl_path.exists() or not champ_path.exists():
+    missing = [source for source in sources if not Path(source["path"]).exists()]
+    if missing:
         print("="*80)
         print("ERROR: Local data files not found.")
-        print(f"Please download the following files and place them in the '{epl_path.parent}' directory:")
-        print(f"1. Premier League Data: https://www.football-data.co.uk/mmz4281/2324/E0.csv  (save as E0.csv)")
-        print(f"2. Championship Data:  https://www.football-data.co.uk/mmz4281/2324/E1.csv  (save as E1.csv)")
+        print("Please download the following files from football-data.co.uk:")
+        for source in missing:
+            season_code = f"{source['season'] % 100:02d}{(source['season'] + 1) % 100:02d}"
+            url = DOWNLOAD_URL.format(season_code=season_code, league=source["league"])
+            print(f"- {url}  (save as {source['path']})")
         print("="*80)
         raise FileNotFoundError("Required data files are missing. Please download them.")
 
-    print("Reading local Premier League data...")
-    try:
-        epl_data = pd.read_csv(epl_path)
-    except Exception as e:
-        print(f"Error reading {epl_path}: {e}")
-        return
-
-    print("Reading local Championship data...")
-    try:
-        champ_data = pd.read_csv(champ_path)
-    except Exception as e:
-        print(f"Error reading {champ_path}: {e}")
-        return
-
-    # Combine the two dataframes
-    combined_data = pd.concat([epl_data, champ_data], ignore_index=True)
+    started = time.perf_counter()
+    print(f"Parsing {len(sources)} league/season files...")
+    tables = parse_sources(sources, ingestion_config.get("workers", 0))
+    schema = pa.unify_schemas([table.schema for table in tables])
+    combined = pa.concat_tables([conform_to_schema(table, schema) for table in tables])
+    print(f"Parsed {combined.num_rows} matches with {len(schema)} columns in {time.perf_counter() - started:.2f}s.")
 
     # Save the combined data to the output file
     print(f"Saving combined data to {output_path}...")
     try:
-        combined_data.to_csv(output_path, index=False)
+        if is_parquet(output_path):
+            delete_dataset(output_path)
+            write_dataset(combined, output_path, partitioning=PARTITIONING)
+        else:
+            df = combined.to_pandas()
+            df['Date'] = df['Date'].dt.strftime('%d/%m/%Y')
+            df.to_csv(output_path, index=False)
         print("Data combined and saved successfully.")
+        return output_path
     except Exception as e:
         print(f"Failed to save data to {output_path}: {e}")
+        raise
 
 if __name__ == "__main__":
-    combine_local_data() 
\ No newline at end of file
+    combine_local_data()
@@ -0,0 +1,231 @@
+import copy
+import io
+import sys
+import time
+from pathlib import Path
+import joblib
+import numpy as np
+from sklearn.tree._tree import Tree
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from inference.forest_engine import float32_floor
+
+# Depth caps tried when none are configured; the uncapped forest is always tried too
+DEFAULT_DEPTHS = (4, 6, 8, 10, 12, 16)
+# Rows of the training data whose full-forest probabilities the trees are selected to match
+FIDELITY_ROWS = 2000
+_LEAF = -1
+_UNDEFINED = -2
+
+
+def _node_depths(left, right):
+    depth = np.zeros(len(left), dtype=np.intp)
+    level, d = np.array([0]), 0
+    while level.size:
+        depth[level] = d
+        level = level[left[level] != _LEAF]
+        level = np.concatenate([left[level], right[level]])
+        d += 1
+    return depth
+
+
+def rebuild_tree(tree, max_depth=None, prune=False):
+    """
+    A copy of a fitted sklearn Tree cut off at max_depth (nodes there become
+    leaves holding their class fractions) and, with prune, with every subtree
+    whose leaves all predict the same class collapsed into one leaf. Split
+    thresholds are rounded down to float32.
+    """
+    state = tree.__getstate__()
+    nodes, values = state["nodes"], state["values"]
+    left, right = nodes["left_child"], nodes["right_child"]
+    depth = _node_depths(left, right)
+    is_leaf = left == _LEAF
+    if max_depth is not None:
+        is_leaf = is_leaf | (depth >= max_depth)
+
+    new_leaf = is_leaf.copy()
+    if prune:
+        # Bottom up: the class every leaf below a node predicts, or -1 when they differ
+        uniform = np.where(is_leaf, values[:, 0, :].argmax(axis=1), -1)
+        for d in range(depth.max() - 1, -1, -1):
+            level = np.flatnonzero((depth == d) & ~is_leaf)
+            same = uniform[left[level]] == uniform[right[level]]
+            uniform[level] = np.where(same, uniform[left[level]], -1)
+        new_leaf |= uniform >= 0
+
+    # Top down: a node is kept when every node above it still splits
+    keep = np.zeros(len(nodes), dtype=bool)
+    keep[0] = True
+    for d in range(depth.max()):
+        level = np.flatnonzero((depth == d) & keep & ~new_leaf)
+        keep[left[level]] = True
+        keep[right[level]] = True
+
+    # sklearn numbers nodes depth first, so the kept ones stay in a valid order
+    new_ids = np.cumsum(keep) - 1
+    kept = np.flatnonzero(keep)
+    new_nodes = nodes[kept].copy()
+    leaves = new_leaf[kept]
+    new_nodes["left_child"] = np.where(leaves, _LEAF, new_ids[np.maximum(left[kept], 0)])
+    new_nodes["right_child"] = np.where(leaves, _LEAF, new_ids[np.maximum(right[kept], 0)])
+    new_nodes["feature"] = np.where(leaves, _UNDEFINED, new_nodes["feature"])
+    new_nodes["threshold"] = np.where(leaves, _UNDEFINED, float32_floor(new_nodes["threshold"]))
+    if "missing_go_to_left" in new_nodes.dtype.names:
+        new_nodes["missing_go_to_left"] = np.where(leaves, 0, new_nodes["missing_go_to_left"])
+
+    rebuilt = Tree(tree.n_features, np.asarray(tree.n_classes), tree.n_outputs)
+    rebuilt.__setstate__({
+        "max_depth": int(depth[kept].max()),
+        "node_count": len(kept),
+        "nodes": new_nodes,
+        "values": np.ascontiguousarray(values[kept]),
+    })
+    return rebuilt
+
+
+def _forest(model, trees, max_depth, prune):
+    """A copy of model keeping the given trees, rebuilt with rebuild_tree."""
+    estimators = []
+    for i in trees:
+        estimator = copy.copy(model.estimators_[i])
+        estimator.tree_ = rebuild_tree(estimator.tree_, max_depth, prune)
+        estimator.max_depth = max_depth if max_depth is not None else estimator.max_depth
+        estimators.append(estimator)
+    compact = copy.copy(model)
+    compact.estimators_ = estimators
+    compact.n_estimators = len(estimators)
+    if max_depth is not None:
+        compact.max_depth = max_depth
+    return compact
+
+
+def _tree_proba(forest, x):
+    """Every tree's class fractions for the float32 rows x: (trees, rows, classes)."""
+    n_classes = len(forest.classes_)
+    # Single-output trees return (rows, classes), the same as their predict_proba
+    return np.stack([estimator.tree_.predict(x)[:, :n_classes] for estimator in forest.estimators_])
+
+
+def _accuracy(model, proba, y):
+    return float(np.mean(model.classes_[proba.argmax(axis=1)] == np.asarray(y)))
+
+
+def _closest_trees(tree_proba, target_proba):
+    """
+    Yields the trees one at a time, each time the one that brings the averaged
+    probabilities of those yielded so far closest to the full forest's.
+    """
+    total = np.zeros_like(target_proba)
+    remaining = np.ones(len(tree_proba), dtype=bool)
+    for k in range(1, len(tree_proba) + 1):
+        errors = (((total + tree_proba) / k - target_proba) ** 2).sum(axis=(1, 2))
+        errors[~remaining] = np.inf
+        best = int(errors.argmin())
+        remaining[best] = False
+        total += tree_proba[best]
+        yield best
+
+
+def _select_trees(tree_proba, target_proba, val_proba, model, y_val, min_accuracy, min_trees):
+    """
+    Adds trees in the order of _closest_trees until the selection is at least
+    min_trees large and reaches min_accuracy on the held-out rows. Returns the
+    selected trees and their held-out accuracy, or None.
+    """
+    selected, val_total = [], np.zeros_like(val_proba[0])
+    for best in _closest_trees(tree_proba, target_proba):
+        selected.append(best)
+        val_total += val_proba[best]
+        accuracy = _accuracy(model, val_total, y_val)
+        if len(selected) >= min_trees and accuracy >= min_accuracy:
+            return selected, accuracy
+    return None
+
+
+def _fidelity_rows(x_fidelity, random_state):
+    """Up to FIDELITY_ROWS rows of x_fidelity as float32, the rows trees score."""
+    x_fidelity = np.ascontiguousarray(x_fidelity, dtype=np.float32)
+    if len(x_fidelity) > FIDELITY_ROWS:
+        rows = np.random.default_rng(random_state).choice(len(x_fidelity), FIDELITY_ROWS, replace=False)
+        x_fidelity = x_fidelity[rows]
+    return x_fidelity
+
+
+def compact_forest(model, x_fidelity, x_val, y_val, max_accuracy_loss=0.01, min_trees=10,
+                   depths=DEFAULT_DEPTHS, random_state=42):
+    """
+    Shrinks a fitted RandomForestClassifier while its accuracy on the held-out
+    x_val, y_val stays within max_accuracy_loss of the full forest's.
+
+    For every depth cap (and uncapped), trees are selected greedily to match
+    the full forest's probabilities on up to FIDELITY_ROWS rows of x_fidelity
+    (the training data: matching the forest rather than the held-out labels
+    keeps the selection from fitting to them) until the budget is met. Leaves
+    that cannot change a tree's vote are then pruned when that stays within
+    the budget too. The candidate with the fewest nodes wins. Thresholds are
+    stored as float32, which scores identically.
+
+    Returns the compacted forest and a report of its trees, depth, nodes and
+    held-out accuracy next to the full forest's.
+    """
+    # Trees score float32 rows, so they are converted once here
+    x_fidelity = _fidelity_rows(x_fidelity, random_state)
+    x_val = np.ascontiguousarray(x_val, dtype=np.float32)
+    min_trees = min(min_trees, len(model.estimators_))
+    full_accuracy = _accuracy(model, _tree_proba(model, x_val).mean(axis=0), y_val)
+    min_accuracy = full_accuracy - max_accuracy_loss
+    target_proba = _tree_proba(model, x_fidelity).mean(axis=0)
+    full_nodes = sum(estimator.tree_.node_count for estimator in model.estimators_)
+
+    best = None
+    for max_depth in sorted(set(depths)) + [None]:
+        capped = _forest(model, range(len(model.estimators_)), max_depth, prune=False)
+        tree_proba, val_proba = _tree_proba(capped, x_fidelity), _tree_proba(capped, x_val)
+        selection = _select_trees(tree_proba, target_proba, val_proba, model, y_val, min_accuracy, min_trees)
+        if selection is None:
+            continue
+        trees, accuracy = selection
+        candidate, pruned = _forest(model, trees, max_depth, prune=False), False
+        pruned_candidate = _forest(model, trees, max_depth, prune=True)
+        pruned_accuracy = _accuracy(model, _tree_proba(pruned_candidate, x_val).mean(axis=0), y_val)
+        if pruned_accuracy >= min_accuracy:
+            candidate, accuracy, pruned = pruned_candidate, pruned_accuracy, True
+        nodes = sum(estimator.tree_.node_count for estimator in candidate.estimators_)
+        if best is None or nodes < best[1]["nodes"]:
+            best = (candidate, {"trees": len(trees), "max_depth": max_depth, "pruned": pruned, "nodes": nodes,
+                                "accuracy": accuracy, "full_trees": len(model.estimators_),
+                                "full_nodes": full_nodes, "full_accuracy": full_accuracy})
+    return best
+
+
+def apply_compaction(model, x_fidelity, report, random_state=42):
+    """
+    Compacts another fitted forest the way compact_forest chose for the forest
+    of its report: the same number of trees, selected to match this forest's
+    probabilities on x_fidelity, under the same depth cap and pruning. No
+    held-out rows are needed, so it suits a forest refit on all training data.
+    """
+    x_fidelity = _fidelity_rows(x_fidelity, random_state)
+    max_depth = report["max_depth"]
+    target_proba = _tree_proba(model, x_fidelity).mean(axis=0)
+    capped = _forest(model, range(len(model.estimators_)), max_depth, prune=False)
+    order = _closest_trees(_tree_proba(capped, x_fidelity), target_proba)
+    trees = [next(order) for _ in range(min(report["trees"], len(model.estimators_)))]
+    return _forest(model, trees, max_depth, prune=report["pruned"])
+
+
+def model_footprint(model, x, repeats=20):
+    """Node count, pickled size in MB and median predict_proba latency in ms for one row and for all of x."""
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+
+    def median_ms(rows):
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            model.predict_proba(rows)
+            times.append(time.perf_counter() - start)
+        return float(np.median(times) * 1000)
+
+    return {"nodes": sum(estimator.tree_.node_count for estimator in model.estimators_),
+            "size_mb": buffer.tell() / 1024 ** 2, "latency_ms": median_ms(x[:1]), "batch_latency_ms": median_ms(x)}
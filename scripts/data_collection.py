@@ -1,25 +1,54 @@
+import os
 import boto3
 import yaml
+from boto3.s3.transfer import TransferConfig
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from combine_local_data import combine_local_data
+from match_data import delete_dataset, is_parquet
+
+def upload_path(local_path, bucket_name, key, upload_config):
+    """
+    Uploads a file, or every file of a dataset directory under the key prefix.
+    Files go up upload_concurrency at a time, each as a multipart upload of
+    multipart_chunk_mb parts sent multipart_concurrency at a time.
+    """
+    local_path = Path(local_path)
+    if local_path.is_dir():
+        files = sorted(path for path in local_path.rglob("*") if path.is_file())
+        uploads = [(path, f"{key.rstrip('/')}/{path.relative_to(local_path).as_posix()}") for path in files]
+    else:
+        uploads = [(local_path, key)]
+    chunk_bytes = int(upload_config.get("multipart_chunk_mb", 8) * 1024 * 1024)
+    transfer_config = TransferConfig(
+        multipart_threshold=chunk_bytes, multipart_chunksize=chunk_bytes,
+        max_concurrency=upload_config.get("multipart_concurrency", 10), use_threads=True,
+    )
+    s3_client = boto3.client("s3")
+    with ThreadPoolExecutor(max_workers=max(1, upload_config.get("upload_concurrency", 8))) as pool:
+        # list() re-raises the first failed upload
+        list(pool.map(lambda upload: s3_client.upload_file(str(upload[0]), bucket_name, upload[1], Config=transfer_config),
+                      uploads))
+    return len(uploads)
 
 def upload_raw_data():
     """
     Combines local data files and uploads the result to the S3 bucket.
-    Returns the S3 path of the uploaded file.
+    Returns the S3 path of the uploaded file (or Parquet dataset).
     """
-    # First, combine the local data files
-    print("--- Combining local data files ---")
-    combine_local_data()
-    print("--- Data combination complete ---")
-    
     # Load config
     with open("configs/config.yaml", "r") as f:
         config = yaml.safe_load(f)
 
     bucket_name = config["s3"]["bucket"]
     raw_data_key = config["s3"]["raw_data_key"]
-    local_raw_path = Path("data/raw_epl_data.csv")
+    # A local copy in the same format as the S3 key, uploaded as is
+    local_raw_path = Path("data") / os.path.basename(raw_data_key.rstrip("/"))
+
+    # First, combine the local data files
+    print("--- Combining local data files ---")
+    combine_local_data(str(local_raw_path), config)
+    print("--- Data combination complete ---")
 
     if not local_raw_path.exists():
         print(f"ERROR: Local data file not found at {local_raw_path}")
@@ -27,11 +56,13 @@ def upload_raw_data():
         exit(1)
 
     try:
-        print(f"Uploading {local_raw_path} to s3://{bucket_name}/{raw_data_key}...")
-        s3_client = boto3.client("s3")
-        s3_client.upload_file(str(local_raw_path), bucket_name, raw_data_key)
-        print("Upload complete.")
         s3_raw_path = f"s3://{bucket_name}/{raw_data_key}"
+        if is_parquet(raw_data_key):
+            # Replace the whole dataset, so partitions no longer configured do not linger
+            delete_dataset(s3_raw_path)
+        print(f"Uploading {local_raw_path} to {s3_raw_path}...")
+        uploaded = upload_path(local_raw_path, bucket_name, raw_data_key, config.get("ingestion", {}))
+        print(f"Upload complete ({uploaded} files).")
         return s3_raw_path
     except Exception as e:
         print(f"Failed to upload to S3: {e}")
@@ -0,0 +1,113 @@
+import sys
+import numpy as np
+from pathlib import Path
+from sklearn.linear_model import LogisticRegression
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from inference.cascade import FirstStage, forest_digest
+
+
+def fit_soft_labels(x, proba, classes, C=1.0):
+    """
+    Multinomial logistic regression on the standardized x trained to reproduce
+    proba (rows of class probabilities) rather than hard labels: every row is
+    repeated once per class, weighted by that class's probability, which is the
+    cross-entropy against the soft labels. Returns (weights, bias) on the
+    unscaled features.
+    """
+    mean, scale = x.mean(axis=0), x.std(axis=0)
+    scale[scale == 0] = 1.0
+    n_rows, n_classes = proba.shape
+    model = LogisticRegression(C=C, max_iter=1000)
+    model.fit(np.tile((x - mean) / scale, (n_classes, 1)), np.repeat(classes, n_rows),
+              sample_weight=proba.T.ravel())
+    # One weight row per class, in the order of classes even if some never win
+    weights = np.zeros((n_classes, x.shape[1]))
+    bias = np.full(n_classes, -np.inf)
+    rows = np.searchsorted(classes, model.classes_)
+    weights[rows] = model.coef_ / scale
+    bias[rows] = model.intercept_ - (model.coef_ / scale) @ mean
+    return weights, bias
+
+
+def calibrate_threshold(confidence, first_labels, forest_labels, y, min_agreement, max_accuracy_loss):
+    """
+    The lowest confidence at which the first stage may answer: the rows at or
+    above it must match the forest's label on at least min_agreement of them,
+    and the cascade's accuracy on y must stay within max_accuracy_loss of the
+    forest's. Returns the threshold (inf when no rows qualify) and the share
+    of rows it hands to the first stage.
+    """
+    order = np.argsort(-confidence, kind="stable")
+    confidence = confidence[order]
+    agree = np.cumsum(first_labels[order] == forest_labels[order])
+    first_correct = np.cumsum(first_labels[order] == y[order])
+    forest_correct = np.cumsum(forest_labels[order] == y[order])
+    n = len(y)
+    k = np.arange(1, n + 1)
+    cascade_accuracy = (first_correct + forest_correct[-1] - forest_correct) / n
+    ok = (agree / k >= min_agreement) & (cascade_accuracy >= forest_correct[-1] / n - max_accuracy_loss)
+    # Rows with equal confidence are answered together, so cut only where it changes
+    ok &= np.append(confidence[1:] < confidence[:-1], True)
+    if not ok.any():
+        return np.inf, 0.0
+    best = np.flatnonzero(ok)[-1]
+    return float(confidence[best]), float((best + 1) / n)
+
+
+def fit_first_stage(forest, x_fit, label_names, threshold=np.inf, C=1.0):
+    """
+    A first-stage FirstStage for a fitted RandomForestClassifier: a multinomial
+    logistic regression fit to the forest's probabilities on x_fit, answering
+    at confidence threshold and above.
+    """
+    feature_names = list(getattr(forest, "feature_names_in_", [f"x{i}" for i in range(forest.n_features_in_)]))
+    x_fit = np.asarray(x_fit, dtype=np.float64)
+    classes = np.asarray(forest.classes_)
+    fit_proba = np.mean([tree.predict_proba(x_fit) for tree in forest.estimators_], axis=0)
+    weights, bias = fit_soft_labels(x_fit, fit_proba, classes, C)
+    return FirstStage(weights, bias, threshold, classes, label_names, feature_names, forest_digest(forest))
+
+
+def distill_first_stage(forest, x_fit, x_val, y_val, label_names, min_agreement=0.98, max_accuracy_loss=0.01, C=1.0):
+    """
+    Distils a fitted RandomForestClassifier into a first stage (fit_first_stage
+    on x_fit), with the confidence threshold calibrated on the validation rows
+    x_val, y_val (see calibrate_threshold). Returns the first stage and its
+    evaluate_cascade report on x_val.
+    """
+    first_stage = fit_first_stage(forest, x_fit, label_names, C=C)
+    x_val, y_val = np.asarray(x_val, dtype=np.float64), np.asarray(y_val)
+    forest_labels, first_proba, first_labels = _labels(forest, first_stage, x_val)
+    first_stage.threshold, _ = calibrate_threshold(
+        first_proba.max(axis=1), first_labels, forest_labels, y_val, min_agreement, max_accuracy_loss
+    )
+    return first_stage, evaluate_cascade(forest, first_stage, x_val, y_val)
+
+
+def _labels(forest, first_stage, x):
+    """The forest's labels and the first stage's probabilities and labels for the rows x."""
+    # Scored as arrays, the way the serving engine passes them
+    forest_proba = np.mean([tree.predict_proba(x) for tree in forest.estimators_], axis=0)
+    first_proba = first_stage.predict_proba(x)
+    classes = first_stage.classes
+    return classes.take(forest_proba.argmax(axis=1)), first_proba, classes.take(first_proba.argmax(axis=1))
+
+
+def evaluate_cascade(forest, first_stage, x, y):
+    """
+    The first stage's threshold and, on the rows x, y, the share it answers, its
+    agreement with the forest there and the accuracies of forest, first stage
+    and cascade.
+    """
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y)
+    forest_labels, first_proba, first_labels = _labels(forest, first_stage, x)
+    gated = first_proba.max(axis=1) >= first_stage.threshold
+    cascade_labels = np.where(gated, first_labels, forest_labels)
+    return {
+        "threshold": first_stage.threshold,
+        "first_stage_fraction": float(gated.mean()),
+        "agreement": float(np.mean(first_labels[gated] == forest_labels[gated])) if gated.any() else None,
+        "first_stage_accuracy": float(np.mean(first_labels == y)),
+        "forest_accuracy": float(np.mean(forest_labels == y)),
+        "cascade_accuracy": float(np.mean(cascade_labels == y)),
+    }
@@ -12,6 +12,7 @@ import yaml
 import boto3
 from io import BytesIO
 import logging
+from match_data import FEATURE_COLS, read_dataset
 
 def get_latest_run_id(experiment_name: str) -> str:
     """Gets the ID of the most recent run from a given MLflow experiment."""
@@ -77,7 +78,8 @@ def evaluate_model():
             
             # Load the test data
             print(f"Reading processed data from {s3_processed_path}...")
-            df = pd.read_csv(s3_processed_path)
+            # Only the features and target, from the configured start date on
+            df = read_dataset(s3_processed_path, columns=FEATURE_COLS + ['FTR'], since=config.get('datasets', {}).get('train_since'))
 
             if df.empty:
                 print("Processed data is empty, skipping evaluation.")
@@ -85,7 +87,7 @@ def evaluate_model():
                 continue
             
             # Re-create the same train/test split to get the test set
-            features = [col for col in df.columns if 'avg_' in col]
+            features = FEATURE_COLS
             x = df[features]
             y = df['FTR']
             
@@ -0,0 +1,157 @@
+import time
+import numpy as np
+from joblib import Memory
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import ParameterSampler, StratifiedKFold
+from sklearn.utils.class_weight import compute_class_weight
+
+
+def fit_fold(forest, x, y, rows, validation, state):
+    """
+    Fits forest on rows of x, y and returns its accuracy on validation. When
+    state holds the same candidate's forest fitted on these rows with fewer
+    trees, that forest is grown with warm_start instead; either way the fitted
+    forest is left in state. state is not part of the memoization key: growing
+    a forest gives exactly the trees a fresh fit with the same seed would.
+    """
+    warm = state.get("forest")
+    if warm is not None:
+        forest = warm.set_params(n_estimators=forest.n_estimators)
+    forest.fit(x[rows], y[rows])
+    state["forest"] = forest
+    return accuracy_score(y[validation], forest.predict(x[validation]))
+
+
+class HalvingForestSearch:
+    """
+    Successive halving for random forest hyperparameters, a budget-aware
+    alternative to RandomizedSearchCV.
+
+    Every candidate starts with a few trees on a fraction of each fold's rows.
+    After each rung only the best 1/factor of the candidates go on, with factor
+    times the trees and (up to all of them) factor times the rows. Once a
+    candidate trains on all of a fold's rows its forests are kept and grown with
+    warm_start, so promoted candidates only fit the new trees. The search stops
+    when one candidate is left or time_budget_s runs out, picks the best
+    candidate of the highest rung reached and refits it on all the data with
+    max_trees.
+
+    With memory (a joblib.Memory or cache directory) every candidate's fold
+    scores are memoized on its parameters, trees and rows, so rerunning on the
+    same data, e.g. with more candidates, only fits what was not scored before.
+
+    Exposes the RandomizedSearchCV attributes train.py uses (best_params_,
+    best_estimator_, best_score_), plus search_time_s_, n_candidates_ (sampled),
+    candidates_evaluated_ (scored on at least one rung), n_fits_,
+    cached_fits_, trees_fitted_ and the per-rung history_.
+    """
+
+    def __init__(self, estimator, param_distributions, n_candidates=20, cv=3, factor=3,
+                 max_trees=300, min_sample_fraction=1 / 3, time_budget_s=None, random_state=42, memory=None):
+        self.estimator = estimator
+        self.param_distributions = param_distributions
+        self.n_candidates = n_candidates
+        self.cv = cv
+        self.factor = factor
+        self.max_trees = max_trees
+        self.min_sample_fraction = min_sample_fraction
+        self.time_budget_s = time_budget_s
+        self.random_state = random_state
+        self.memory = memory
+
+    def schedule(self):
+        """
+        (trees, row fraction) for each rung. Rungs continue while more than one
+        candidate is left; the last one grows max_trees / factor trees, as the
+        winner is refit with max_trees anyway.
+        """
+        n_rungs, remaining = 0, self.n_candidates
+        while remaining > 1:
+            n_rungs += 1
+            remaining = int(np.ceil(remaining / self.factor))
+        n_rungs = max(n_rungs, 1)
+        return [(max(1, int(round(self.max_trees / self.factor ** (n_rungs - rung)))),
+                 min(1.0, self.min_sample_fraction * self.factor ** rung))
+                for rung in range(n_rungs)]
+
+    def _out_of_time(self, started):
+        return self.time_budget_s is not None and time.perf_counter() - started >= self.time_budget_s
+
+    def fit(self, x, y):
+        started = time.perf_counter()
+        # The final refit keeps x as given, so the model keeps its feature names
+        x_all, y_all = x, y
+        x, y = np.asarray(x), np.asarray(y)
+        # Tree count is the search resource, so it is not sampled
+        distributions = {k: v for k, v in self.param_distributions.items() if k != 'n_estimators'}
+        candidates = list(ParameterSampler(distributions, self.n_candidates, random_state=self.random_state))
+        folds = list(StratifiedKFold(self.cv, shuffle=True, random_state=self.random_state).split(x, y))
+        # Nested row subsets: a larger rung sees every row a smaller one did
+        orders = [np.random.default_rng(self.random_state + i).permutation(train) for i, (train, _) in enumerate(folds)]
+
+        memory = self.memory if isinstance(self.memory, Memory) else Memory(self.memory, verbose=0)
+        score_fold = memory.cache(fit_fold, ignore=["state"])
+        forests = {}  # (candidate, fold) -> forest grown on all of the fold's rows
+        scores = {}   # candidate -> mean validation accuracy at the highest rung it completed
+        alive = list(range(len(candidates)))
+        self.history_, self.n_fits_, self.cached_fits_, self.trees_fitted_ = [], 0, 0, 0
+        out_of_time = False
+        for rung, (trees, fraction) in enumerate(self.schedule()):
+            rung_scores = {}
+            for candidate in alive:
+                if self._out_of_time(started):
+                    out_of_time = True
+                    break
+                fold_scores = []
+                for fold, (_, validation) in enumerate(folds):
+                    rows = orders[fold][:max(1, int(round(len(orders[fold]) * fraction)))]
+                    params = dict(candidates[candidate], n_estimators=trees, warm_start=fraction >= 1.0)
+                    if params.get('class_weight') == 'balanced':
+                        # The same weights 'balanced' gives these rows, spelled out so
+                        # sklearn does not warn about warm-starting with a preset
+                        classes = np.unique(y[rows])
+                        params['class_weight'] = dict(zip(classes, compute_class_weight('balanced', classes=classes, y=y[rows])))
+                    forest = clone(self.estimator).set_params(**params)
+                    # Same rows as the previous rung: only the extra trees are grown
+                    state = {"forest": forests.get((candidate, fold))} if fraction >= 1.0 else {}
+                    cached = score_fold.check_call_in_cache(forest, x, y, rows, validation, state)
+                    if cached:
+                        self.cached_fits_ += 1
+                    else:
+                        # Without a forest from an earlier rung (those were cached), this fits
+                        # afresh: the same trees a rebuild grown to this rung would have
+                        warm = state.get("forest")
+                        self.trees_fitted_ += trees - (warm.n_estimators if warm is not None else 0)
+                        self.n_fits_ += 1
+                    fold_scores.append(score_fold(forest, x, y, rows, validation, state))
+                    # A cache hit leaves state untouched, so only forests fit_fold built are kept
+                    if not cached and fraction >= 1.0:
+                        forests[(candidate, fold)] = state["forest"]
+                rung_scores[candidate] = float(np.mean(fold_scores))
+            if rung_scores:
+                scores.update(rung_scores)
+                self.history_.append({"rung": rung, "trees": trees, "sample_fraction": fraction,
+                                      "candidates": len(rung_scores), "best_score": max(rung_scores.values())})
+            # Free the forests of candidates that are not promoted
+            keep = max(1, int(np.ceil(len(alive) / self.factor)))
+            ranked = sorted(rung_scores, key=rung_scores.get, reverse=True) if rung_scores else alive
+            alive = ranked[:keep]
+            forests = {key: forest for key, forest in forests.items() if key[0] in alive}
+            if out_of_time:
+                print(f"Search time budget of {self.time_budget_s}s reached during rung {rung}.")
+                break
+
+        # The best candidate among those that reached the highest rung (the first
+        # one if the budget ran out before any was scored)
+        top_rung = [candidate for candidate in alive if candidate in scores] or list(scores) or [0]
+        best = max(top_rung, key=lambda candidate: scores.get(candidate, 0.0))
+        self.best_params_ = dict(candidates[best], n_estimators=self.max_trees)
+        self.best_score_ = scores.get(best, float('nan'))
+        self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_).fit(x_all, y_all)
+        self.trees_fitted_ += self.max_trees
+        self.n_candidates_ = len(candidates)
+        # Fewer than sampled when the time budget ran out during the first rung
+        self.candidates_evaluated_ = len(scores)
+        self.search_time_s_ = time.perf_counter() - started
+        return self
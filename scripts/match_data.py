@@ -0,0 +1,197 @@
+import os
+import sys
+import time
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from inference.team_stats import parse_match_dates
+
+# Raw football-data.co.uk columns holding text; Date is a timestamp and every other
+# column (results, match stats, 100+ betting odds) is stored as float32
+RAW_STRING_COLS = ['Div', 'Time', 'HomeTeam', 'AwayTeam', 'FTR', 'HTR', 'Referee']
+# Low-cardinality text is dictionary-encoded (read back as pandas categoricals)
+CATEGORY = pa.dictionary(pa.int32(), pa.string())
+DATE = pa.timestamp('ms')
+# Older football-data.co.uk files and its extra-leagues format name some columns differently
+LEGACY_COLUMN_NAMES = {'Home': 'HomeTeam', 'Away': 'AwayTeam', 'HG': 'FTHG', 'AG': 'FTAG', 'Res': 'FTR',
+                       'League': 'Div'}
+# Columns preprocess_data reads from the raw dataset
+RAW_FEATURE_SOURCE_COLS = ['Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG', 'FTR', 'HS', 'AS', 'HST', 'AST']
+
+FEATURE_COLS = [
+    'avg_GoalsScored_home', 'avg_GoalsConceded_home', 'avg_Shots_home', 'avg_ShotsOnTarget_home',
+    'avg_GoalsScored_away', 'avg_GoalsConceded_away', 'avg_Shots_away', 'avg_ShotsOnTarget_away'
+]
+PROCESSED_SCHEMA = pa.schema(
+    [('Date', DATE), ('HomeTeam', CATEGORY), ('AwayTeam', CATEGORY), ('FTR', CATEGORY),
+     ('FTHG', pa.int16()), ('FTAG', pa.int16())]
+    + [(col, pa.float32()) for col in FEATURE_COLS]
+)
+# Rows per Parquet row group; date filters skip whole groups by their min/max statistics
+ROW_GROUP_ROWS = 64 * 1024
+# Partitioned datasets are laid out as <path>/Div=E0/Season=2023/part-*.parquet
+PARTITIONING = ds.partitioning(pa.schema([('Div', pa.string()), ('Season', pa.int16())]), flavor='hive')
+# Seasons run from July to June and are named by the year they start in
+SEASON_START_MONTH = 7
+
+
+def season_of(dates: pd.Series) -> pd.Series:
+    """The season each match date belongs to, e.g. 2023 for 2023-08-11 and 2024-05-19."""
+    return (dates.dt.year - (dates.dt.month < SEASON_START_MONTH)).astype('int16')
+
+
+def season_bounds(season):
+    """The [start, end) timestamps of a season."""
+    return pd.Timestamp(season, SEASON_START_MONTH, 1), pd.Timestamp(season + 1, SEASON_START_MONTH, 1)
+
+
+def read_raw_csv(path, league=None) -> pd.DataFrame:
+    """
+    Reads one football-data.co.uk CSV with its columns normalized across seasons:
+    legacy names are mapped to the current ones, the empty trailing columns and
+    undated rows of older files are dropped, and Div is filled in from `league` when the
+    file has none. Files before the 2010s are often Latin-1 rather than UTF-8.
+    """
+    try:
+        df = pd.read_csv(path, encoding='utf-8-sig')
+    except UnicodeDecodeError:
+        df = pd.read_csv(path, encoding='latin-1')
+    df.columns = [str(col).strip() for col in df.columns]
+    unnamed = [col for col in df.columns if col.startswith('Unnamed:')]
+    if unnamed:
+        df = df.drop(columns=unnamed)
+    renames = {old: new for old, new in LEGACY_COLUMN_NAMES.items() if old in df.columns and new not in df.columns}
+    if renames:
+        df = df.rename(columns=renames)
+    # The padding rows of older files are empty, date included
+    df = df[df['Date'].notna()]
+    if league is not None and 'Div' not in df.columns:
+        df = pd.concat([pd.Series(league, index=df.index, name='Div'), df], axis=1)
+    return df.reset_index(drop=True)
+
+
+def conform_to_schema(table: pa.Table, schema: pa.Schema) -> pa.Table:
+    """The table with schema's columns in schema's order; columns it lacks are all null."""
+    present = set(table.column_names)
+    columns = [table.column(field.name) if field.name in present else pa.nulls(len(table), field.type)
+               for field in schema]
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def raw_schema(columns):
+    """The typed schema for raw match data with these columns."""
+    fields = []
+    for col in columns:
+        if col == 'Date':
+            fields.append((col, DATE))
+        elif col in ('Time', 'Referee'):
+            fields.append((col, pa.string()))
+        elif col in RAW_STRING_COLS:
+            fields.append((col, CATEGORY))
+        else:
+            fields.append((col, pa.float32()))
+    return pa.schema(fields)
+
+
+def to_raw_table(df: pd.DataFrame) -> pa.Table:
+    """Converts a raw CSV frame to a typed, date-sorted Arrow table."""
+    # Only columns read_csv could not parse as numbers need coercing, all in one assignment
+    unparsed = [col for col in df.columns
+                if col not in RAW_STRING_COLS and col != 'Date' and not pd.api.types.is_numeric_dtype(df[col])]
+    df = df.assign(Date=parse_match_dates(df['Date']),
+                   **{col: pd.to_numeric(df[col], errors='coerce') for col in unparsed})
+    df = df.sort_values('Date', kind='stable')
+    return pa.Table.from_pandas(df, schema=raw_schema(df.columns), preserve_index=False)
+
+
+def is_parquet(path) -> bool:
+    return not str(path).endswith('.csv')
+
+
+def write_dataset(table, path, append=False, partitioning=None):
+    """
+    Writes an Arrow table as zstd-compressed Parquet under the dataset directory
+    path (local or s3://). append adds a new part file next to the existing ones;
+    otherwise existing parts are replaced (only those in the written partitions
+    when partitioning, e.g. PARTITIONING, is given).
+    """
+    file_format = ds.ParquetFileFormat()
+    ds.write_dataset(
+        table, str(path), format=file_format, partitioning=partitioning,
+        file_options=file_format.make_write_options(compression='zstd'),
+        # Parts sort by write time, so a dataset reads back in the order it was appended
+        basename_template=f"part-{time.time_ns():020d}-{{i}}.parquet",
+        existing_data_behavior='overwrite_or_ignore' if append else 'delete_matching',
+        max_rows_per_group=ROW_GROUP_ROWS,
+    )
+
+
+def delete_dataset(path):
+    """Removes every file of a dataset directory (local or s3://), if it exists."""
+    path = str(path)
+    if path.startswith('s3://'):
+        filesystem, root = pafs.FileSystem.from_uri(path)
+    else:
+        filesystem, root = pafs.LocalFileSystem(), os.path.abspath(path)
+    filesystem.delete_dir_contents(root, missing_dir_ok=True)
+
+
+def open_dataset(path):
+    """A Parquet dataset; Div and Season read back as columns when it is partitioned."""
+    # Partition keys are discovered from the Div=/Season= directory names, if any
+    return ds.dataset(str(path), format='parquet', partitioning='hive')
+
+
+def dataset_partitions(path, after=None):
+    """
+    The (season, league) pairs of the matches in a Parquet dataset (strictly
+    after `after`), in chronological order. Only Div and Date are scanned, one
+    record batch at a time.
+    """
+    date_filter = ds.field('Date') > pd.Timestamp(after) if after is not None else None
+    partitions = set()
+    for batch in open_dataset(path).to_batches(columns=['Div', 'Date'], filter=date_filter):
+        df = batch.to_pandas().dropna(subset=['Div'])
+        df['Season'] = season_of(df['Date'])
+        partitions.update(zip(df['Season'].tolist(), df['Div'].astype(str).tolist()))
+    return sorted(partitions)
+
+
+def read_dataset(path, columns=None, since=None, after=None, until=None) -> pd.DataFrame:
+    """
+    Reads only `columns` of the matches dated on or after `since`, strictly
+    after `after` and before `until`. Parquet datasets prune columns and skip
+    row groups outside the date range; CSV files (the previous format) are
+    parsed and then filtered.
+    """
+    since = pd.Timestamp(since) if since else None
+    after = pd.Timestamp(after) if after is not None else None
+    until = pd.Timestamp(until) if until is not None else None
+    if not is_parquet(path):
+        filtered = since is not None or after is not None or until is not None
+        usecols = columns if columns is None or not filtered else list(dict.fromkeys(['Date'] + list(columns)))
+        df = pd.read_csv(path, usecols=usecols)
+        if 'Date' in df.columns:
+            df['Date'] = parse_match_dates(df['Date'])
+        if since is not None:
+            df = df[df['Date'] >= since]
+        if after is not None:
+            df = df[df['Date'] > after]
+        if until is not None:
+            df = df[df['Date'] < until]
+        return (df if columns is None else df[list(columns)]).reset_index(drop=True)
+
+    conditions = []
+    if since is not None:
+        conditions.append(ds.field('Date') >= since)
+    if after is not None:
+        conditions.append(ds.field('Date') > after)
+    if until is not None:
+        conditions.append(ds.field('Date') < until)
+    row_filter = None
+    for condition in conditions:
+        row_filter = condition if row_filter is None else row_filter & condition
+    return open_dataset(path).to_table(columns=columns, filter=row_filter).to_pandas()
@@ -1,106 +1,303 @@
+import argparse
+import os
+import sys
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 from pathlib import Path
 import yaml
 import boto3
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from inference.feature_store import feature_store_path, write_feature_store
+from match_data import (PARTITIONING, PROCESSED_SCHEMA, RAW_FEATURE_SOURCE_COLS, dataset_partitions, delete_dataset,
+                        is_parquet, read_dataset, season_bounds, write_dataset)
 
-def get_rolling_averages(group, cols, new_cols):
-    """Calculate rolling averages for specified columns."""
-    group = group.sort_values("Date")
-    rolling_stats = group[cols].rolling(5, closed='left', min_periods=1).mean()
-    group[new_cols] = rolling_stats
-    group = group.dropna(subset=new_cols)
-    return group
+# Each match gives one row of team stats per side, read from these raw columns
+STAT_COLS = ['GoalsScored', 'GoalsConceded', 'Shots', 'ShotsOnTarget']
+HOME_SOURCE_COLS = ['FTHG', 'FTAG', 'HS', 'HST']
+AWAY_SOURCE_COLS = ['FTAG', 'FTHG', 'AS', 'AST']
+HOME_FEATURE_COLS = [f"avg_{c}_home" for c in STAT_COLS]
+AWAY_FEATURE_COLS = [f"avg_{c}_away" for c in STAT_COLS]
+FINAL_COLS = ['Date', 'HomeTeam', 'AwayTeam', 'FTR', 'FTHG', 'FTAG'] + HOME_FEATURE_COLS + AWAY_FEATURE_COLS
+ROLLING_WINDOW = 5
+# Rolling state: each team's last ROLLING_WINDOW stacked rows
+STATE_COLS = ['Team', 'Date'] + STAT_COLS
+# Dates in processed CSVs are written the way football-data.co.uk writes them
+PROCESSED_DATE_FORMAT = '%d/%m/%Y'
+# Processed rows of a partitioned run also carry their partition keys
+PARTITIONED_SCHEMA = PROCESSED_SCHEMA.append(pa.field('Div', pa.string())).append(pa.field('Season', pa.int16()))
 
-def preprocess_data(s3_raw_path: str) -> str:
+def rolling_team_averages(teams, dates, values, window=ROLLING_WINDOW):
+    """
+    Mean of each team's previous `window` values, i.e. rolling(window, closed='left',
+    min_periods=1).mean() per team in date order, without a per-team callback.
+    teams are integer codes, dates datetime64 and values an (n, k) float array.
+    Returns an (n, k) array in input order, NaN where a team has no earlier value.
+    """
+    n = len(teams)
+    dates = dates.astype('datetime64[ns]').view(np.int64)
+    # Sort once by team, then date (stable, so same-day rows keep their input order)
+    order = np.lexsort((dates, teams))
+    sorted_values = values[order]
+    sorted_teams = teams[order]
+    positions = np.arange(n)
+    is_start = np.ones(n, dtype=bool)
+    is_start[1:] = sorted_teams[1:] != sorted_teams[:-1]
+    # Number of earlier matches of the same team
+    rank = positions - np.maximum.accumulate(np.where(is_start, positions, 0))
+
+    present = ~np.isnan(sorted_values)
+    complete = present.all()
+    filled = sorted_values if complete else np.where(present, sorted_values, 0.0)
+    sums = np.zeros_like(filled)
+    # Without missing values the window holds min(rank, window) values
+    counts = np.minimum(rank, window)[:, None] if complete else np.zeros(filled.shape, dtype=np.int64)
+    # Add the value `lag` rows back wherever it belongs to the same team, oldest lag
+    # first to match the order rolling() adds values in
+    for lag in range(window, 0, -1):
+        if lag >= n:
+            continue
+        in_window = (rank[lag:] >= lag)[:, None]
+        sums[lag:] += np.where(in_window, filled[:-lag], 0.0)
+        if not complete:
+            counts[lag:] += in_window & present[:-lag]
+
+    averages = np.full_like(filled, np.nan)
+    np.divide(sums, counts, out=averages, where=np.broadcast_to(counts > 0, filled.shape))
+    result = np.empty_like(averages)
+    result[order] = averages
+    return result
+
+def clean_matches(df: pd.DataFrame) -> pd.DataFrame:
+    return df.dropna(subset=['HomeTeam', 'AwayTeam', 'FTHG', 'FTAG', 'FTR']).reset_index(drop=True)
+
+def stack_team_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """The home and away view of every match in STATE_COLS: rows [0, n) are home sides, [n, 2n) away sides."""
+    return pd.DataFrame({
+        'Team': np.concatenate([df['HomeTeam'].to_numpy(), df['AwayTeam'].to_numpy()]),
+        'Date': np.tile(df['Date'].to_numpy(dtype='datetime64[ns]'), 2),
+        **{col: np.concatenate([df[home].to_numpy(dtype=np.float64), df[away].to_numpy(dtype=np.float64)])
+           for col, home, away in zip(STAT_COLS, HOME_SOURCE_COLS, AWAY_SOURCE_COLS)},
+    })
+
+def engineer_features(df: pd.DataFrame, state: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Cleans raw match rows and adds each side's rolling averages over its last
+    five matches (home and away). state (see team_windows) holds the matches
+    before df, for an incremental run. Rows without a full set of features are dropped.
+    """
+    # Basic cleaning
+    df = clean_matches(df)
+    n = len(df)
+
+    # The stacked rows, after any earlier rows from state (all of which are older)
+    stacked = stack_team_rows(df)
+    if state is not None:
+        stacked = pd.concat([state[STATE_COLS], stacked], ignore_index=True)
+    offset = len(stacked) - 2 * n
+    teams, _ = pd.factorize(stacked['Team'].to_numpy())
+    averages = rolling_team_averages(teams, stacked['Date'].to_numpy(), stacked[STAT_COLS].to_numpy())[offset:]
+
+    # Every stacked row maps back to its match by position, so no merge is needed
+    processed_df = df[FINAL_COLS[:6]].copy()
+    processed_df[HOME_FEATURE_COLS] = averages[:n]
+    processed_df[AWAY_FEATURE_COLS] = averages[n:]
+    # Drop rows where stats couldn't be calculated (first game of a team in the data)
+    return processed_df.dropna()
+
+def team_windows(df: pd.DataFrame, state: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    The rolling state after df (and the earlier state): each team's last
+    ROLLING_WINDOW stacked rows. Its latest Date is the watermark of the next
+    incremental run.
+    """
+    stacked = stack_team_rows(clean_matches(df))
+    if state is not None:
+        stacked = pd.concat([state[STATE_COLS], stacked], ignore_index=True)
+    stacked = stacked.sort_values(['Team', 'Date'], kind='stable')
+    return stacked.groupby('Team', sort=False).tail(ROLLING_WINDOW).reset_index(drop=True)
+
+def latest_team_features(state: pd.DataFrame) -> pd.DataFrame:
+    """
+    Each team's features for its next match: the mean of its last ROLLING_WINDOW
+    matches in the rolling state, which is what engineer_features would compute
+    for that match. Teams with a stat missing in every window match are left out,
+    as engineer_features drops such rows.
+    """
+    grouped = state.groupby('Team', sort=True)
+    features = grouped[STAT_COLS].mean()
+    features.insert(0, 'Matches', grouped.size())
+    features.insert(0, 'LastMatch', grouped['Date'].max().dt.strftime('%Y-%m-%d'))
+    return features.dropna().reset_index()
+
+def save_feature_store(state, config):
+    """Publishes latest_team_features(state) to the feature store the inference API and web app read."""
+    path = feature_store_path(config)
+    features = latest_team_features(state)
+    write_feature_store(path, features.itertuples(index=False, name=None))
+    print(f"Wrote features for {len(features)} teams to {path}.")
+
+def load_state(path):
+    """Reads the rolling state written by a previous run, or returns None if there is none."""
+    try:
+        state = pd.read_csv(path)
+    except Exception as e:
+        print(f"No rolling state at {path} ({e}); running a full preprocessing pass.")
+        return None
+    state['Date'] = pd.to_datetime(state['Date'], format='ISO8601')
+    return state
+
+def late_watermark_matches(raw_path, state: pd.DataFrame) -> int:
+    """
+    Raw matches dated on the watermark day that the rolling state does not hold:
+    they arrived after the run that set the watermark, and incremental runs only
+    read later dates. Every match on that day is each side's latest, so the
+    state holds two rows for each one it has seen.
+    """
+    watermark = state['Date'].max()
+    df = read_dataset(raw_path, columns=RAW_FEATURE_SOURCE_COLS, since=watermark, until=watermark + pd.Timedelta(days=1))
+    return max(0, len(clean_matches(df)) - int((state['Date'] == watermark).sum()) // 2)
+
+def warn_late_matches(raw_path, state: pd.DataFrame):
+    late = late_watermark_matches(raw_path, state)
+    if late:
+        print(f"WARNING: {late} raw match(es) dated {state['Date'].max():%Y-%m-%d} arrived after the run that set "
+              "the watermark and are not processed incrementally; rerun with --full to include them.")
+
+def append_processed(processed_df, path):
+    """Appends rows to the processed CSV; S3 objects cannot be appended to, so those are rewritten."""
+    if path.startswith('s3://'):
+        processed_df = pd.concat([pd.read_csv(path), processed_df], ignore_index=True)
+        processed_df.to_csv(path, index=False)
+    else:
+        processed_df.to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+
+def preprocess_partitioned(raw_path, processed_path, state: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Engineers features one season at a time, oldest first, so memory is bounded
+    by a season's matches rather than the whole history. The rolling state
+    carries each team's last matches across season boundaries and between
+    leagues (promoted and relegated teams), which gives the same features as
+    engineer_features over all matches at once. Output is written as a
+    Div=/Season= partitioned Parquet dataset; with a state (an incremental run)
+    only matches after it are read and appended. Returns the rolling state after
+    the last season.
+    """
+    watermark = state['Date'].max() if state is not None else None
+    seasons = sorted({season for season, _ in dataset_partitions(raw_path, after=watermark)})
+    if state is None:
+        # Replace the previous output, which may not be partitioned the same way
+        delete_dataset(processed_path)
+    for season in seasons:
+        # A date range, so row groups of other seasons are skipped. All leagues are
+        # processed together: per-league calls cost more in pandas overhead than they save.
+        start, end = season_bounds(season)
+        df = read_dataset(raw_path, columns=['Div'] + RAW_FEATURE_SOURCE_COLS, since=start, after=watermark, until=end)
+        df = clean_matches(df.sort_values('Date', kind='stable'))
+        processed_df = engineer_features(df, state)
+        state = team_windows(df, state)
+        print(f"Season {season}/{(season + 1) % 100:02d}: {len(df)} matches, {len(processed_df)} processed rows.")
+        if processed_df.empty:
+            continue
+        processed_df['Div'] = df['Div'].astype(str).to_numpy()[processed_df.index]
+        processed_df['Season'] = season
+        # write_dataset splits the rows into one directory per league
+        table = pa.Table.from_pandas(processed_df, schema=PARTITIONED_SCHEMA, preserve_index=False)
+        write_dataset(table, processed_path, append=True, partitioning=PARTITIONING)
+    return state
+
+def preprocess_data(s3_raw_path: str, incremental: bool = None, partitioned: bool = None,
+                    processed_path: str = None, config: dict = None) -> str:
     """
     Loads raw data from a given S3 path, cleans it, engineers features, 
     and saves the processed data back to S3.
     Returns the S3 path of the processed file.
+
+    In incremental mode (preprocess.incremental in configs/config.yaml unless
+    given) only matches newer than the saved rolling state are processed and
+    appended to the processed data. Matches dated on the state's last day that
+    arrive after it was saved are not processed; the run warns about them, and
+    a full run (--full) includes them. In partitioned mode (preprocess.partitioned)
+    matches are processed a season at a time into league and season partitions,
+    see preprocess_partitioned.
+
+    processed_path (local or s3://) overrides the configured processed data
+    key, with the rolling state saved next to it; config overrides
+    configs/config.yaml.
     """
     # Load config
-    with open("configs/config.yaml", "r") as f:
-        config = yaml.safe_load(f)
+    if config is None:
+        with open("configs/config.yaml", "r") as f:
+            config = yaml.safe_load(f)
 
     bucket_name = config["s3"]["bucket"]
     processed_data_key = config["s3"]["processed_data_key"]
-    s3_processed_path = f"s3://{bucket_name}/{processed_data_key}"
+    preprocess_config = config.get("preprocess", {})
+    if incremental is None:
+        incremental = preprocess_config.get("incremental", False)
+    if partitioned is None:
+        partitioned = preprocess_config.get("partitioned", False)
+    if processed_path is None:
+        s3_processed_path = f"s3://{bucket_name}/{processed_data_key}"
+        state_key = preprocess_config.get("state_key") or f"{os.path.splitext(processed_data_key.rstrip('/'))[0]}.state.csv"
+        s3_state_path = f"s3://{bucket_name}/{state_key}"
+    else:
+        s3_processed_path = processed_path
+        s3_state_path = f"{os.path.splitext(processed_path.rstrip('/'))[0]}.state.csv"
     
+    state = load_state(s3_state_path) if incremental else None
+    watermark = state['Date'].max() if state is not None else None
+    if state is not None:
+        warn_late_matches(s3_raw_path, state)
+    if partitioned:
+        if not (is_parquet(s3_raw_path) and is_parquet(s3_processed_path)):
+            raise ValueError("Partitioned preprocessing needs Parquet raw and processed datasets, not CSV files.")
+        try:
+            print(f"Processing {s3_raw_path} by league and season into {s3_processed_path}...")
+            state = preprocess_partitioned(s3_raw_path, s3_processed_path, state)
+            if state is not None:
+                state.to_csv(s3_state_path, index=False, date_format='%Y-%m-%d')
+                save_feature_store(state, config)
+            print("Processed data saved successfully.")
+            return s3_processed_path
+        except Exception as e:
+            print(f"Partitioned preprocessing failed: {e}")
+            raise
+
     try:
         print(f"Reading raw data from {s3_raw_path}...")
-        df = pd.read_csv(s3_raw_path, parse_dates=['Date'])
+        # Only the columns the features need, and only matches after the watermark
+        df = read_dataset(s3_raw_path, columns=RAW_FEATURE_SOURCE_COLS, after=watermark)
     except Exception as e:
         print(f"Failed to read from S3: {e}")
         raise
 
-    # Basic cleaning
-    df = df.dropna(subset=['HomeTeam', 'AwayTeam', 'FTHG', 'FTAG', 'FTR'])
-    
-    # Feature Engineering: Rolling Averages
-    # We calculate stats for home and away teams separately
-    df_home = df[['Date', 'HomeTeam', 'FTHG', 'FTAG', 'HS', 'HST']].rename(
-        columns={'HomeTeam': 'Team', 'FTHG': 'GoalsScored', 'FTAG': 'GoalsConceded', 'HS': 'Shots', 'HST': 'ShotsOnTarget'}
-    )
-    df_away = df[['Date', 'AwayTeam', 'FTAG', 'FTHG', 'AS', 'AST']].rename(
-        columns={'AwayTeam': 'Team', 'FTAG': 'GoalsScored', 'FTHG': 'GoalsConceded', 'AS': 'Shots', 'AST': 'ShotsOnTarget'}
-    )
-    
-    df_team_stats = pd.concat([df_home, df_away]).sort_values('Date')
-
-    cols = ['GoalsScored', 'GoalsConceded', 'Shots', 'ShotsOnTarget']
-    new_cols = [f"avg_{c}" for c in cols]
+    if state is not None:
+        print(f"Incremental run: {len(df)} raw matches after the {watermark:%Y-%m-%d} watermark.")
+        if df.empty:
+            return s3_processed_path
 
-    df_rolling = df_team_stats.groupby("Team").apply(lambda x: get_rolling_averages(x, cols, new_cols))
-    
-    # After groupby, 'Team' is in the index. Let's reset it to be a column.
-    df_rolling = df_rolling.droplevel(0).reset_index()
-
-    # Prepare stats for home teams
-    home_stats = df_rolling.rename(columns={
-        'avg_GoalsScored': 'avg_GoalsScored_home',
-        'avg_GoalsConceded': 'avg_GoalsConceded_home',
-        'avg_Shots': 'avg_Shots_home',
-        'avg_ShotsOnTarget': 'avg_ShotsOnTarget_home',
-    })
-    home_stats = home_stats[['Date', 'Team', 'avg_GoalsScored_home', 'avg_GoalsConceded_home', 'avg_Shots_home', 'avg_ShotsOnTarget_home']]
-
-    # Prepare stats for away teams
-    away_stats = df_rolling.rename(columns={
-        'avg_GoalsScored': 'avg_GoalsScored_away',
-        'avg_GoalsConceded': 'avg_GoalsConceded_away',
-        'avg_Shots': 'avg_Shots_away',
-        'avg_ShotsOnTarget': 'avg_ShotsOnTarget_away',
-    })
-    away_stats = away_stats[['Date', 'Team', 'avg_GoalsScored_away', 'avg_GoalsConceded_away', 'avg_Shots_away', 'avg_ShotsOnTarget_away']]
-
-    # Merge home team stats
-    df = df.merge(
-        home_stats, 
-        left_on=['Date', 'HomeTeam'], 
-        right_on=['Date', 'Team'],
-        how='left'
-    ).drop('Team', axis=1)
-
-    # Merge away team stats
-    df = df.merge(
-        away_stats, 
-        left_on=['Date', 'AwayTeam'], 
-        right_on=['Date', 'Team'],
-        how='left'
-    ).drop('Team', axis=1)
-
-    # Final feature selection and cleaning
-    final_cols = [
-        'Date', 'HomeTeam', 'AwayTeam', 'FTR', 'FTHG', 'FTAG',
-        'avg_GoalsScored_home', 'avg_GoalsConceded_home', 'avg_Shots_home', 'avg_ShotsOnTarget_home',
-        'avg_GoalsScored_away', 'avg_GoalsConceded_away', 'avg_Shots_away', 'avg_ShotsOnTarget_away'
-    ]
-    # Drop rows where stats couldn't be calculated (first few games of a season for a team)
-    processed_df = df[final_cols].dropna()
+    processed_df = engineer_features(df, state)
 
     # Save processed data to S3
     try:
-        print(f"Writing processed data to {s3_processed_path}...")
-        processed_df.to_csv(s3_processed_path, index=False)
+        print(f"Writing {len(processed_df)} processed rows to {s3_processed_path}...")
+        if is_parquet(s3_processed_path):
+            # An incremental run adds a part file to the dataset
+            table = pa.Table.from_pandas(processed_df, schema=PROCESSED_SCHEMA, preserve_index=False)
+            write_dataset(table, s3_processed_path, append=state is not None)
+        else:
+            processed_df['Date'] = processed_df['Date'].dt.strftime(PROCESSED_DATE_FORMAT)
+            if state is not None:
+                append_processed(processed_df, s3_processed_path)
+            else:
+                processed_df.to_csv(s3_processed_path, index=False)
+        # Written after the data: if this run fails before here, the next one starts from the old watermark.
+        # A failure between the two writes leaves this run's rows in the processed data; rerun with --full.
+        state = team_windows(df, state)
+        state.to_csv(s3_state_path, index=False, date_format='%Y-%m-%d')
+        # Serving picks up the new features once the state they come from is saved
+        save_feature_store(state, config)
         print("Processed data saved successfully.")
         return s3_processed_path
     except Exception as e:
@@ -110,7 +307,18 @@ def preprocess_data(s3_raw_path: str) -> str:
 if __name__ == "__main__":
     # This part is for standalone execution and testing
     # In a real run, the s3_raw_path would be passed from the orchestration tool
+    parser = argparse.ArgumentParser(description="Engineer rolling team features from the raw match data.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--incremental', dest='incremental', action='store_true', default=None,
+                      help='only process matches newer than the saved rolling state')
+    mode.add_argument('--full', dest='incremental', action='store_false', help='reprocess all matches')
+    layout = parser.add_mutually_exclusive_group()
+    layout.add_argument('--partitioned', dest='partitioned', action='store_true', default=None,
+                        help='process a season at a time and write a Div=/Season= partitioned dataset')
+    layout.add_argument('--in-memory', dest='partitioned', action='store_false',
+                        help='process all matches at once')
+    args = parser.parse_args()
     with open("configs/config.yaml", "r") as f:
         config = yaml.safe_load(f)
     s3_path = f"s3://{config['s3']['bucket']}/{config['s3']['raw_data_key']}"
-    preprocess_data(s3_path) 
\ No newline at end of file
+    preprocess_data(s3_path, incremental=args.incremental, partitioned=args.partitioned)
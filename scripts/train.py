@@ -1,5 +1,9 @@
 import pandas as pd
+import numpy as np
 import joblib
+import os
+import sys
+import time
 from pathlib import Path
 from sklearn.model_selection import train_test_split, RandomizedSearchCV
 from sklearn.ensemble import RandomForestClassifier
@@ -8,15 +12,173 @@ from sklearn.preprocessing import LabelEncoder
 import yaml
 import boto3
 from io import BytesIO
-import mlflow
-import mlflow.sklearn
 from scipy.stats import randint, uniform
+from sklearn.base import clone
+from compact_forest import DEFAULT_DEPTHS, apply_compaction, compact_forest, model_footprint
+from distill import distill_first_stage, evaluate_cascade, fit_first_stage
+from halving_search import HalvingForestSearch
+from match_data import FEATURE_COLS, read_dataset
+from training_cache import FINGERPRINT_TAG, find_trained_run, training_fingerprint
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from inference.cascade import ARTIFACT_PATH as CASCADE_ARTIFACT_PATH, first_stage_path, save_first_stage
+
+# Hyperparameter search space of the outcome model
+PARAM_DIST = {
+    'n_estimators': randint(100, 301),
+    'max_depth': [None, 10, 20, 30, 40, 50],
+    'min_samples_split': randint(2, 11),
+    'min_samples_leaf': randint(1, 5),
+    'max_features': ['sqrt', 'log2', None],
+    'class_weight': [None, 'balanced']
+}
+
+def fit_outcome_model(df, training_config, n_jobs=None):
+    """
+    Encodes the target, holds out 20% of the matches for testing and runs the
+    configured hyperparameter search (training section of configs/config.yaml)
+    on the rest with n_jobs parallel jobs (training.n_jobs unless given).
+    When training.compaction or training.cascade is enabled, the search runs
+    on all but training.validation_size of those matches, the compaction and
+    cascade are chosen on that validation split, and the best parameters are
+    then refit on all the training matches; the compacted forest and the first
+    stage are rebuilt from that refit forest with the choices made.
+    Everything train_model does except MLflow tracking. Returns the fitted
+    search, the model to register, the label encoder, its hold-out accuracy,
+    the search time in seconds, the compaction (a dict with the compacted
+    model, its validation report, its test accuracy and the pickled size and
+    latency of both models) and the cascade (a dict with the first stage and
+    its validation and test reports); either is None when disabled.
+    """
+    search_mode = training_config.get("search", "randomized")
+    n_candidates = training_config.get("n_candidates", 20)
+    if n_jobs is None:
+        n_jobs = training_config.get("n_jobs", -1)
+
+    # Define features and target
+    features = FEATURE_COLS
+    x = df[features]
+    y = df['FTR']
+
+    # Encode target variable
+    le = LabelEncoder()
+    y_encoded = le.fit_transform(y)
+
+    # Split data
+    x_train, x_test, y_train, y_test = train_test_split(
+        x, y_encoded, test_size=0.2, random_state=42, stratify=y_encoded
+    )
+    # Compaction and the cascade decide on a validation split of the training matches, so the test set stays unseen
+    compaction_config = training_config.get("compaction", {})
+    cascade_config = training_config.get("cascade", {})
+    validate = compaction_config.get("enabled", False) or cascade_config.get("enabled", False)
+    x_fit, y_fit = x_train, y_train
+    if validate:
+        x_fit, x_val, y_fit, y_val = train_test_split(
+            x_train, y_train, test_size=training_config.get("validation_size", 0.2), random_state=42, stratify=y_train
+        )
+
+    # Hyperparameter tuning
+    if search_mode == "halving":
+        print("Starting successive-halving search for RandomForestClassifier tuning...")
+        search = HalvingForestSearch(
+            RandomForestClassifier(random_state=42, n_jobs=n_jobs),
+            param_distributions=PARAM_DIST,
+            n_candidates=n_candidates,
+            cv=3,
+            factor=training_config.get("halving_factor", 3),
+            max_trees=training_config.get("max_trees", 300),
+            time_budget_s=training_config.get("time_budget_s"),
+            random_state=42,
+            memory=training_config.get("cache_dir") or None
+        )
+    else:
+        print("Starting RandomizedSearchCV for RandomForestClassifier tuning...")
+        base_model = RandomForestClassifier(random_state=42)
+        search = RandomizedSearchCV(
+            base_model,
+            param_distributions=PARAM_DIST,
+            n_iter=n_candidates,
+            scoring='accuracy',
+            n_jobs=n_jobs,
+            cv=3,
+            random_state=42,
+            verbose=1
+        )
+    search_started = time.perf_counter()
+    search.fit(x_fit, y_fit)
+    search_time_s = time.perf_counter() - search_started
+    print(f"Best parameters found: {search.best_params_} ({search_time_s:.1f}s)")
+
+    # Compaction: fewer, shallower trees within the accuracy budget on the validation split
+    compaction = None
+    if compaction_config.get("enabled", False):
+        print("Compacting the best forest...")
+        _, report = compact_forest(
+            search.best_estimator_, x_fit, x_val, y_val,
+            max_accuracy_loss=compaction_config.get("max_accuracy_loss", 0.01),
+            min_trees=compaction_config.get("min_trees", 10),
+            depths=compaction_config.get("depths") or DEFAULT_DEPTHS
+        )
+        compaction = {"report": report}
+
+    # Cascade: a cheap model that answers the matches it is confident about before the forest
+    cascade = None
+    if cascade_config.get("enabled", False):
+        print("Distilling the first-stage model...")
+        _, validation = distill_first_stage(
+            search.best_estimator_, x_fit, x_val, y_val, le.classes_,
+            min_agreement=cascade_config.get("min_agreement", 0.98),
+            max_accuracy_loss=cascade_config.get("max_accuracy_loss", 0.01)
+        )
+        cascade = {"validation": validation}
+
+    # The choices are made; the registered forest trains on all the training matches
+    model = search.best_estimator_
+    if validate:
+        print("Refitting the best parameters on the training and validation matches...")
+        model = clone(search.best_estimator_).fit(x_train, y_train)
+
+    # Evaluate model
+    y_pred = model.predict(x_test)
+    accuracy = accuracy_score(y_test, y_pred)
+    print(f"Model accuracy on test set: {accuracy:.3f}")
+
+    if compaction is not None:
+        report = compaction["report"]
+        compact_model = apply_compaction(model, x_train, report)
+        compaction.update({
+            "model": compact_model,
+            "accuracy": accuracy_score(y_test, compact_model.predict(x_test)),
+            "full": model_footprint(model, x_test),
+            "compact": model_footprint(compact_model, x_test),
+        })
+        print(f"Compacted {report['full_trees']} trees / {compaction['full']['nodes']} nodes to {report['trees']} trees / "
+              f"{compaction['compact']['nodes']} nodes (max depth {report['max_depth']}), test accuracy {compaction['accuracy']:.3f}; "
+              f"{compaction['full']['size_mb']:.2f}MB -> {compaction['compact']['size_mb']:.2f}MB, "
+              f"{compaction['full']['latency_ms']:.2f}ms -> {compaction['compact']['latency_ms']:.2f}ms per prediction")
+
+    if cascade is not None:
+        # Fit to the registered forest, so its digest matches the one served
+        first_stage = fit_first_stage(model, x_train, le.classes_, threshold=cascade["validation"]["threshold"])
+        report = evaluate_cascade(model, first_stage, x_test, y_test)
+        cascade.update({"first_stage": first_stage, "report": report})
+        print(f"First stage answers {report['first_stage_fraction']:.0%} of test matches at confidence >= "
+              f"{report['threshold']:.3f}; cascade accuracy {report['cascade_accuracy']:.3f} "
+              f"(forest {report['forest_accuracy']:.3f})")
+    return search, model, le, accuracy, search_time_s, compaction, cascade
 
 def train_model(s3_processed_path: str):
     """
     Loads processed data from a given S3 path, trains a model, 
     and logs the experiment to MLflow, saving artifacts to S3 via MLflow.
+    When a finished run already trained on the same data, model version,
+    search space and sklearn version, its model is reused instead.
+    Returns the MLflow run ID of the model.
     """
+    # Imported here so fit_outcome_model works without the tracking client (benchmarks)
+    import mlflow
+    import mlflow.sklearn
+
     # Load config
     with open("configs/config.yaml", "r") as f:
         config = yaml.safe_load(f)
@@ -41,74 +203,77 @@ def train_model(s3_processed_path: str):
         print(f"Could not configure MLflow experiment: {e}")
 
 
+    # Load data from S3
+    try:
+        print(f"Reading processed data from {s3_processed_path}...")
+        # Only the features and target, from the configured start date on
+        df = read_dataset(s3_processed_path, columns=FEATURE_COLS + ['FTR'], since=config.get('datasets', {}).get('train_since'))
+    except Exception as e:
+        print(f"Failed to read from S3: {e}")
+        raise
+
+    if df.empty:
+        print("ERROR: The processed dataframe is empty. No data to train on.")
+        print("This can happen if preprocessing removes all rows, e.g., due to insufficient data for rolling averages.")
+        # Exit gracefully without raising an exception to not fail the whole flow if desired
+        return
+
+    # Search settings that change the model (not where or how fast it runs)
+    training_config = config.get("training", {})
+    search_mode = training_config.get("search", "randomized")
+    search_config = {key: value for key, value in training_config.items() if key not in ("reuse_runs", "cache_dir", "n_jobs")}
+    fingerprint = training_fingerprint(df, config["model"]["version"], PARAM_DIST, search_config)
+    print(f"Training fingerprint: {fingerprint}")
+    if training_config.get("reuse_runs", True):
+        try:
+            run_id = find_trained_run(mlflow_config["experiment_name"], fingerprint)
+        except Exception as e:
+            print(f"Could not look up previous runs: {e}")
+            run_id = None
+        if run_id:
+            print(f"Run {run_id} already trained a model on these inputs; reusing it instead of retraining.")
+            return run_id
+
     # Start an MLflow run
     with mlflow.start_run() as run:
         print(f"Starting MLflow run: {run.info.run_name}")
+        mlflow.set_tag(FINGERPRINT_TAG, fingerprint)
         mlflow.log_param("model_version", config["model"]["version"])
 
-        # Load data from S3
-        try:
-            print(f"Reading processed data from {s3_processed_path}...")
-            df = pd.read_csv(s3_processed_path)
-        except Exception as e:
-            print(f"Failed to read from S3: {e}")
-            raise
-
-        if df.empty:
-            print("ERROR: The processed dataframe is empty. No data to train on.")
-            print("This can happen if preprocessing removes all rows, e.g., due to insufficient data for rolling averages.")
-            # Exit gracefully without raising an exception to not fail the whole flow if desired
-            return
-
-        # Define features and target
-        features = [col for col in df.columns if 'avg_' in col]
-        x = df[features]
-        y = df['FTR']
-
-        # Encode target variable
-        le = LabelEncoder()
-        y_encoded = le.fit_transform(y)
-
-        # Split data
-        x_train, x_test, y_train, y_test = train_test_split(
-            x, y_encoded, test_size=0.2, random_state=42, stratify=y_encoded
-        )
-
-        # Hyperparameter tuning with RandomizedSearchCV
-        param_dist = {
-            'n_estimators': randint(100, 301),
-            'max_depth': [None, 10, 20, 30, 40, 50],
-            'min_samples_split': randint(2, 11),
-            'min_samples_leaf': randint(1, 5),
-            'max_features': ['sqrt', 'log2', None],
-            'class_weight': [None, 'balanced']
-        }
-        print("Starting RandomizedSearchCV for RandomForestClassifier tuning...")
-        base_model = RandomForestClassifier(random_state=42)
-        search = RandomizedSearchCV(
-            base_model,
-            param_distributions=param_dist,
-            n_iter=20,
-            scoring='accuracy',
-            n_jobs=-1,
-            cv=3,
-            random_state=42,
-            verbose=1
-        )
-        search.fit(x_train, y_train)
-        print(f"Best parameters found: {search.best_params_}")
+        search, model, le, accuracy, search_time_s, compaction, cascade = fit_outcome_model(df, training_config)
         mlflow.log_params(search.best_params_)
-        model = search.best_estimator_
+        mlflow.log_param("search_mode", search_mode)
+        mlflow.log_metric("search_time_s", search_time_s)
+        # Candidates actually scored; the halving search may stop early at its time budget
+        mlflow.log_metric("search_candidates", getattr(search, "candidates_evaluated_", training_config.get("n_candidates", 20)))
+        mlflow.log_metric("search_cv_accuracy", search.best_score_)
+        if search_mode == "halving":
+            mlflow.log_metric("search_fits", search.n_fits_)
+            mlflow.log_metric("search_cached_fits", search.cached_fits_)
+            mlflow.log_metric("search_trees_fitted", search.trees_fitted_)
 
         # Log parameters
         mlflow.log_params(model.get_params())
 
-        # Evaluate model
-        y_pred = model.predict(x_test)
-        accuracy = accuracy_score(y_test, y_pred)
-        print(f"Model accuracy on test set: {accuracy:.3f}")
+        # Hold-out accuracy
         mlflow.log_metric("accuracy", accuracy)
 
+        # The first stage is published before the model is registered, so no model version is served without it
+        if cascade is not None:
+            report = cascade["report"]
+            mlflow.log_metrics({
+                "cascade_first_stage_fraction": report["first_stage_fraction"],
+                "cascade_accuracy": report["cascade_accuracy"],
+                "first_stage_accuracy": report["first_stage_accuracy"],
+                "cascade_validation_accuracy": cascade["validation"]["cascade_accuracy"],
+            })
+            if np.isfinite(report["threshold"]):
+                mlflow.log_metric("cascade_threshold", report["threshold"])
+            first_stage_file = "/tmp/first_stage.npz"
+            cascade["first_stage"].save(first_stage_file)
+            mlflow.log_artifact(first_stage_file, artifact_path=os.path.dirname(CASCADE_ARTIFACT_PATH))
+            save_first_stage(cascade["first_stage"], first_stage_path(config))
+
         # Log the model to MLflow (which saves it to S3)
         print("Logging model to MLflow...")
         mlflow.sklearn.log_model(
@@ -117,12 +282,37 @@ def train_model(s3_processed_path: str):
             registered_model_name="epl-prediction-model"
         )
         
+        # The compacted forest is logged and registered separately, so serving can choose either
+        if compaction is not None:
+            report = compaction["report"]
+            mlflow.log_param("compact_max_depth", report["max_depth"])
+            mlflow.log_metrics({
+                "compact_accuracy": compaction["accuracy"],
+                "compact_validation_accuracy": report["accuracy"],
+                "full_validation_accuracy": report["full_accuracy"],
+                "compact_trees": report["trees"],
+                "compact_nodes": compaction["compact"]["nodes"],
+                "full_nodes": compaction["full"]["nodes"],
+                "full_model_size_mb": compaction["full"]["size_mb"],
+                "full_model_latency_ms": compaction["full"]["latency_ms"],
+                "full_model_batch_latency_ms": compaction["full"]["batch_latency_ms"],
+                "compact_model_size_mb": compaction["compact"]["size_mb"],
+                "compact_model_latency_ms": compaction["compact"]["latency_ms"],
+                "compact_model_batch_latency_ms": compaction["compact"]["batch_latency_ms"],
+            })
+            mlflow.sklearn.log_model(
+                sk_model=compaction["model"],
+                artifact_path="compact_model",
+                registered_model_name=training_config["compaction"].get("registered_model_name", "epl-prediction-model-compact")
+            )
+
         # Save and log the label encoder as an artifact
         encoder_path = "/tmp/label_encoder.pkl"
         joblib.dump(le, encoder_path)
         mlflow.log_artifact(encoder_path, artifact_path="encoder")
 
         print("MLflow run completed successfully.")
+        return run.info.run_id
 
 
 if __name__ == "__main__":
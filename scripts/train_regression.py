@@ -1,41 +1,57 @@
+import argparse
 import pandas as pd
 import joblib
 import os
+import sys
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, mean_squared_error
 
-# Load processed data
+parser = argparse.ArgumentParser(description="Train the goals regressors used by the score predictor.")
+parser.add_argument('--multi-output', action='store_true',
+                    help='train one forest predicting (FTHG, FTAG) together, saved as models/goals_model.pkl')
+args = parser.parse_args()
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from match_data import FEATURE_COLS, read_dataset
+
+# Load processed data: only the features and the two targets
 csv_path = 'data/processed_epl_data.csv'
-df = pd.read_csv(csv_path)
+df = read_dataset(csv_path, columns=FEATURE_COLS + ['FTHG', 'FTAG'])
 
 # Features and targets
-features = [
-    'avg_GoalsScored_home', 'avg_GoalsConceded_home', 'avg_Shots_home', 'avg_ShotsOnTarget_home',
-    'avg_GoalsScored_away', 'avg_GoalsConceded_away', 'avg_Shots_away', 'avg_ShotsOnTarget_away'
-]
+features = FEATURE_COLS
 X = df[features]
-y_home = df['FTHG']  # Full Time Home Goals
-y_away = df['FTAG']  # Full Time Away Goals
+y = df[['FTHG', 'FTAG']]  # Full Time Home Goals, Full Time Away Goals
 
-# Split data
-X_train, X_test, y_home_train, y_home_test = train_test_split(X, y_home, test_size=0.2, random_state=42)
-_, _, y_away_train, y_away_test = train_test_split(X, y_away, test_size=0.2, random_state=42)
+# Split data once so both targets share the same rows
+X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
-# Train regressors
-home_model = RandomForestRegressor(n_estimators=100, random_state=42, min_samples_leaf=1, max_features='auto')
-home_model.fit(X_train, y_home_train)
-away_model = RandomForestRegressor(n_estimators=100, random_state=42, min_samples_leaf=1, max_features='auto')
-away_model.fit(X_train, y_away_train)
+# max_features=1.0 is what 'auto' meant for regressors; 'auto' was removed in scikit-learn 1.3
+os.makedirs('models', exist_ok=True)
+if args.multi_output:
+    # One forest, one traversal per prediction for both scores
+    goals_model = RandomForestRegressor(n_estimators=100, random_state=42, min_samples_leaf=1, max_features=1.0)
+    goals_model.fit(X_train, y_train)
+    pred = goals_model.predict(X_test)
+    home_pred, away_pred = pred[:, 0], pred[:, 1]
+else:
+    home_model = RandomForestRegressor(n_estimators=100, random_state=42, min_samples_leaf=1, max_features=1.0)
+    home_model.fit(X_train, y_train['FTHG'])
+    away_model = RandomForestRegressor(n_estimators=100, random_state=42, min_samples_leaf=1, max_features=1.0)
+    away_model.fit(X_train, y_train['FTAG'])
+    home_pred = home_model.predict(X_test)
+    away_pred = away_model.predict(X_test)
 
 # Evaluate
-home_pred = home_model.predict(X_test)
-away_pred = away_model.predict(X_test)
-print(f"Home Goals MAE: {mean_absolute_error(y_home_test, home_pred):.2f}")
-print(f"Away Goals MAE: {mean_absolute_error(y_away_test, away_pred):.2f}")
+print(f"Home Goals MAE: {mean_absolute_error(y_test['FTHG'], home_pred):.2f}")
+print(f"Away Goals MAE: {mean_absolute_error(y_test['FTAG'], away_pred):.2f}")
 
 # Save models
-os.makedirs('models', exist_ok=True)
-joblib.dump(home_model, 'models/home_goals_model.pkl')
-joblib.dump(away_model, 'models/away_goals_model.pkl')
-print('Models saved as models/home_goals_model.pkl and models/away_goals_model.pkl') 
\ No newline at end of file
+if args.multi_output:
+    joblib.dump(goals_model, 'models/goals_model.pkl')
+    print('Model saved as models/goals_model.pkl')
+else:
+    joblib.dump(home_model, 'models/home_goals_model.pkl')
+    joblib.dump(away_model, 'models/away_goals_model.pkl')
+    print('Models saved as models/home_goals_model.pkl and models/away_goals_model.pkl')
@@ -0,0 +1,48 @@
+import hashlib
+import json
+import pandas as pd
+import sklearn
+
+FINGERPRINT_TAG = "training_fingerprint"
+
+def data_fingerprint(df):
+    """SHA-256 of a dataframe's column names, dtypes and values (row order included, index ignored)."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([[str(col), str(dtype)] for col, dtype in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def describe_distribution(values):
+    """A stable description of a search space entry: a list, or a frozen scipy.stats distribution."""
+    if hasattr(values, "dist"):
+        return {"dist": values.dist.name, "args": list(values.args), "kwds": values.kwds}
+    return list(values)
+
+def training_fingerprint(df, model_version, param_distributions, search_config):
+    """
+    Identifies a training run by everything its model depends on: the training
+    data, the configured model version, the search space and settings, and the
+    sklearn version. Two runs with the same fingerprint train the same model.
+    """
+    inputs = {
+        "data": data_fingerprint(df),
+        "model_version": str(model_version),
+        "param_distributions": {name: describe_distribution(values) for name, values in sorted(param_distributions.items())},
+        "search": search_config,
+        "sklearn": sklearn.__version__,
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+def find_trained_run(experiment_name, fingerprint):
+    """The ID of the latest finished MLflow run logged with this fingerprint and a model, or None."""
+    import mlflow
+    runs = mlflow.search_runs(
+        experiment_names=[experiment_name],
+        filter_string=f"tags.{FINGERPRINT_TAG} = '{fingerprint}' and attributes.status = 'FINISHED'",
+        order_by=["start_time DESC"],
+    )
+    client = mlflow.MlflowClient()
+    for run_id in runs.run_id if not runs.empty else []:
+        if client.list_artifacts(run_id, "model"):
+            return run_id
+    return None
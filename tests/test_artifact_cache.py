@@ -0,0 +1,85 @@
+import hashlib
+import io
+import joblib
+import numpy as np
+import pytest
+from botocore.exceptions import ClientError
+
+from inference.artifact_cache import ArtifactCache
+
+class FakeS3:
+    """Minimal S3 client honouring If-None-Match, counting full downloads."""
+    def __init__(self):
+        self.objects = {}
+        self.downloads = 0
+        self.offline = False
+
+    def put(self, key, obj):
+        buffer = io.BytesIO()
+        joblib.dump(obj, buffer)
+        data = buffer.getvalue()
+        self.objects[key] = (data, hashlib.md5(data).hexdigest())
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None, VersionId=None):
+        if self.offline:
+            raise ConnectionError("S3 unreachable")
+        data, etag = self.objects[Key]
+        if IfNoneMatch == f'"{etag}"':
+            raise ClientError({"Error": {"Code": "304"}, "ResponseMetadata": {"HTTPStatusCode": 304}}, "GetObject")
+        self.downloads += 1
+        return {"Body": io.BytesIO(data), "ETag": f'"{etag}"'}
+
+@pytest.fixture
+def s3():
+    return FakeS3()
+
+def test_unchanged_objects_are_revalidated_not_downloaded(s3, tmp_path):
+    """Tests that a second load is served from disk after a 304 and arrays come back memory-mapped."""
+    s3.put("models/epl_model.pkl", {"weights": np.arange(10000)})
+    cache = ArtifactCache(tmp_path, s3_client=s3)
+    assert cache.fetch("bucket", "models/epl_model.pkl")[2] == "miss"
+    obj, _ = cache.load("bucket", "models/epl_model.pkl")
+    assert s3.downloads == 1
+    assert isinstance(obj["weights"], np.memmap)
+
+def test_changed_objects_are_downloaded_again(s3, tmp_path):
+    """Tests that a new ETag replaces the cached copy."""
+    s3.put("model.pkl", [1])
+    cache = ArtifactCache(tmp_path, s3_client=s3)
+    cache.fetch("bucket", "model.pkl")
+    s3.put("model.pkl", [2])
+    obj, _ = cache.load("bucket", "model.pkl")
+    assert obj == [2] and s3.downloads == 2
+
+def test_cached_copy_is_used_when_s3_is_unreachable(s3, tmp_path):
+    """Tests the stale fallback when revalidation fails."""
+    s3.put("model.pkl", [1])
+    cache = ArtifactCache(tmp_path, s3_client=s3)
+    cache.fetch("bucket", "model.pkl")
+    s3.offline = True
+    assert cache.fetch("bucket", "model.pkl")[2] == "stale"
+
+def test_least_recently_used_blobs_are_evicted(s3, tmp_path):
+    """Tests that the cache stays under max_bytes by dropping the oldest blobs first."""
+    cache = ArtifactCache(tmp_path, max_bytes=200_000, s3_client=s3)
+    for i in range(4):
+        s3.put(f"model-{i}.pkl", np.full(10000, i))
+        cache.fetch("bucket", f"model-{i}.pkl")
+    blobs = list(cache.blob_dir.iterdir())
+    assert sum(blob.stat().st_size for blob in blobs) <= 200_000
+    assert s3.objects["model-3.pkl"][1] in {blob.name for blob in blobs}
+
+def test_latest_compiled_forest_is_tracked_per_source(tmp_path):
+    """Tests that the most recently saved compiled forest is found again for its source."""
+    class Engine:
+        def __init__(self, marker):
+            self.marker = marker
+        def save(self, file):
+            np.save(file, np.array([self.marker]))
+    cache = ArtifactCache(tmp_path, s3_client=FakeS3())
+    assert cache.latest_compiled("s3://bucket/model.pkl") is None
+    cache.save_compiled("s3://bucket/model.pkl", "v1", Engine(1))
+    cache.save_compiled("s3://bucket/model.pkl", "v2", Engine(2))
+    path, version = cache.latest_compiled("s3://bucket/model.pkl")
+    assert version == "v2" and np.load(path)[0] == 2
+    assert cache.latest_compiled("s3://bucket/other.pkl") is None
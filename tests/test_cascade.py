@@ -0,0 +1,95 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "scripts"))
+from distill import distill_first_stage, evaluate_cascade, fit_first_stage  # noqa: E402
+from match_data import FEATURE_COLS  # noqa: E402
+from preprocess import engineer_features  # noqa: E402
+from train import fit_outcome_model  # noqa: E402
+
+from benchmarks.synthetic import synthetic_raw_matches
+from inference.cascade import Cascade, forest_digest, load_first_stage, save_first_stage
+from inference.forest_engine import CompiledForest
+
+def distilled_forest():
+    processed = engineer_features(synthetic_raw_matches(3000, teams_per_league=10, seed=11))
+    le = LabelEncoder()
+    y = le.fit_transform(processed['FTR'])
+    x_train, x_test, y_train, y_test = train_test_split(
+        processed[FEATURE_COLS], y, test_size=0.25, random_state=0, stratify=y
+    )
+    forest = RandomForestClassifier(n_estimators=30, min_samples_leaf=5, random_state=0).fit(x_train, y_train)
+    first_stage, report = distill_first_stage(forest, x_train, x_test, y_test, le.classes_)
+    return forest, first_stage, report, np.asarray(x_test, dtype=np.float64), y_test
+
+def test_distilled_threshold_meets_the_budget():
+    """Tests that the calibrated threshold keeps agreement and cascade accuracy within the configured limits."""
+    forest, first_stage, report, x_test, y_test = distilled_forest()
+    assert 0 < report["first_stage_fraction"] < 1
+    assert report["agreement"] >= 0.98
+    assert report["cascade_accuracy"] >= report["forest_accuracy"] - 0.01
+    assert first_stage.feature_names == FEATURE_COLS
+    confident = first_stage.predict_proba(x_test).max(axis=1) >= first_stage.threshold
+    assert confident.mean() == report["first_stage_fraction"]
+    assert evaluate_cascade(forest, first_stage, x_test, y_test) == report
+
+def test_cascade_sends_only_unconfident_rows_to_the_forest(tmp_path):
+    """Tests that a saved and reloaded first stage answers confident rows and the forest scores the rest."""
+    forest, first_stage, _, x_test, _ = distilled_forest()
+    save_first_stage(first_stage, tmp_path / "first_stage.npz")
+    loaded = load_first_stage(tmp_path / "first_stage.npz")
+    assert np.array_equal(loaded.predict_proba(x_test), first_stage.predict_proba(x_test))
+
+    forest_rows = []
+    def score_forest(rows):
+        forest_rows.append(len(rows))
+        proba = forest.predict_proba(rows)
+        return forest.classes_.take(proba.argmax(axis=1)), proba
+
+    cascade = Cascade(loaded)
+    labels, proba = cascade.score(x_test, score_forest)
+    first_proba = loaded.predict_proba(x_test)
+    confident = first_proba.max(axis=1) >= loaded.threshold
+    assert forest_rows == [int((~confident).sum())]
+    assert np.array_equal(proba[confident], first_proba[confident])
+    assert np.allclose(proba[~confident], forest.predict_proba(x_test[~confident]))
+    assert np.array_equal(labels, proba.argmax(axis=1))
+    assert cascade.describe()["first_stage_fraction"] == confident.mean()
+
+def test_first_stage_is_tied_to_its_forest(tmp_path):
+    """Tests that the forest hash survives compiling and saving, but not a changed split with the same node count."""
+    forest, first_stage, _, _, _ = distilled_forest()
+    engine = CompiledForest.from_sklearn(forest)
+    engine.save(tmp_path / "forest.npz")
+    assert forest_digest(CompiledForest.load(tmp_path / "forest.npz")) == first_stage.forest_digest
+    save_first_stage(first_stage, tmp_path / "first_stage.npz")
+    assert load_first_stage(tmp_path / "first_stage.npz").forest_digest == forest_digest(forest)
+    engine.threshold = engine.threshold.copy()
+    engine.threshold[0] += 1.0
+    assert forest_digest(engine) != first_stage.forest_digest
+
+def test_first_stage_is_fit_to_the_registered_forest():
+    """Tests that the registered forest is refit on all training matches, and the first stage and compaction come from it."""
+    processed = engineer_features(synthetic_raw_matches(2000, teams_per_league=10, seed=11))
+    training_config = {
+        "search": "halving", "n_candidates": 3, "max_trees": 20, "n_jobs": 1, "validation_size": 0.2,
+        "compaction": {"enabled": True, "min_trees": 3, "depths": [4]}, "cascade": {"enabled": True},
+    }
+    search, model, le, accuracy, _, compaction, cascade = fit_outcome_model(processed, training_config)
+    y = le.transform(processed['FTR'])
+    x_train, x_test, y_train, y_test = train_test_split(
+        processed[FEATURE_COLS], y, test_size=0.2, random_state=42, stratify=y
+    )
+    # The search saw only the matches outside the validation split; the registered forest sees them all
+    refit = clone(search.best_estimator_).fit(x_train, y_train)
+    assert np.array_equal(model.predict_proba(x_test), refit.predict_proba(x_test))
+    assert accuracy == np.mean(model.predict(x_test) == y_test)
+    assert cascade["first_stage"].forest_digest == forest_digest(model) != forest_digest(search.best_estimator_)
+    assert cascade["first_stage"].threshold == cascade["validation"]["threshold"]
+    assert len(compaction["model"].estimators_) == compaction["report"]["trees"]
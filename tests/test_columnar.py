@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from inference import columnar
+
+FEATURES = ["a", "b", "c"]
+
+def test_float32_matrix_is_reordered_to_feature_order():
+    """Tests that X-Columns lets clients send features in any column order."""
+    rows = np.array([[3.0, 1.0, 2.0], [6.0, 4.0, 5.0]], dtype="<f4")
+    matrix = columnar.decode_float32_matrix(rows.tobytes(), FEATURES, "c, a, b")
+    assert matrix.tolist() == [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]]
+
+def test_float32_matrix_rejects_truncated_bodies_and_bad_headers():
+    """Tests that partial rows and incomplete column headers are refused."""
+    body = np.ones((2, 3), dtype="<f4").tobytes()
+    with pytest.raises(columnar.PayloadError):
+        columnar.decode_float32_matrix(body[:-4], FEATURES)
+    with pytest.raises(columnar.PayloadError):
+        columnar.decode_float32_matrix(body, FEATURES, "a,b,b")
+
+@pytest.mark.parametrize("bad_value", [np.nan, np.inf, -1.0, 1000.0])
+def test_validation_rejects_non_finite_and_out_of_range_values(bad_value):
+    """Tests the whole-array NaN, inf and range checks."""
+    matrix = np.ones((4, 3), dtype=np.float32)
+    matrix[2, 1] = bad_value
+    with pytest.raises(columnar.PayloadError, match="row 2, column 'b'"):
+        columnar.validate_features(matrix, FEATURES, 0.0, 100.0)
+
+def test_ndjson_stream_matches_json_prediction_shape():
+    """Tests that each NDJSON line carries the same fields as a JSON prediction."""
+    def score(x):
+        return np.zeros(len(x), dtype=int), np.tile([0.5, 0.25, 0.25], (len(x), 1))
+
+    body = "".join(columnar.ndjson_stream(np.ones((5, 3)), score, np.array(["A", "D", "H"]), chunk_rows=2))
+    lines = body.splitlines()
+    assert len(lines) == 5
+    assert lines[0] == '{"predicted_outcome": "A", "probabilities": {"A": 0.5, "D": 0.25, "H": 0.25}}'
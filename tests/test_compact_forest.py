@@ -0,0 +1,67 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "scripts"))
+from compact_forest import apply_compaction, compact_forest, model_footprint, rebuild_tree  # noqa: E402
+from match_data import FEATURE_COLS  # noqa: E402
+from preprocess import engineer_features  # noqa: E402
+
+from benchmarks.synthetic import synthetic_raw_matches
+
+def split_matches():
+    processed = engineer_features(synthetic_raw_matches(3000, teams_per_league=10, seed=11))
+    y = LabelEncoder().fit_transform(processed['FTR'])
+    return train_test_split(processed[FEATURE_COLS], y, test_size=0.25, random_state=0, stratify=y)
+
+def test_rebuilt_trees_score_like_the_original():
+    """Tests that an uncapped rebuild with float32 thresholds predicts identically, and a cap bounds the depth."""
+    x_train, x_test, y_train, _ = split_matches()
+    tree = RandomForestClassifier(n_estimators=1, random_state=0).fit(x_train, y_train).estimators_[0].tree_
+    x = np.ascontiguousarray(x_test, dtype=np.float32)
+
+    rebuilt = rebuild_tree(tree)
+    assert rebuilt.node_count == tree.node_count
+    assert np.array_equal(rebuilt.predict(x), tree.predict(x))
+    internal = rebuilt.children_left != -1
+    assert np.array_equal(rebuilt.threshold[internal], rebuilt.threshold[internal].astype(np.float32))
+
+    capped = rebuild_tree(tree, max_depth=3)
+    assert capped.max_depth == 3 and capped.node_count <= 15
+    # Leaves with more than one class can share their sibling's vote; pruning keeps every vote
+    tree = RandomForestClassifier(n_estimators=1, min_samples_leaf=5, random_state=0).fit(x_train, y_train).estimators_[0].tree_
+    pruned = rebuild_tree(tree, prune=True)
+    assert pruned.node_count < tree.node_count
+    assert np.array_equal(pruned.predict(x).argmax(axis=1), tree.predict(x).argmax(axis=1))
+
+def test_compacted_forest_stays_within_the_accuracy_budget():
+    """Tests that compaction shrinks the forest and loses at most the budgeted held-out accuracy."""
+    x_train, x_test, y_train, y_test = split_matches()
+    model = RandomForestClassifier(n_estimators=100, random_state=0).fit(x_train, y_train)
+    compact, report = compact_forest(model, x_train, x_test, y_test, max_accuracy_loss=0.01, min_trees=5)
+
+    full_accuracy = np.mean(model.predict(x_test) == y_test)
+    accuracy = np.mean(compact.predict(x_test) == y_test)
+    assert report["full_accuracy"] == full_accuracy and report["accuracy"] == accuracy
+    assert accuracy >= full_accuracy - 0.01
+    assert 5 <= report["trees"] == len(compact.estimators_) < 100
+    assert report["nodes"] == sum(estimator.tree_.node_count for estimator in compact.estimators_) < report["full_nodes"]
+    assert model_footprint(compact, x_test)["size_mb"] < model_footprint(model, x_test)["size_mb"]
+
+def test_compaction_choice_applies_to_a_refit_forest():
+    """Tests that the chosen trees, depth and pruning rebuild the same forest, and apply to a refit one."""
+    x_train, x_test, y_train, y_test = split_matches()
+    model = RandomForestClassifier(n_estimators=60, random_state=0).fit(x_train, y_train)
+    compact, report = compact_forest(model, x_train, x_test, y_test, min_trees=5)
+    again = apply_compaction(model, x_train, report)
+    assert np.array_equal(again.predict_proba(x_test), compact.predict_proba(x_test))
+
+    refit = RandomForestClassifier(n_estimators=60, random_state=1).fit(x_train, y_train)
+    compact_refit = apply_compaction(refit, x_train, report)
+    assert len(compact_refit.estimators_) == report["trees"]
+    if report["max_depth"] is not None:
+        assert max(estimator.tree_.max_depth for estimator in compact_refit.estimators_) <= report["max_depth"]
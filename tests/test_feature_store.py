@@ -0,0 +1,75 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import LabelEncoder
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "scripts"))
+from preprocess import engineer_features, latest_team_features, team_windows  # noqa: E402
+
+from benchmarks.synthetic import synthetic_raw_matches
+from inference import inference_api
+from inference.feature_store import FeatureStore, write_feature_store
+from inference.model_registry import ModelBundle
+from inference.team_stats import FEATURES
+
+def write_store(path, raw):
+    write_feature_store(path, latest_team_features(team_windows(raw)).itertuples(index=False, name=None))
+
+def test_store_serves_the_features_training_computes(tmp_path):
+    """Tests that a fixture's stored features equal what engineer_features gives that match once played."""
+    raw = synthetic_raw_matches(2000, teams_per_league=10, seed=4)
+    raw.loc[raw.sample(frac=0.05, random_state=2).index, ["HS", "AST"]] = np.nan
+    write_store(tmp_path / "features.sqlite", raw)
+    store = FeatureStore(tmp_path / "features.sqlite")
+    assert store.refresh()
+
+    home_team, away_team = raw["HomeTeam"].iloc[-1], raw["AwayTeam"].iloc[-2]
+    next_match = raw.iloc[[-1]].assign(Date=raw["Date"].max() + pd.Timedelta(days=7),
+                                       HomeTeam=home_team, AwayTeam=away_team)
+    expected = engineer_features(next_match, team_windows(raw))[FEATURES].to_numpy()[0]
+    assert np.allclose(store.lookup(home_team, away_team), expected, rtol=0, atol=1e-12)
+    assert store.lookup(home_team, "Unknown FC") is None
+
+def test_store_is_reloaded_when_rewritten(tmp_path):
+    """Tests that refresh picks up a store rewritten by a later preprocessing run, and only then."""
+    path = tmp_path / "features.sqlite"
+    raw = synthetic_raw_matches(300, teams_per_league=10, seed=5)
+    write_store(path, raw[raw["Date"] < raw["Date"].max()])
+    store = FeatureStore(path)
+    store.refresh()
+    before = store.snapshot()[0].copy()
+    assert not store.refresh()
+
+    write_store(path, raw)
+    assert store.refresh()
+    changed = [team for team in before if not np.array_equal(before[team], store.snapshot()[0][team])]
+    assert set(changed) == set(raw.loc[raw["Date"] == raw["Date"].max(), ["HomeTeam", "AwayTeam"]].to_numpy().ravel())
+
+def test_predict_by_teams_endpoint(tmp_path, monkeypatch):
+    """Tests /predict_by_teams scores the stored features and reports unknown teams."""
+    raw = synthetic_raw_matches(300, teams_per_league=10, seed=6)
+    write_store(tmp_path / "features.sqlite", raw)
+    store = FeatureStore(tmp_path / "features.sqlite")
+    store.refresh()
+
+    processed = engineer_features(raw)
+    encoder = LabelEncoder().fit(processed["FTR"])
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(processed[FEATURES], encoder.transform(processed["FTR"]))
+    monkeypatch.setattr(inference_api, "active_bundle", ModelBundle(model, encoder, None, "v1", "test", FEATURES))
+    monkeypatch.setattr(inference_api, "feature_store", store)
+    client = TestClient(inference_api.app)
+
+    response = client.post("/predict_by_teams", json={"home_team": "L0-Team01", "away_team": "L0-Team02"})
+    assert response.status_code == 200
+    body = response.json()
+    expected = model.predict(pd.DataFrame([store.lookup("L0-Team01", "L0-Team02")], columns=FEATURES))
+    assert body["predicted_outcome"] == encoder.inverse_transform(expected)[0]
+    assert body["home_team"] == "L0-Team01"
+
+    response = client.post("/predict_by_teams", json={"home_team": "L0-Team01", "away_team": "Unknown FC"})
+    assert response.status_code == 404
+    assert "Unknown FC" in response.json()["detail"]
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+from inference.fixture_table import FixtureTable
+from inference.team_stats import FEATURES
+
+class CountingModel:
+    """Wraps a regressor and records how many rows it scored."""
+
+    def __init__(self, model):
+        self.model = model
+        self.rows = 0
+
+    def predict(self, input_data):
+        self.rows += len(input_data)
+        return self.model.predict(input_data)
+
+def predict_with(home_model, away_model):
+    return lambda input_data: np.column_stack([home_model.predict(input_data), away_model.predict(input_data)])
+
+def make_models(seed=0):
+    rng = np.random.default_rng(seed)
+    x = pd.DataFrame(rng.uniform(0, 20, size=(300, 8)), columns=FEATURES)
+    home = RandomForestRegressor(n_estimators=10, random_state=0).fit(x, x.iloc[:, 0] / 5)
+    away = RandomForestRegressor(n_estimators=10, random_state=0).fit(x, x.iloc[:, 4] / 5)
+    return CountingModel(home), CountingModel(away)
+
+def make_stats(rng, teams):
+    home = {team: rng.uniform(0, 20, size=4) for team in teams}
+    away = {team: rng.uniform(0, 20, size=4) for team in teams}
+    return home, away, sorted(teams)
+
+def test_table_matches_scoring_each_fixture():
+    """Tests that every cell equals the rounded prediction for that single fixture."""
+    home_model, away_model = make_models()
+    stats = make_stats(np.random.default_rng(1), ["Arsenal", "Chelsea", "Everton", "Fulham"])
+    table = FixtureTable.build(stats, predict_with(home_model, away_model), "v1")
+    assert home_model.rows == 16
+
+    for home_team in stats[2]:
+        for away_team in stats[2]:
+            row = pd.DataFrame([np.concatenate([stats[0][home_team], stats[1][away_team]])], columns=FEATURES)
+            expected = (int(round(home_model.predict(row)[0])), int(round(away_model.predict(row)[0])))
+            home_goals, away_goals, outcome = table.lookup(home_team, away_team)
+            assert (home_goals, away_goals) == expected
+            assert outcome == np.sign(home_goals - away_goals)
+    assert table.lookup("Arsenal", "Leeds") is None
+
+def test_rebuild_only_rescores_changed_teams(tmp_path):
+    """Tests that a saved table is reused and only pairs with a changed team are scored again."""
+    home_model, away_model = make_models()
+    home, away, teams = make_stats(np.random.default_rng(2), ["Arsenal", "Chelsea", "Everton"])
+    FixtureTable.build((home, away, teams), predict_with(home_model, away_model), "v1").save(tmp_path / "table.npz")
+    previous = FixtureTable.load(tmp_path / "table.npz")
+
+    home_model.rows = away_model.rows = 0
+    home = {**home, "Chelsea": home["Chelsea"] + 1}
+    away = {**away, "Leeds": away["Arsenal"]}
+    table = FixtureTable.build((home, away, teams + ["Leeds"]), predict_with(home_model, away_model), "v1", previous=previous)
+    # Chelsea's home row (4 away teams) plus Leeds' away column for the two other home teams
+    assert home_model.rows == 6
+    assert table.lookup("Arsenal", "Leeds") == table.lookup("Arsenal", "Arsenal")
+
+    home_model.rows = 0
+    FixtureTable.build((home, away, teams), predict_with(home_model, away_model), "v2", previous=table)
+    assert home_model.rows == 12
+
+def test_lookup_many_flags_unknown_teams():
+    """Tests that bulk lookups match single lookups and mark fixtures with an unknown team."""
+    home_model, away_model = make_models()
+    stats = make_stats(np.random.default_rng(3), ["Arsenal", "Chelsea", "Everton"])
+    table = FixtureTable.build(stats, predict_with(home_model, away_model), "v1")
+    home_goals, away_goals, outcomes, found = table.lookup_many(["Chelsea", "Leeds", "Everton"], ["Arsenal", "Arsenal", "Leeds"])
+    assert found.tolist() == [True, False, False]
+    assert (home_goals[0], away_goals[0], outcomes[0]) == table.lookup("Chelsea", "Arsenal")
+    assert not table.lookup_many(["Leeds"], ["Arsenal"])[3].any()
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+from inference.forest_engine import CompiledForest
+
+@pytest.fixture(scope="module")
+def fitted_forest():
+    """A small forest trained on random data with three outcome classes."""
+    rng = np.random.default_rng(0)
+    x = rng.random((600, 8)) * 10
+    y = rng.integers(0, 3, size=600)
+    model = RandomForestClassifier(n_estimators=40, max_depth=None, random_state=42).fit(x, y)
+    return model, rng.random((2000, 8)) * 10
+
+def test_compiled_forest_matches_sklearn_exactly(fitted_forest):
+    """Tests that labels and probabilities are bit-for-bit identical to sklearn."""
+    model, x = fitted_forest
+    engine = CompiledForest.from_sklearn(model)
+    labels, proba = engine.predict_with_proba(x)
+    assert np.array_equal(proba, model.predict_proba(x))
+    assert np.array_equal(labels, model.predict(x))
+
+def test_compiled_forest_handles_float32_boundaries(fitted_forest):
+    """Tests inputs sitting exactly on split thresholds follow sklearn's float32 comparison."""
+    model, _ = fitted_forest
+    engine = CompiledForest.from_sklearn(model)
+    thresholds = model.estimators_[0].tree_.threshold
+    x = np.tile(thresholds[thresholds > 0][:8], (8, 1))[:, :8]
+    assert np.array_equal(engine.predict_proba(x), model.predict_proba(x))
+
+def test_float32_thresholds_split_like_sklearn(fitted_forest):
+    """Tests that thresholds rounded down to float32 agree with sklearn just below, at and above every split."""
+    model, _ = fitted_forest
+    engine = CompiledForest.from_sklearn(model)
+    assert engine.threshold.dtype == np.float32
+    tree = model.estimators_[0].tree_
+    internal = tree.children_left != -1
+    rows = []
+    for feature, threshold in zip(tree.feature[internal], tree.threshold[internal]):
+        nearest = np.float32(threshold)
+        for value in (np.nextafter(nearest, np.float32(-np.inf)), nearest, np.nextafter(nearest, np.float32(np.inf))):
+            row = np.full(8, 5.0, dtype=np.float32)
+            row[feature] = value
+            rows.append(row)
+    x = np.array(rows)
+    assert np.array_equal(engine.predict_proba(x), model.predict_proba(x))
+
+def test_compiled_forest_chunks_large_batches(fitted_forest, monkeypatch):
+    """Tests chunked traversal gives the same result as a single pass."""
+    model, x = fitted_forest
+    engine = CompiledForest.from_sklearn(model)
+    expected = engine.predict_proba(x)
+    monkeypatch.setattr("inference.forest_engine.MAX_TRAVERSAL_CELLS", 1000)
+    assert np.array_equal(engine.predict_proba(x), expected)
+
+def test_compiled_forest_rejects_unsupported_models():
+    """Tests that non-forest estimators and wrong input widths are refused."""
+    tree = DecisionTreeClassifier().fit([[0.0], [1.0]], [0, 1])
+    with pytest.raises(TypeError):
+        CompiledForest.from_sklearn(tree)
+    model = RandomForestClassifier(n_estimators=2, random_state=0).fit([[0.0, 1.0], [1.0, 0.0]], [0, 1])
+    with pytest.raises(ValueError):
+        CompiledForest.from_sklearn(model).predict_proba(np.zeros((1, 3)))
+
+def test_saved_forest_loads_without_pickle(fitted_forest, tmp_path):
+    """Tests that a forest saved to .npz scores identically and keeps its label names."""
+    model, x = fitted_forest
+    engine = CompiledForest.from_sklearn(model, label_names=np.array(["A", "D", "H"], dtype=object))
+    engine.save(tmp_path / "forest.npz")
+    restored = CompiledForest.load(tmp_path / "forest.npz")
+    assert np.array_equal(restored.predict_proba(x), model.predict_proba(x))
+    assert restored.label_names.tolist() == ["A", "D", "H"]
+    assert restored.max_depth == engine.max_depth
@@ -0,0 +1,71 @@
+import sys
+from pathlib import Path
+
+from scipy.stats import randint
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import LabelEncoder
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "scripts"))
+from halving_search import HalvingForestSearch  # noqa: E402
+from match_data import FEATURE_COLS  # noqa: E402
+from preprocess import engineer_features  # noqa: E402
+
+from benchmarks.synthetic import synthetic_raw_matches
+
+PARAM_DIST = {
+    'n_estimators': randint(100, 301),
+    'max_depth': [None, 5, 10],
+    'min_samples_leaf': randint(1, 5),
+    'class_weight': [None, 'balanced'],
+}
+
+def training_data():
+    processed = engineer_features(synthetic_raw_matches(1500, teams_per_league=10, seed=3))
+    return processed[FEATURE_COLS], LabelEncoder().fit_transform(processed['FTR'])
+
+def test_candidates_are_halved_and_forests_grown():
+    """Tests the rung schedule and promotions, that warm-started rungs only add trees, and the refit winner."""
+    x, y = training_data()
+    search = HalvingForestSearch(RandomForestClassifier(random_state=0), PARAM_DIST, n_candidates=9, cv=2,
+                                 factor=3, max_trees=27, random_state=0)
+    assert search.schedule() == [(3, 1 / 3), (9, 1.0)]
+    search.fit(x, y)
+
+    assert [rung["candidates"] for rung in search.history_] == [9, 3]
+    assert search.n_candidates_ == search.candidates_evaluated_ == 9 and search.n_fits_ == (9 + 3) * 2
+    # 9 candidates x 2 folds x 3 trees, then 3 x 2 x 9 trees, then the refit
+    assert search.trees_fitted_ == 9 * 2 * 3 + 3 * 2 * 9 + 27
+    assert 'n_estimators' in search.best_params_ and search.best_params_['n_estimators'] == 27
+    assert len(search.best_estimator_.estimators_) == 27
+    assert list(search.best_estimator_.feature_names_in_) == FEATURE_COLS
+    assert 0.0 <= search.best_score_ <= 1.0
+
+def test_time_budget_still_returns_a_model():
+    """Tests that a search out of time before scoring anything still refits a usable model."""
+    x, y = training_data()
+    search = HalvingForestSearch(RandomForestClassifier(random_state=0), PARAM_DIST, n_candidates=9, cv=2,
+                                 max_trees=10, time_budget_s=0).fit(x, y)
+    assert search.n_fits_ == 0 and search.history_ == []
+    assert search.n_candidates_ == 9 and search.candidates_evaluated_ == 0
+    assert len(search.best_estimator_.predict(x)) == len(x)
+    assert search.search_time_s_ > 0
+
+def test_cached_fits_are_reused_by_a_wider_search(tmp_path):
+    """Tests that a rerun with more candidates only fits the new ones, scoring as an uncached run, and a repeat fits nothing."""
+    x, y = training_data()
+    def search(n_candidates):
+        return HalvingForestSearch(RandomForestClassifier(random_state=0), PARAM_DIST, n_candidates=n_candidates,
+                                   cv=2, max_trees=27, random_state=0, memory=str(tmp_path)).fit(x, y)
+    narrow = search(6)
+    assert narrow.n_fits_ + narrow.cached_fits_ == (6 + 2) * 2
+    wide = search(9)
+    # Both searches have the same rungs, so the first 6 candidates' first rung is cached
+    assert [rung["trees"] for rung in wide.history_] == [rung["trees"] for rung in narrow.history_]
+    assert wide.cached_fits_ >= 6 * 2 and wide.n_fits_ <= (3 + 3) * 2
+    # Cached and fresh fits score exactly as an uncached search would
+    fresh = HalvingForestSearch(RandomForestClassifier(random_state=0), PARAM_DIST, n_candidates=9,
+                                cv=2, max_trees=27, random_state=0).fit(x, y)
+    assert wide.history_ == fresh.history_ and wide.best_params_ == fresh.best_params_
+    repeat = search(9)
+    assert repeat.n_fits_ == 0 and repeat.cached_fits_ == wide.n_fits_ + wide.cached_fits_
+    assert repeat.best_params_ == wide.best_params_ and repeat.best_score_ == wide.best_score_
@@ -0,0 +1,57 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "scripts"))
+from combine_local_data import combine_local_data  # noqa: E402
+from match_data import read_dataset  # noqa: E402
+
+def write_season(path, dates, home, away, legacy=False):
+    df = pd.DataFrame({
+        "Div": "E1", "Date": dates, "Time": "15:00", "HomeTeam": home, "AwayTeam": away,
+        "FTHG": 1, "FTAG": 0, "FTR": "H", "HS": 10, "AS": 8, "B365H": 2.1,
+    })
+    if legacy:
+        # An older season: no Div or Time, short result names, Latin-1, padding column and row
+        df = df.drop(columns=["Div", "Time"]).rename(columns={"FTHG": "HG", "FTAG": "AG", "FTR": "Res"})
+        df["Unnamed: 11"] = None
+        df.loc[len(df)] = None
+        df.to_csv(path, index=False, encoding="latin-1")
+    else:
+        df.to_csv(path, index=False)
+
+def test_seasons_are_normalized_into_league_partitions(tmp_path):
+    """Tests that legacy and current files end up in one schema, partitioned by league and season."""
+    write_season(tmp_path / "E1_2003.csv", ["16/08/03", "23/08/03"], ["Nott'm Forest", "Wigan"], ["Wigan", "Reading"],
+                 legacy=True)
+    write_season(tmp_path / "E1_2023.csv", ["04/08/2023"], ["Coventry"], ["Huddersfield"])
+    config = {"ingestion": {"sources": [
+        {"league": "E1", "season": 2003, "path": str(tmp_path / "E1_2003.csv")},
+        {"league": "E1", "season": 2023, "path": str(tmp_path / "E1_2023.csv")},
+    ], "workers": 1}}
+    output = tmp_path / "raw.parquet"
+    combine_local_data(str(output), config)
+
+    assert sorted(p.relative_to(output).as_posix() for p in output.glob("*/*")) == ["Div=E1/Season=2003", "Div=E1/Season=2023"]
+    df = read_dataset(output, columns=["Div", "Season", "Date", "HomeTeam", "FTHG", "FTR", "Time"])
+    df = df.sort_values("Date").reset_index(drop=True)
+    assert df["Date"].tolist() == [pd.Timestamp("2003-08-16"), pd.Timestamp("2003-08-23"), pd.Timestamp("2023-08-04")]
+    assert df["HomeTeam"].astype(str).tolist() == ["Nott'm Forest", "Wigan", "Coventry"]
+    assert df["FTHG"].tolist() == [1.0, 1.0, 1.0]
+    assert df["Time"].isna().tolist() == [True, True, False]
+
+def test_parallel_ingestion_matches_serial(tmp_path):
+    """Tests that parsing in a process pool gives the same dataset as parsing in-process."""
+    sources = []
+    for season in range(2018, 2022):
+        path = tmp_path / f"E1_{season}.csv"
+        write_season(path, [f"0{d}/09/{season}" for d in range(1, 5)], ["A", "B", "C", "D"], ["B", "C", "D", "A"])
+        sources.append({"league": "E1", "season": season, "path": str(path)})
+
+    frames = []
+    for workers in (1, 2):
+        output = tmp_path / f"raw-{workers}.parquet"
+        combine_local_data(str(output), {"ingestion": {"sources": sources, "workers": workers}})
+        frames.append(read_dataset(output).sort_values("Date").reset_index(drop=True))
+    pd.testing.assert_frame_equal(frames[0], frames[1])
@@ -0,0 +1,73 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "scripts"))
+from match_data import read_dataset, to_raw_table, write_dataset  # noqa: E402
+
+from inference.team_stats import FEATURES, TeamStatsIndex
+
+def raw_frame(dates, home="Arsenal", away="Chelsea"):
+    return pd.DataFrame({
+        "Div": "E0", "Date": dates, "Time": "15:00", "HomeTeam": home, "AwayTeam": away,
+        "FTHG": 2, "FTAG": 1, "FTR": "H", "HS": 12, "AS": 9, "B365H": ["1.91"] * len(dates),
+    })
+
+def test_raw_table_is_typed_and_read_back_pruned(tmp_path):
+    """Tests that raw rows are stored with typed columns and read back with only the requested columns."""
+    table = to_raw_table(raw_frame(["11/08/2023", "01/09/2023"]))
+    assert table.schema.field("Date").type == pa.timestamp("ms")
+    assert pa.types.is_dictionary(table.schema.field("HomeTeam").type)
+    assert table.schema.field("Time").type == pa.string()
+    assert table.schema.field("B365H").type == pa.float32()
+
+    write_dataset(table, tmp_path / "raw")
+    df = read_dataset(tmp_path / "raw", columns=["Date", "HomeTeam", "FTHG"])
+    assert list(df.columns) == ["Date", "HomeTeam", "FTHG"]
+    assert df["Date"].tolist() == [pd.Timestamp("2023-08-11"), pd.Timestamp("2023-09-01")]
+
+def test_date_filters_and_appended_parts(tmp_path):
+    """Tests since/after filtering and that appended part files read back after the earlier ones."""
+    path = tmp_path / "raw"
+    write_dataset(to_raw_table(raw_frame(["11/08/2023", "18/08/2023"])), path)
+    write_dataset(to_raw_table(raw_frame(["25/08/2023"], home="Burnley")), path, append=True)
+    assert len(list(path.iterdir())) == 2
+
+    df = read_dataset(path, columns=["Date", "HomeTeam"])
+    assert df["HomeTeam"].astype(str).tolist() == ["Arsenal", "Arsenal", "Burnley"]
+    assert len(read_dataset(path, since="2023-08-18")) == 2
+    assert len(read_dataset(path, after=pd.Timestamp("2023-08-18"))) == 1
+
+    # A full rewrite replaces the appended parts
+    write_dataset(to_raw_table(raw_frame(["01/09/2023"])), path)
+    assert len(read_dataset(path)) == 1
+
+def test_date_filters_on_a_processed_csv(tmp_path):
+    """Tests that a processed CSV, which has no Div column, is read with since and until applied."""
+    path = tmp_path / "processed.csv"
+    pd.DataFrame({
+        "Date": ["2023-08-11", "2024-01-06", "2024-05-04"], "HomeTeam": ["Arsenal", "Burnley", "Chelsea"],
+        "FTR": ["H", "D", "A"],
+    }).to_csv(path, index=False)
+    df = read_dataset(path, columns=["HomeTeam", "FTR"], since="2024-01-01")
+    assert df.to_dict("list") == {"HomeTeam": ["Burnley", "Chelsea"], "FTR": ["D", "A"]}
+    assert read_dataset(path, columns=["FTR"], until="2024-05-01")["FTR"].tolist() == ["H", "D"]
+
+def test_team_stats_index_reads_a_parquet_dataset(tmp_path):
+    """Tests that the Flask app's team stats index reads the processed Parquet dataset, with since applied."""
+    df = pd.DataFrame({
+        "Date": pd.to_datetime(["2023-08-11", "2024-05-04"]), "HomeTeam": ["Arsenal", "Burnley"],
+        "AwayTeam": ["Chelsea", "Arsenal"], **{col: [1.0, 2.0] for col in FEATURES},
+    })
+    path = tmp_path / "processed.parquet"
+    write_dataset(pa.Table.from_pandas(df, preserve_index=False), path)
+
+    index = TeamStatsIndex(path)
+    assert index.refresh()
+    assert index.teams == ["Arsenal", "Burnley", "Chelsea"]
+    recent = TeamStatsIndex(path, since="2024-01-01")
+    recent.refresh()
+    assert recent.teams == ["Arsenal", "Burnley"]
+    assert recent.lookup("Burnley", "Arsenal") is not None
@@ -0,0 +1,48 @@
+import asyncio
+import numpy as np
+import pytest
+
+from inference.micro_batcher import MicroBatcher
+
+class RecordingScorer:
+    """Scores rows by summing them and remembers the size of every batch it saw."""
+    def __init__(self):
+        self.batch_sizes = []
+
+    def __call__(self, x):
+        self.batch_sizes.append(len(x))
+        totals = x.sum(axis=1)
+        return totals, np.column_stack([totals, -totals])
+
+async def submit_concurrently(batcher, rows):
+    batcher.start()
+    try:
+        return await asyncio.gather(*(batcher.submit(row) for row in rows))
+    finally:
+        await batcher.stop()
+
+def test_concurrent_requests_share_one_model_call():
+    """Tests that requests arriving inside the window are scored together and fanned back out."""
+    scorer = RecordingScorer()
+    rows = [np.full(3, i, dtype=float) for i in range(10)]
+    results = asyncio.run(submit_concurrently(MicroBatcher(scorer, max_wait_ms=50, max_batch_size=64), rows))
+    assert scorer.batch_sizes == [10]
+    for i, (label, proba) in enumerate(results):
+        assert label == 3 * i
+        assert list(proba) == [3 * i, -3 * i]
+
+def test_batches_are_capped_at_max_batch_size():
+    """Tests that a full batch is flushed without waiting and the rest go into later batches."""
+    scorer = RecordingScorer()
+    rows = [np.ones(2) for _ in range(10)]
+    asyncio.run(submit_concurrently(MicroBatcher(scorer, max_wait_ms=1000, max_batch_size=4), rows))
+    assert scorer.batch_sizes == [4, 4, 2]
+
+def test_scoring_errors_reach_every_waiting_request():
+    """Tests that a failing model call fails each request in the batch."""
+    def failing_scorer(x):
+        raise RuntimeError("model exploded")
+
+    rows = [np.ones(2) for _ in range(3)]
+    with pytest.raises(RuntimeError, match="model exploded"):
+        asyncio.run(submit_concurrently(MicroBatcher(failing_scorer, max_wait_ms=10), rows))
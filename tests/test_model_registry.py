@@ -0,0 +1,136 @@
+import io
+import threading
+import time
+import joblib
+import pytest
+
+from inference.model_registry import ModelBundle, ModelReloader, S3ModelSource
+
+class FakeSource:
+    """In-memory model source whose latest version can be changed by the test."""
+    name = "fake"
+
+    def __init__(self):
+        self.latest = "v1"
+        self.broken = set()
+
+    def latest_version(self):
+        return self.latest
+
+    def load(self, version=None):
+        version = version or self.latest
+        if version in self.broken:
+            raise RuntimeError(f"artifact {version} is corrupt")
+        return f"model-{version}", f"encoder-{version}", version
+
+def make_reloader(source, active, poll_interval_s=60):
+    def build_bundle(model, label_encoder, version, source_name):
+        return ModelBundle(model, label_encoder, None, version, source_name, feature_order=[])
+    return ModelReloader(source, build_bundle, lambda bundle: active.append(bundle), poll_interval_s)
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_watcher_swaps_in_new_versions():
+    """Tests that the background poller activates a version once the source publishes it."""
+    source, active = FakeSource(), []
+    reloader = make_reloader(source, active, poll_interval_s=0.02)
+    reloader.reload()
+    reloader.start()
+    try:
+        source.latest = "v2"
+        assert wait_for(lambda: active[-1].version == "v2")
+        assert active[-1].model == "model-v2" and active[-1].label_encoder == "encoder-v2"
+    finally:
+        reloader.stop()
+
+def test_failed_reload_keeps_serving_the_previous_bundle():
+    """Tests that a broken artifact is reported but never activated."""
+    source, active = FakeSource(), []
+    reloader = make_reloader(source, active)
+    reloader.reload()
+    source.broken.add("v2")
+    with pytest.raises(RuntimeError):
+        reloader.reload(version="v2", trigger="admin")
+    assert [bundle.version for bundle in active] == ["v1"]
+    assert reloader.active_version == "v1"
+    assert "corrupt" in reloader.status()["last_error"]
+
+def test_pinned_version_is_not_replaced_by_the_watcher():
+    """Tests that pinning holds a version until it is released."""
+    source, active = FakeSource(), []
+    reloader = make_reloader(source, active, poll_interval_s=0.02)
+    source.latest = "v3"
+    reloader.pin("v1")
+    reloader.start()
+    try:
+        time.sleep(0.1)
+        assert active[-1].version == "v1"
+        reloader.pin(None)
+        assert active[-1].version == "v3"
+    finally:
+        reloader.stop()
+
+def test_poll_racing_a_pin_does_not_undo_it():
+    """Tests that a poll which saw a newer version while a pin was loading leaves the pinned version active."""
+    source, active = FakeSource(), []
+    source.latest = "v3"
+    checked, loading, release = threading.Event(), threading.Event(), threading.Event()
+    source_version, source_load = source.latest_version, source.load
+
+    def latest_version():
+        checked.set()
+        return source_version()
+
+    def load(version=None):
+        if version == "v1":
+            loading.set()
+            release.wait(2)
+        return source_load(version)
+
+    source.latest_version, source.load = latest_version, load
+    reloader = make_reloader(source, active)
+    pin = threading.Thread(target=reloader.pin, args=("v1",))
+    pin.start()
+    assert loading.wait(2)
+    # The poll finds v3 before the pin is recorded and waits for the pin's reload
+    reloader.start(check_now=True)
+    try:
+        assert checked.wait(2)
+        time.sleep(0.05)
+        release.set()
+        pin.join(2)
+        time.sleep(0.05)
+        assert [bundle.version for bundle in active] == ["v1"]
+        assert reloader.status()["pinned_version"] == "v1"
+    finally:
+        reloader.stop()
+
+class VersionedS3:
+    """S3 client holding every version of each object; VersionId selects one, the latest otherwise."""
+    def __init__(self):
+        self.versions = {}
+
+    def put(self, key, version_id, obj):
+        buffer = io.BytesIO()
+        joblib.dump(obj, buffer)
+        self.versions.setdefault(key, []).append((version_id, buffer.getvalue()))
+
+    def get_object(self, Bucket, Key, VersionId=None):
+        version_id, data = next(v for v in reversed(self.versions[Key]) if VersionId in (None, v[0]))
+        return {"Body": io.BytesIO(data), "ETag": f'"etag-{version_id}"'}
+
+def test_s3_pinned_version_pins_the_encoder_too():
+    """Tests that "<model VersionId>:<encoder VersionId>" loads the encoder trained with that model."""
+    s3 = VersionedS3()
+    for run in ("a", "b"):
+        s3.put("model.pkl", f"model-{run}", f"model from run {run}")
+        s3.put("encoder.pkl", f"encoder-{run}", f"encoder from run {run}")
+    source = S3ModelSource("bucket", "model.pkl", "encoder.pkl")
+    source._client = lambda: s3
+    assert source.load()[:2] == ("model from run b", "encoder from run b")
+    model, label_encoder, version = source.load("model-a:encoder-a")
+    assert (model, label_encoder, version) == ("model from run a", "encoder from run a", "model-a:encoder-a")
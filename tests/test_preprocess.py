@@ -0,0 +1,121 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "scripts"))
+from match_data import read_dataset, to_raw_table, write_dataset  # noqa: E402
+from preprocess import (AWAY_FEATURE_COLS, HOME_FEATURE_COLS, engineer_features, late_watermark_matches,  # noqa: E402
+                        load_state, preprocess_data, preprocess_partitioned, team_windows)
+
+from benchmarks.synthetic import synthetic_raw_matches
+
+def reference_features(raw):
+    """Per-team pandas rolling over the stacked home and away views, for comparison."""
+    views = []
+    for side, team, scored, conceded, shots, on_target in [
+        ("home", "HomeTeam", "FTHG", "FTAG", "HS", "HST"),
+        ("away", "AwayTeam", "FTAG", "FTHG", "AS", "AST"),
+    ]:
+        view = raw[["Date", team, scored, conceded, shots, on_target]].copy()
+        view.columns = ["Date", "Team", "GoalsScored", "GoalsConceded", "Shots", "ShotsOnTarget"]
+        view["row"], view["side"] = raw.index, side
+        views.append(view)
+    stacked = pd.concat(views).sort_values(["Team", "Date"], kind="stable")
+    cols = ["GoalsScored", "GoalsConceded", "Shots", "ShotsOnTarget"]
+    stacked[cols] = stacked.groupby("Team")[cols].transform(lambda g: g.rolling(5, closed="left", min_periods=1).mean())
+    home = stacked[stacked["side"] == "home"].set_index("row")[cols].sort_index().to_numpy()
+    away = stacked[stacked["side"] == "away"].set_index("row")[cols].sort_index().to_numpy()
+    return np.hstack([home, away])
+
+def test_features_match_per_team_rolling_means():
+    """Tests that the vectorized averages equal pandas' per-team rolling means, including missing stats."""
+    raw = synthetic_raw_matches(2000, teams_per_league=10, seed=1)
+    raw.loc[raw.sample(frac=0.05, random_state=0).index, ["HS", "AST"]] = np.nan
+    expected = reference_features(raw)
+    processed = engineer_features(raw)
+    kept = ~np.isnan(expected).any(axis=1)
+    assert processed.index.tolist() == np.flatnonzero(kept).tolist()
+    assert np.array_equal(processed[HOME_FEATURE_COLS + AWAY_FEATURE_COLS].to_numpy(), expected[kept])
+
+def test_first_match_of_each_team_is_dropped():
+    """Tests that a match is kept only once both teams have an earlier match."""
+    raw = pd.DataFrame({
+        "Date": pd.to_datetime(["2023-08-11", "2023-08-18", "2023-08-25"]),
+        "HomeTeam": ["Burnley", "Man City", "Burnley"], "AwayTeam": ["Man City", "Burnley", "Arsenal"],
+        "FTHG": [0, 2, 1], "FTAG": [3, 2, 1], "FTR": ["A", "D", "D"],
+        "HS": [6.0, 20.0, 9.0], "AS": [17.0, 5.0, 12.0], "HST": [1.0, 8.0, 4.0], "AST": [8.0, 2.0, 5.0],
+    })
+    processed = engineer_features(raw)
+    assert len(processed) == 1
+    row = processed.iloc[0]
+    assert (row["HomeTeam"], row["avg_GoalsScored_home"], row["avg_Shots_away"]) == ("Man City", 3.0, 6.0)
+
+def test_incremental_run_matches_full_run(tmp_path):
+    """Tests that processing new matches from the saved rolling state gives the rows a full run would."""
+    raw = synthetic_raw_matches(3000, teams_per_league=10, seed=2)
+    raw.loc[raw.sample(frac=0.05, random_state=1).index, "HST"] = np.nan
+    cutoff = raw["Date"].iloc[1800]
+    old, new = raw[raw["Date"] <= cutoff], raw[raw["Date"] > cutoff]
+
+    team_windows(old).to_csv(tmp_path / "state.csv", index=False, date_format="%Y-%m-%d")
+    state = load_state(tmp_path / "state.csv")
+    assert state["Date"].max() == cutoff
+    assert state.groupby("Team").size().max() == 5
+
+    incremental = pd.concat([engineer_features(old), engineer_features(new, state)], ignore_index=True)
+    full = engineer_features(raw).reset_index(drop=True)
+    pd.testing.assert_frame_equal(incremental, full)
+    pd.testing.assert_frame_equal(team_windows(new, state), team_windows(raw))
+
+def test_partitioned_run_matches_in_memory_run(tmp_path):
+    """Tests that league-by-season processing carries form across seasons and leagues, also incrementally."""
+    raw = synthetic_raw_matches(3000, teams_per_league=10, seed=3)
+    # Two teams swap leagues from 2000 on, like a promotion and a relegation
+    later = raw["Date"] >= "2000-07-01"
+    for col in ("HomeTeam", "AwayTeam"):
+        raw.loc[later, col] = raw.loc[later, col].replace({"L0-Team00": "L1-Team00", "L1-Team00": "L0-Team00"})
+    # An unfinished match is dropped without shifting later rows onto the wrong league
+    raw.loc[raw.index[raw["Date"] >= "2003-08-01"][:3], "FTR"] = None
+    cutoff = pd.Timestamp("2003-01-01")
+    raw_path, processed_path = tmp_path / "raw", tmp_path / "processed"
+    write_dataset(to_raw_table(raw[raw["Date"] < cutoff].assign(Date=lambda df: df["Date"].dt.strftime("%d/%m/%Y"))),
+                  raw_path)
+    state = preprocess_partitioned(raw_path, processed_path)
+    write_dataset(to_raw_table(raw[raw["Date"] >= cutoff].assign(Date=lambda df: df["Date"].dt.strftime("%d/%m/%Y"))),
+                  raw_path, append=True)
+    state = preprocess_partitioned(raw_path, processed_path, state)
+
+    assert (processed_path / "Div=L1" / "Season=2003").is_dir()
+    features = HOME_FEATURE_COLS + AWAY_FEATURE_COLS
+    partitioned = read_dataset(processed_path, columns=["Date", "HomeTeam", "Div", "Season"] + features)
+    partitioned = partitioned.astype({"HomeTeam": str}).sort_values(["Date", "HomeTeam"]).reset_index(drop=True)
+    expected = engineer_features(raw).sort_values(["Date", "HomeTeam"]).reset_index(drop=True)
+    assert partitioned["HomeTeam"].tolist() == expected["HomeTeam"].tolist()
+    assert np.array_equal(partitioned[features].to_numpy(), expected[features].to_numpy(dtype=np.float32))
+    pd.testing.assert_frame_equal(state, team_windows(raw))
+
+def test_preprocess_data_writes_to_local_paths(tmp_path):
+    """Tests that preprocess_data can run on local paths with a given config, as benchmarks/bench_training.py does."""
+    raw = synthetic_raw_matches(500, teams_per_league=10, seed=9)
+    write_dataset(to_raw_table(raw.assign(Date=raw["Date"].dt.strftime("%d/%m/%Y"))), tmp_path / "raw.parquet")
+    config = {"s3": {"bucket": "unused", "processed_data_key": "unused.parquet"},
+              "feature_store": {"path": str(tmp_path / "features.sqlite")}}
+    processed_path = str(tmp_path / "processed.parquet")
+    assert preprocess_data(str(tmp_path / "raw.parquet"), incremental=False, partitioned=False,
+                           processed_path=processed_path, config=config) == processed_path
+
+    assert len(read_dataset(processed_path)) == len(engineer_features(raw))
+    pd.testing.assert_frame_equal(load_state(tmp_path / "processed.state.csv"), team_windows(raw), check_dtype=False)
+    assert (tmp_path / "features.sqlite").exists()
+
+def test_late_matches_on_the_watermark_day_are_counted(tmp_path):
+    """Tests that matches dated on the watermark day but missing from the state are reported, and seen ones are not."""
+    raw = synthetic_raw_matches(500, teams_per_league=10, seed=4)
+    watermark = raw["Date"].iloc[300]
+    on_watermark = raw.index[raw["Date"] == watermark]
+    seen = raw[(raw["Date"] < watermark) | raw.index.isin(on_watermark[:1])]
+    write_dataset(to_raw_table(raw.assign(Date=raw["Date"].dt.strftime("%d/%m/%Y"))), tmp_path / "raw.parquet")
+    assert late_watermark_matches(tmp_path / "raw.parquet", team_windows(seen)) == len(on_watermark) - 1
+    assert late_watermark_matches(tmp_path / "raw.parquet", team_windows(raw[raw["Date"] <= watermark])) == 0
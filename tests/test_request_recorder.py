@@ -0,0 +1,25 @@
+import base64
+import json
+
+from inference.request_recorder import TrafficRecorder
+
+def read_lines(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+def test_json_and_binary_bodies_are_recorded_for_replay(tmp_path):
+    """Tests that JSON bodies are kept as text and columnar bodies survive a base64 round trip."""
+    recorder = TrafficRecorder(tmp_path / "requests.jsonl")
+    recorder.record("POST", "/predict", {"content-type": "application/json"}, b'{"a": 1}', 200, 0.002)
+    recorder.record("POST", "/batch_predict", {"content-type": "application/x-epl-float32"}, b"\x00\x80\xff", 200, 0.01)
+    json_entry, binary_entry = read_lines(tmp_path / "requests.jsonl")
+    assert json_entry["body"] == '{"a": 1}' and json_entry["status"] == 200
+    assert base64.b64decode(binary_entry["body_b64"]) == b"\x00\x80\xff"
+
+def test_sampling_and_size_cap(tmp_path):
+    """Tests that only 1 in sample_every requests is recorded and recording stops at max_bytes."""
+    recorder = TrafficRecorder(tmp_path / "requests.jsonl", sample_every=2, max_bytes=400)
+    sampled = [recorder.should_record() for _ in range(4)]
+    assert sampled == [False, True, False, True]
+    for _ in range(10):
+        recorder.record("POST", "/predict", {}, b"{}", 200, 0.001)
+    assert 0 < (tmp_path / "requests.jsonl").stat().st_size <= 400
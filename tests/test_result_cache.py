@@ -0,0 +1,41 @@
+import asyncio
+import numpy as np
+
+from inference.result_cache import ResultCache
+
+def test_concurrent_identical_requests_compute_once():
+    """Tests that duplicates arriving while a prediction is in flight share its result."""
+    cache = ResultCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"predicted_outcome": "H"}
+
+    async def run():
+        key = ResultCache.make_key("v1", np.ones((1, 8)))
+        return await asyncio.gather(*[cache.get_or_compute(key, compute) for _ in range(10)])
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(result == {"predicted_outcome": "H"} for result in results)
+
+def test_keys_depend_on_model_version_and_features():
+    """Tests that a new model version or a different feature vector misses the cache."""
+    row = np.ones((1, 8))
+    assert ResultCache.make_key("v1", row) != ResultCache.make_key("v2", row)
+    assert ResultCache.make_key("v1", row) != ResultCache.make_key("v1", row * 2)
+
+def test_entries_expire_and_least_recently_used_are_evicted():
+    """Tests the TTL and the max_entries bound."""
+    cache = ResultCache(max_entries=2, ttl_s=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1
+
+    expired = ResultCache(ttl_s=0)
+    expired.put("a", 1)
+    assert expired.get("a") is None
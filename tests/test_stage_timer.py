@@ -0,0 +1,29 @@
+import time
+
+from inference.stage_timer import STAGE_SECONDS, SamplingProfiler, StageTimer
+
+def test_stages_are_exported_with_the_model_version():
+    """Tests that every timed stage lands in the histogram under the version that served the request."""
+    timer = StageTimer("predict")
+    timer.model_version = "test-version"
+    with timer.stage("validate"):
+        pass
+    with timer.stage("predict_proba"):
+        time.sleep(0.001)
+    timer.observe()
+    sample = STAGE_SECONDS.labels("predict", "predict_proba", "test-version")
+    assert [name for name, _ in timer.durations] == ["validate", "predict_proba"]
+    assert sample._sum.get() >= 0.001
+
+def test_profiler_samples_one_in_n_requests(tmp_path):
+    """Tests that only every Nth request is profiled and its folded stacks are written."""
+    profiler = SamplingProfiler(tmp_path, sample_every=3, interval_ms=1)
+    sessions = [profiler.maybe_start("predict") for _ in range(6)]
+    assert [session is not None for session in sessions] == [False, False, True, False, False, True]
+    time.sleep(0.02)
+    for session in filter(None, sessions):
+        session.stop()
+        session._thread.join()
+    profiles = list(tmp_path.glob("*.folded"))
+    assert len(profiles) == 2
+    assert "test_profiler_samples_one_in_n_requests" in profiles[0].read_text()
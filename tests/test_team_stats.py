@@ -0,0 +1,59 @@
+import os
+import numpy as np
+import pandas as pd
+
+from inference.team_stats import FEATURES, TeamStatsIndex
+
+def write_matches(path, rows):
+    pd.DataFrame(
+        [{"Date": date, "HomeTeam": home, "AwayTeam": away, **dict(zip(FEATURES, [value] * 8))}
+         for date, home, away, value in rows]
+    ).to_csv(path, index=False)
+
+def test_lookup_uses_the_latest_match_by_date(tmp_path):
+    """Tests that dd/mm/yyyy dates are ordered as dates, not strings, when picking each team's latest row."""
+    csv_path = tmp_path / "processed.csv"
+    write_matches(csv_path, [
+        ("31/12/2023", "Arsenal", "Chelsea", 1.0),
+        ("04/05/2024", "Arsenal", "Chelsea", 2.0),
+    ])
+    index = TeamStatsIndex(csv_path)
+    index.refresh()
+    assert np.array_equal(index.lookup("Arsenal", "Chelsea"), np.full(8, 2.0))
+    assert index.lookup("Chelsea", "Arsenal") is None
+    assert index.teams == ["Arsenal", "Chelsea"]
+
+def test_iso_dates_keep_day_and_month(tmp_path):
+    """Tests that ISO dates, as preprocessing writes them, are not read day-first."""
+    csv_path = tmp_path / "processed.csv"
+    write_matches(csv_path, [
+        ("2023-08-11", "Arsenal", "Chelsea", 2.0),
+        ("2023-09-01", "Arsenal", "Chelsea", 1.0),
+    ])
+    index = TeamStatsIndex(csv_path)
+    index.refresh()
+    assert np.array_equal(index.lookup("Arsenal", "Chelsea"), np.full(8, 1.0))
+
+def test_index_is_rebuilt_only_when_the_file_changes(tmp_path):
+    """Tests that refresh is a no-op for an unchanged file and picks up a rewritten one."""
+    csv_path = tmp_path / "processed.csv"
+    write_matches(csv_path, [("11/08/2023", "Burnley", "Man City", 1.0)])
+    index = TeamStatsIndex(csv_path)
+    assert index.refresh() is True
+    assert index.refresh() is False
+
+    write_matches(csv_path, [("11/08/2023", "Burnley", "Man City", 1.0), ("18/08/2023", "Burnley", "Man City", 3.0)])
+    os.utime(csv_path, ns=(0, os.stat(csv_path).st_mtime_ns + 1_000_000))
+    assert index.refresh() is True
+    assert index.lookup("Burnley", "Man City")[0] == 3.0
+
+def test_lookup_many_returns_a_feature_matrix(tmp_path):
+    """Tests that bulk lookups stack the same features as single lookups and flag unknown teams."""
+    csv_path = tmp_path / "processed.csv"
+    write_matches(csv_path, [("11/08/2023", "Burnley", "Man City", 1.0), ("12/08/2023", "Arsenal", "Burnley", 2.0)])
+    index = TeamStatsIndex(csv_path)
+    index.refresh()
+    features, found = index.lookup_many(["Arsenal", "Leeds"], ["Man City", "Burnley"])
+    assert found.tolist() == [True, False]
+    assert np.array_equal(features[0], index.lookup("Arsenal", "Man City"))
+    assert np.isnan(features[1]).all()
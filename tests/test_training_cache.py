@@ -0,0 +1,36 @@
+import sys
+from pathlib import Path
+
+from scipy.stats import randint
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "scripts"))
+from match_data import FEATURE_COLS  # noqa: E402
+from preprocess import engineer_features  # noqa: E402
+from training_cache import data_fingerprint, training_fingerprint  # noqa: E402
+
+from benchmarks.synthetic import synthetic_raw_matches
+
+PARAM_DIST = {'n_estimators': randint(100, 301), 'max_depth': [None, 10]}
+SEARCH = {"search": "halving", "n_candidates": 20}
+
+def processed():
+    return engineer_features(synthetic_raw_matches(500, teams_per_league=10, seed=8))[FEATURE_COLS + ['FTR']]
+
+def test_fingerprint_depends_only_on_training_inputs():
+    """Tests that identical data and settings give one fingerprint, whatever the index."""
+    df = processed()
+    fingerprint = training_fingerprint(df, "1.0.0", PARAM_DIST, SEARCH)
+    assert training_fingerprint(processed().reset_index(drop=True), "1.0.0",
+                                {'max_depth': [None, 10], 'n_estimators': randint(100, 301)}, dict(SEARCH)) == fingerprint
+
+def test_fingerprint_changes_with_any_input():
+    """Tests that a changed value, model version, search space or search setting changes the fingerprint."""
+    df = processed()
+    fingerprint = training_fingerprint(df, "1.0.0", PARAM_DIST, SEARCH)
+    changed = df.copy()
+    changed.iloc[-1, 0] += 0.2
+    assert data_fingerprint(changed) != data_fingerprint(df)
+    assert training_fingerprint(changed, "1.0.0", PARAM_DIST, SEARCH) != fingerprint
+    assert training_fingerprint(df, "1.0.1", PARAM_DIST, SEARCH) != fingerprint
+    assert training_fingerprint(df, "1.0.0", dict(PARAM_DIST, n_estimators=randint(100, 401)), SEARCH) != fingerprint
+    assert training_fingerprint(df, "1.0.0", PARAM_DIST, dict(SEARCH, n_candidates=30)) != fingerprint